@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import time
+
+from parser import Batch, Cache
+from scanner import scanner
+
+# Files listed by time in the summary
+SLOWEST = 5
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(
+        description="Parse many matrix language programs in parallel and summarise the diagnostics and timings.")
+    arg_parser.add_argument('paths', nargs='+', metavar='PATH',
+                            help="a directory, parsed with every {0} file below it, or a glob like "
+                                 "'scripts/**/*.txt'".format(Batch.SUFFIX))
+    arg_parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count(),
+                            help="number of worker processes (default: one per CPU)")
+    arg_parser.add_argument('--output', '-o', metavar='DIR',
+                            help="print the AST of each file to DIR, keeping the files' relative paths")
+    arg_parser.add_argument('--table-cache', metavar='DIR',
+                            help="load lexer and parser tables from DIR, generating them there when missing")
+    arg_parser.add_argument('--ast-cache', nargs='?', const=Cache.DEFAULT_DIR, default=None, metavar='DIR',
+                            help="reuse the ASTs of unchanged files from DIR (default {0}), storing new ones there"
+                            .format(Cache.DEFAULT_DIR))
+    arg_parser.add_argument('--ast-cache-size', type=float, default=Cache.DEFAULT_MAX_SIZE / 2 ** 20, metavar='MB',
+                            help="evict the least recently used ASTs when the cache grows past MB megabytes "
+                                 "(default %(default)g)")
+    arg_parser.add_argument('--scanner', choices=scanner.BACKENDS, default='ply',
+                            help="lex with PLY or with the faster regex lexer, which gives the same tokens")
+    arg_parser.add_argument('--quiet', '-q', action='store_true', help="print only the totals")
+    args = arg_parser.parse_args()
+
+    filenames = Batch.find_files(args.paths)
+    if not filenames:
+        print("No files match {0}".format(" ".join(args.paths)))
+        sys.exit(0)
+
+    start = time.perf_counter()
+    ast_cache = (args.ast_cache, int(args.ast_cache_size * 2 ** 20)) if args.ast_cache else None
+    results = Batch.compile_files(filenames, jobs=args.jobs, cache_dir=args.table_cache, output_dir=args.output,
+                                  ast_cache=ast_cache, backend=args.scanner)
+    elapsed = time.perf_counter() - start
+
+    failed = [result for result in results if not result.ok]
+    if not args.quiet:
+        for result in failed:
+            for diagnostic in result.diagnostics:
+                print("{0}: {1}".format(result.filename, diagnostic))
+
+        print("slowest:")
+        for result in sorted(results, key=lambda result: result.seconds, reverse=True)[:SLOWEST]:
+            print("{0:>10.1f} ms  {1}".format(result.seconds * 1e3, result.filename))
+
+    cpu = sum(result.cpu for result in results)
+    size = sum(result.size for result in results)
+    print("{0} files, {1} failed, {2:.1f} kB in {3:.3f} s on {4} workers: {5:.0f} files/s, "
+          "{6:.3f} s CPU in the workers ({7:.1f}x parallel)".format(
+              len(results), len(failed), size / 1e3, elapsed, args.jobs, len(results) / elapsed, cpu,
+              cpu / elapsed))
+
+    if ast_cache is not None:
+        hits = sum(result.cached for result in results)
+        count, size = Cache.ASTCache(*ast_cache).usage()
+        print("AST cache {0}: {1} hits, {2} misses; {3} entries, {4:.1f} of {5:.1f} MB".format(
+            args.ast_cache, hits, len(results) - hits, count, size / 2 ** 20, args.ast_cache_size))
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1 @@
+__all__ = ["parse_scaling", "startup", "token_positions", "interpreter", "bytecode", "optimizer", "ast_memory", "tree_printer", "incremental", "batch", "ast_cache", "binary_ast", "scanner_stream", "stream_parse", "syntax_errors", "scanner_backends", "token_arrays", "type_checker", "interning", "sparse_matrices", "element_wise", "loop_vectorization", "parallel_statements", "profiler_overhead"]
@@ -0,0 +1,65 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.parse_scaling import generate_program
+from parser import Cache, Mparser
+from scanner import scanner
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZES = [1000, 10000, 100000]
+RUNS = 5
+
+
+def run(*args):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(ROOT, "parser.py")] + list(args),
+                   cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    directory = tempfile.mkdtemp()
+
+    lexer = scanner.Scanner()
+    lexer.build()
+    parser = Mparser.Parser(lexer, debug=False, write_tables=False)
+
+    try:
+        print("{0:>10} {1:>12} {2:>12} {3:>12} {4:>14}".format(
+            "statements", "parse [ms]", "load [ms]", "store [ms]", "entry/source"))
+        for statements in sizes:
+            text = generate_program(statements)
+            cache = Cache.ASTCache(directory)
+
+            start = time.perf_counter()
+            ast = parser.parse(text, lexer=lexer)
+            parsing = time.perf_counter() - start
+
+            start = time.perf_counter()
+            cache.store(text, ast)
+            storing = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(RUNS):
+                cache.load(text)
+            loading = (time.perf_counter() - start) / RUNS
+
+            print("{0:>10} {1:>12.1f} {2:>12.1f} {3:>12.1f} {4:>14.2f}".format(
+                statements, parsing * 1e3, loading * 1e3, storing * 1e3, cache.usage()[1] / len(text)))
+            cache.clear()
+
+        # whole runs of parser.py, where a hit also skips importing PLY and loading its tables
+        filename = os.path.join(directory, "program.txt")
+        with open(filename, "w") as file:
+            file.write(generate_program(sizes[0]))
+        run(filename, "--ast-cache", directory)
+        warm = min(run(filename, "--ast-cache", directory) for _ in range(RUNS))
+        print("parser.py on {0} statements: {1:.1f} ms without the cache, {2:.1f} ms on a hit".format(
+            sizes[0], min(run(filename) for _ in range(RUNS)) * 1e3, warm * 1e3))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
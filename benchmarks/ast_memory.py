@@ -0,0 +1,86 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the tree being measured, so it only relies on what every revision of it provides.
+MEASURE = """
+import json
+import sys
+import tracemalloc
+
+from parser import Mparser
+from scanner import scanner
+
+
+def fields(node):
+    if hasattr(node, '__dict__'):
+        return list(vars(node).values())
+    return [getattr(node, name, None) for cls in type(node).__mro__ for name in getattr(cls, '__slots__', ())]
+
+
+def count_nodes(root):
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        for value in fields(node):
+            if isinstance(value, list):
+                stack.extend(item for item in value if type(item).__module__ == 'parser.ast.AST')
+            elif type(value).__module__ == 'parser.ast.AST':
+                stack.append(value)
+    return count
+
+
+statements = int(sys.argv[1])
+text = "\\n".join("x{0} = {0} + y * [1, 2.5, 3; 4, 5, 6] - z';".format(i) for i in range(statements))
+
+lexer = scanner.Scanner()
+lexer.build()
+parser = Mparser.Parser(lexer, debug=False, write_tables=False)
+
+tracemalloc.start()
+before = tracemalloc.get_traced_memory()[0]
+ast = parser.parse(text, lexer=lexer)
+after = tracemalloc.get_traced_memory()[0]
+tracemalloc.stop()
+
+print(json.dumps({'nodes': count_nodes(ast), 'bytes': after - before, 'source': len(text)}))
+"""
+
+
+def measure(root, statements):
+    output = subprocess.run([sys.executable, "-c", MEASURE, str(statements)], cwd=root, check=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+    return json.loads(output)
+
+
+def measure_revision(revision, statements):
+    with tempfile.TemporaryDirectory() as root:
+        archive = subprocess.run(["git", "archive", revision], cwd=ROOT, check=True, stdout=subprocess.PIPE).stdout
+        subprocess.run(["tar", "-x", "-C", root], input=archive, check=True)
+        return measure(root, statements)
+
+
+def report(label, result):
+    print("{0:>12} {1:>10} {2:>14} {3:>12.1f} {4:>16.1f}".format(
+        label, result['nodes'], result['bytes'], result['bytes'] / result['nodes'],
+        result['bytes'] / result['source']))
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Memory taken by the AST of a generated program.")
+    arg_parser.add_argument('statements', nargs='?', type=int, default=100000)
+    arg_parser.add_argument('--baseline', metavar='REVISION', help="also measure the tree at this git revision")
+    args = arg_parser.parse_args()
+
+    print("{0:>12} {1:>10} {2:>14} {3:>12} {4:>16}".format("tree", "nodes", "bytes", "bytes/node",
+                                                            "bytes/source byte"))
+    if args.baseline:
+        report(args.baseline, measure_revision(args.baseline, args.statements))
+    report("working tree", measure(ROOT, args.statements))
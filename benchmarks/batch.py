@@ -0,0 +1,59 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from parser import Batch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FILES = 2000
+# Files run through parser.py one process at a time, which is slow enough that a sample will do
+SAMPLE = 20
+
+
+def write_files(directory, count):
+    with open(os.path.join(ROOT, "examples", "full.txt")) as file:
+        text = file.read()
+    for i in range(count):
+        with open(os.path.join(directory, "program{0}.txt".format(i)), "w") as file:
+            file.write(text)
+    return Batch.find_files([directory])
+
+
+def process_per_file(filenames):
+    start = time.perf_counter()
+    for filename in filenames:
+        subprocess.run([sys.executable, os.path.join(ROOT, "parser.py"), filename],
+                       cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return len(filenames) / (time.perf_counter() - start)
+
+
+def batch(filenames, jobs, cache_dir):
+    start = time.perf_counter()
+    Batch.compile_files(filenames, jobs=jobs, cache_dir=cache_dir)
+    return len(filenames) / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else FILES
+    directory = tempfile.mkdtemp()
+    cache_dir = tempfile.mkdtemp()
+    try:
+        filenames = write_files(directory, count)
+        results = [("parser.py per file", process_per_file(filenames[:SAMPLE]))]
+
+        jobs = 1
+        while True:
+            results.append(("batch, {0} jobs".format(jobs), batch(filenames, jobs, cache_dir)))
+            if jobs >= os.cpu_count():
+                break
+            jobs = min(jobs * 2, os.cpu_count())
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print("{0:>20} {1:>10} {2:>10}".format("mode", "files/s", "speedup"))
+    for mode, rate in results:
+        print("{0:>20} {1:>10.0f} {2:>10.1f}".format(mode, rate, rate / results[1][1]))
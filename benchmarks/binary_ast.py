@@ -0,0 +1,53 @@
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+from benchmarks.parse_scaling import generate_program
+from parser import Mparser
+from parser.Cache import paused_gc
+from parser.ast import Binary
+from scanner import scanner
+
+SIZES = [1000, 10000, 100000]
+
+
+def timed(function):
+    start = time.perf_counter()
+    with paused_gc():
+        result = function()
+    return result, (time.perf_counter() - start) * 1e3
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+
+    lexer = scanner.Scanner()
+    lexer.build()
+    parser = Mparser.Parser(lexer, debug=False, write_tables=False)
+
+    print("{0:>10} {1:>10} {2:>12} {3:>12} {4:>12} {5:>12} {6:>12} {7:>12}".format(
+        "statements", "parse", "pickle load", "binary dump", "open", "first stmt", "build all", "size/pickle"))
+    for statements in sizes:
+        ast = parser.parse(generate_program(statements), lexer=lexer)
+
+        pickled = pickle.dumps(ast, pickle.HIGHEST_PROTOCOL)
+        _, parsing = timed(lambda: parser.parse(generate_program(statements), lexer=lexer))
+        _, unpickling = timed(lambda: pickle.loads(pickled))
+
+        data, dumping = timed(lambda: Binary.dumps(ast))
+        descriptor, path = tempfile.mkstemp(suffix=Binary.SUFFIX)
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(data)
+            reader, opening = timed(lambda: Binary.load(path))
+            _, first = timed(lambda: next(reader.statements()))
+            _, building = timed(lambda: reader.program)
+            reader.close()
+        finally:
+            os.remove(path)
+
+        print("{0:>10} {1:>10.1f} {2:>12.1f} {3:>12.1f} {4:>12.2f} {5:>12.2f} {6:>12.1f} {7:>12.2f}".format(
+            statements, parsing, unpickling, dumping, opening, first, building, len(data) / len(pickled)))
+    print("times in ms")
@@ -0,0 +1,61 @@
+import sys
+import time
+
+from interpreter import Compiler, Interpreter, VirtualMachine
+from parser import Mparser
+from scanner import scanner
+
+SIZES = [100, 300, 1000]
+
+# the loops of examples/control_flow.txt, with N and M scaled up and no printing
+PROGRAM = """
+N = {0};
+M = {0};
+s = 0;
+
+k = N * M;
+while(k>0)
+    k = k - 1;
+
+for i = 1:N
+  for j = i:M
+    s += j;
+
+for i = 1:N {{
+    if(i<=N/16)
+        s = s + 1;
+    else if(i<=N/8)
+        s = s - 1;
+    else if(i<=N/4)
+        continue;
+    else if(i<=N/2)
+        break;
+}}
+"""
+
+
+def measure(run):
+    start = time.perf_counter()
+    memory = run()
+    return time.perf_counter() - start, memory.variables['s']
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+
+    lexer = scanner.Scanner()
+    lexer.build()
+    parser = Mparser.Parser(lexer, debug=False, write_tables=False)
+
+    print("{0:>6} {1:>12} {2:>10} {3:>10} {4:>8}".format("N", "iterations", "ast [s]", "vm [s]", "speedup"))
+    for size in sizes:
+        ast = parser.parse(PROGRAM.format(size), lexer=lexer)
+
+        walked, expected = measure(lambda: Interpreter.run(ast))
+        code = Compiler.compile_program(ast)
+        compiled, result = measure(lambda: VirtualMachine.run(code))
+        assert result == expected
+
+        iterations = size * size + size * (size + 1) // 2
+        print("{0:>6} {1:>12} {2:>10.3f} {3:>10.3f} {4:>8.2f}".format(size, iterations, walked, compiled,
+                                                                       walked / compiled))
@@ -0,0 +1,63 @@
+import io
+import sys
+import time
+import tracemalloc
+
+from interpreter import Fusion, Interpreter
+from interpreter.Memory import Memory
+from parser import Mparser
+from scanner import scanner
+
+SIZES = [500, 1000, 2000]
+
+# Matrices built once, then a long element-wise chain, one with a transpose and in-place updates.
+# Only the part after SETUP is measured.
+SETUP = """
+A = ones({0}) .* 1.5;
+B = ones({0}) ./ 3;
+D = ones({0}) + 2;
+E = ones({0}) * 4;
+A[1, 2] = 7;
+"""
+
+PROGRAM = """
+C = A.*B .+ D./E' - A .* 2 + B ./ 3 - D .* E + A .- B ./ D .+ E .* 0.5 - A ./ E;
+C += A .* B - D;
+C *= 0.5;
+print C[1, 1], C[1, 2], C[2, 1];
+"""
+
+
+# Time to run and peak memory traced beyond what the setup allocated
+def measure(setup, ast):
+    memory = Memory(io.StringIO())
+    Interpreter.run(setup, memory)
+    tracemalloc.start()
+    start = time.perf_counter()
+    Interpreter.run(ast, memory)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, memory.output.getvalue().split()
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+
+    lexer = scanner.Scanner()
+    lexer.build()
+    parser = Mparser.Parser(lexer, debug=False, write_tables=False)
+    ast = parser.parse(PROGRAM, lexer=lexer)
+    min_size = Fusion.MIN_SIZE
+
+    print("{0:>6} {1:>8} {2:>10} {3:>12}".format("size", "mode", "time [s]", "peak [MB]"))
+    for size in sizes:
+        setup = parser.parse(SETUP.format(size), lexer=lexer)
+        results = []
+        for name, fused_size in (("naive", float('inf')), ("fused", min_size)):
+            Fusion.MIN_SIZE = fused_size
+            elapsed, peak, printed = measure(setup, ast)
+            results.append(printed)
+            print("{0:>6} {1:>8} {2:>10.3f} {3:>12.1f}".format(size, name, elapsed, peak / 2 ** 20))
+        Fusion.MIN_SIZE = min_size
+        assert all(printed == results[0] for printed in results), "naive and fused results differ"
@@ -0,0 +1,74 @@
+import random
+import statistics
+import sys
+import time
+
+from parser import Mparser
+from parser.Incremental import IncrementalParser
+from scanner import scanner
+
+LINES = 50000
+EDITS = 200
+
+
+def generate_program(statements):
+    lines = []
+    for i in range(statements):
+        lines.append("x{0} = {0} + y * [1, 2, 3; 4, 5, 6];".format(i))
+    return "\n".join(lines) + "\n"
+
+
+# Where the number added in the statement at line starts and ends; both names and numbers grow with the line count
+def number_span(text, line):
+    end = text.index(" + y", line)
+    return text.rindex(" ", line, end) + 1, end
+
+
+# (name, edit) pairs: each edit takes the text and a line offset and returns (start, end, replacement)
+EDIT_KINDS = [
+    ("retype a number", lambda text, line: number_span(text, line) + ("7",)),
+    ("insert a term", lambda text, line: (text.index(" + y", line), text.index(" + y", line), " + 1")),
+    ("delete a statement", lambda text, line: (line, text.index("\n", line) + 1, "")),
+    ("insert a line", lambda text, line: (line, line, "z = 1;\n")),
+]
+
+
+def measure(incremental, kind, rng):
+    times = []
+    for _ in range(EDITS):
+        text = incremental.text
+        line = text.rfind("\n", 0, rng.randrange(len(text) // 2, len(text))) + 1
+        start, end, replacement = kind(text, line)
+
+        begin = time.perf_counter()
+        incremental.edit(start, end, replacement)
+        times.append(time.perf_counter() - begin)
+    return times
+
+
+if __name__ == '__main__':
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else LINES
+    text = generate_program(lines)
+
+    lexer = scanner.Scanner()
+    lexer.build()
+    parser = Mparser.Parser(lexer, debug=False, write_tables=False)
+
+    start = time.perf_counter()
+    parser.parse(text, lexer=lexer)
+    print("full parse of {0} lines: {1:.3f} s".format(lines, time.perf_counter() - start))
+
+    incremental = IncrementalParser(parser, lexer)
+    start = time.perf_counter()
+    incremental.parse(text)
+    print("incremental initial parse: {0:.3f} s".format(time.perf_counter() - start))
+
+    rng = random.Random(0)
+    print("{0:>20} {1:>12} {2:>12} {3:>16}".format("edit", "median [us]", "max [us]", "read AST [us]"))
+    for name, kind in EDIT_KINDS:
+        times = measure(incremental, kind, rng)
+        start = time.perf_counter()
+        incremental.program
+        read = time.perf_counter() - start
+        print("{0:>20} {1:>12.1f} {2:>12.1f} {3:>16.1f}".format(
+            name, statistics.median(times) * 1e6, max(times) * 1e6, read * 1e6))
@@ -0,0 +1,61 @@
+import sys
+import time
+import tracemalloc
+
+from parser import Mparser
+from parser.ast.Interner import Interner, structural_hash
+from parser.ast.Walker import walk
+from scanner import scanner
+
+STATEMENTS = 50000
+
+# Statements of a generated script, which repeat the same few subexpressions
+TEMPLATES = [
+    "x{0} = A .* B + eye(10);",
+    "y{0} = [1, 2, 3; 4, 5, 6] * C;",
+    "z{0} = A .* B - B' + {1};",
+    "print A .* B, [1, 2, 3; 4, 5, 6];",
+]
+
+
+def generate_program(statements):
+    return "\n".join(TEMPLATES[i % len(TEMPLATES)].format(i, i % 10) for i in range(statements))
+
+
+def distinct_nodes(root):
+    return len({id(node) for node, entering in walk(root) if entering})
+
+
+# Time to parse and memory the tree keeps, as allocated while parsing less what was freed by the end
+def measure(lexer, parser, text):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    ast = parser.parse(text, lexer=lexer)
+    kept = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    parser.parse(text, lexer=lexer)
+    return ast, time.perf_counter() - start, kept
+
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else STATEMENTS
+    text = generate_program(statements)
+
+    lexer = scanner.Scanner()
+    lexer.build()
+
+    print("{0:>8} {1:>10} {2:>10} {3:>12} {4:>10} {5:>10}".format(
+        "interned", "nodes", "parse [s]", "kept [MB]", "hash [s]", "hash"))
+    for interner in (None, Interner()):
+        parser = Mparser.Parser(lexer, debug=False, write_tables=False, interner=interner)
+        ast, elapsed, kept = measure(lexer, parser, text)
+
+        start = time.perf_counter()
+        digest = interner.hash(ast) if interner is not None else structural_hash(ast)
+        hashing = time.perf_counter() - start
+
+        print("{0:>8} {1:>10} {2:>10.2f} {3:>12.1f} {4:>10.2f} {5:>10x}".format(
+            "yes" if interner is not None else "no", distinct_nodes(ast), elapsed, kept / 2 ** 20, hashing,
+            digest))
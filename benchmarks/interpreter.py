@@ -0,0 +1,71 @@
+import sys
+import time
+
+import numpy as np
+
+from interpreter import Interpreter
+from parser import Mparser
+from scanner import scanner
+
+SIZES = [100, 300, 1000]
+REPEAT = 20
+
+# examples/full.txt with every matrix made size x size so all operations are well defined
+BLOCK = """
+A = ones({0});
+B = eye({0});
+C = -A;
+C = B';
+C = A+B;
+C = A-B;
+C = A*B;
+C = A.+B;
+C = A.-B;
+C = A.*B;
+C = A./B;
+C += B;
+C -= B;
+C *= A;
+"""
+
+
+def numpy_block(size):
+    A = np.ones((size, size))
+    B = np.eye(size)
+    C = -A
+    C = B.T.copy()
+    C = A + B
+    C = A - B
+    C = A @ B
+    C = A + B
+    C = A - B
+    C = A * B
+    C = A / B
+    C = C + B
+    C = C - B
+    C = C @ A
+    return C
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+
+    lexer = scanner.Scanner()
+    lexer.build()
+    parser = Mparser.Parser(lexer, debug=False, write_tables=False)
+
+    print("{0:>6} {1:>16} {2:>12} {3:>8}".format("size", "interpreter [s]", "numpy [s]", "ratio"))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for size in sizes:
+            ast = parser.parse(BLOCK.format(size) * REPEAT, lexer=lexer)
+
+            start = time.perf_counter()
+            Interpreter.run(ast)
+            interpreted = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(REPEAT):
+                numpy_block(size)
+            native = time.perf_counter() - start
+
+            print("{0:>6} {1:>16.3f} {2:>12.3f} {3:>8.2f}".format(size, interpreted, native, interpreted / native))
@@ -0,0 +1,53 @@
+import io
+import sys
+import time
+
+from interpreter import Interpreter, Vectorizer
+from interpreter.Memory import Memory
+from parser import Mparser
+from scanner import scanner
+
+SIZES = [1000, 10000, 100000]
+
+# Sums and element updates whose iterations are independent, and a loop that reads what it assigns, which is not
+# vectorized and takes as long either way
+PROGRAM = """
+s = 0;
+t = 0.5;
+A = zeros(4);
+for i = 1:{0} {{
+    s += i * 3 - 1;
+    t += i / 7;
+    A[2, 3] += i .* 0.5;
+    last = i * i;
+}}
+k = 0;
+for i = 1:100
+    k = k + i;
+print s, t, A[2, 3], last, k;
+"""
+
+
+def measure(ast):
+    memory = Memory(io.StringIO())
+    start = time.perf_counter()
+    Interpreter.run(ast, memory)
+    return time.perf_counter() - start, memory.output.getvalue()
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+
+    lexer = scanner.Scanner()
+    lexer.build()
+    parser = Mparser.Parser(lexer, debug=False, write_tables=False)
+
+    print("{0:>8} {1:>12} {2:>12} {3:>8}".format("size", "loop [s]", "vector [s]", "speedup"))
+    for size in sizes:
+        text = PROGRAM.format(size)
+        looped, expected = measure(parser.parse(text, lexer=lexer))
+        ast, report = Vectorizer.vectorize(parser.parse(text, lexer=lexer))
+        vectorized, result = measure(ast)
+        assert result == expected, "vectorized loops printed {0!r} instead of {1!r}".format(result, expected)
+        print("{0:>8} {1:>12.4f} {2:>12.4f} {3:>8.1f}".format(size, looped, vectorized, looped / vectorized))
+    print("\n".join(report))
@@ -0,0 +1,55 @@
+import sys
+import time
+
+from interpreter import Compiler, Interpreter, Optimizer, VirtualMachine
+from parser import Mparser
+from scanner import scanner
+
+SIZES = [10, 100, 300]
+ITERATIONS = 200
+
+# the kind of code our generators emit: literal arithmetic and operations with identity matrices
+PROGRAM = """
+A = ones({0});
+B = eye({0});
+for i = 1:{1} {{
+    C = eye({0}) * A;
+    D = zeros({0}) .+ B;
+    E = ones({0}) .* C * eye({0});
+    F = A' * eye({0});
+    s = 2 * 3 + 4 / 2 - 1 * 8;
+    t = s * 1 + 0;
+}}
+"""
+
+
+def measure(run):
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+
+    lexer = scanner.Scanner()
+    lexer.build()
+    parser = Mparser.Parser(lexer, debug=False, write_tables=False)
+
+    print("{0:>6} {1:>8} {2:>10} {3:>10} {4:>8} {5:>10} {6:>10} {7:>8}".format(
+        "size", "removed", "ast [s]", "simple [s]", "speedup", "vm [s]", "simple [s]", "speedup"))
+    for size in sizes:
+        text = PROGRAM.format(size, ITERATIONS)
+        original = parser.parse(text, lexer=lexer)
+        simplified, removed = Optimizer.optimize(parser.parse(text, lexer=lexer))
+
+        walked = measure(lambda: Interpreter.run(original))
+        walked_simple = measure(lambda: Interpreter.run(simplified))
+
+        code, code_simple = Compiler.compile_program(original), Compiler.compile_program(simplified)
+        compiled = measure(lambda: VirtualMachine.run(code))
+        compiled_simple = measure(lambda: VirtualMachine.run(code_simple))
+
+        print("{0:>6} {1:>8} {2:>10.3f} {3:>10.3f} {4:>8.2f} {5:>10.3f} {6:>10.3f} {7:>8.2f}".format(
+            size, removed, walked, walked_simple, walked / walked_simple,
+            compiled, compiled_simple, compiled / compiled_simple))
@@ -0,0 +1,50 @@
+import io
+import os
+import sys
+import time
+
+from interpreter import Interpreter, Scheduler
+from interpreter.Memory import Memory
+from parser import Mparser
+from scanner import scanner
+
+SIZES = [500, 1000, 2000]
+
+# Independent chains of construction and element-wise work on separate variables, joined at the end
+CHAIN = """
+X{1} = ones({0}) .* {1};
+Y{1} = X{1} ./ 3 + X{1} .* X{1} - X{1}' .* 0.5;
+Z{1} = Y{1} .* Y{1} + X{1};
+"""
+
+CHAINS = 4
+
+JOIN = """
+print Z1[1, 2] + Z2[2, 1] + Z3[3, 3] + Z4[4, 4];
+"""
+
+
+def measure(run, ast):
+    memory = Memory(io.StringIO())
+    start = time.perf_counter()
+    run(ast, memory)
+    return time.perf_counter() - start, memory.output.getvalue()
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    workers = Scheduler.default_workers()
+
+    lexer = scanner.Scanner()
+    lexer.build()
+    parser = Mparser.Parser(lexer, debug=False, write_tables=False)
+
+    print("{0} cores".format(os.cpu_count()))
+    print("{0:>6} {1:>14} {2:>14} {3:>8}".format("size", "in order [s]", "parallel [s]", "speedup"))
+    for size in sizes:
+        text = "".join(CHAIN.format(size, chain) for chain in range(1, CHAINS + 1)) + JOIN
+        ast = parser.parse(text, lexer=lexer)
+        in_order, expected = measure(Interpreter.run, ast)
+        parallel, result = measure(lambda ast, memory: Scheduler.run(ast, memory, workers), ast)
+        assert result == expected, "parallel run printed {0!r} instead of {1!r}".format(result, expected)
+        print("{0:>6} {1:>14.3f} {2:>14.3f} {3:>8.2f}".format(size, in_order, parallel, in_order / parallel))
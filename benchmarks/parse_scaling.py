@@ -0,0 +1,38 @@
+import sys
+import time
+
+from parser import Mparser
+from scanner import scanner
+
+SIZES = [1000, 10000, 100000]
+
+
+def generate_program(statements):
+    lines = []
+    for i in range(statements):
+        lines.append("x{0} = {0} + y * [1, 2, 3; 4, 5, 6];".format(i))
+    return "\n".join(lines)
+
+
+def measure(parser, lexer, statements):
+    text = generate_program(statements)
+
+    start = time.perf_counter()
+    ast = parser.parse(text, lexer=lexer)
+    elapsed = time.perf_counter() - start
+
+    assert len(ast.children) == statements
+    return elapsed
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+
+    lexer = scanner.Scanner()
+    lexer.build()
+    parser = Mparser.Parser(lexer, debug=False, write_tables=False)
+
+    print("{0:>10} {1:>12} {2:>16}".format("statements", "total [s]", "per stmt [us]"))
+    for size in sizes:
+        elapsed = measure(parser, lexer, size)
+        print("{0:>10} {1:>12.3f} {2:>16.2f}".format(size, elapsed, elapsed / size * 1e6))
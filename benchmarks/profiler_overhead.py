@@ -0,0 +1,56 @@
+import io
+import sys
+import time
+
+from interpreter import Interpreter
+from interpreter.Memory import Memory
+from interpreter.Profiler import Profiler
+from parser import Mparser
+from scanner import scanner
+
+ITERATIONS = [10000, 50000]
+
+# A scalar loop, where every evaluation is a few operations and the cost of profiling shows the most
+PROGRAM = """
+s = 0;
+for i = 1:{0} {{
+    s += i * 2 - 1;
+}}
+print s;
+"""
+
+
+def measure(ast):
+    memory = Memory(io.StringIO())
+    start = time.perf_counter()
+    Interpreter.run(ast, memory)
+    return time.perf_counter() - start, memory.output.getvalue()
+
+
+def profiled(ast, memory):
+    with Profiler(memory) as profiler:
+        result = measure(ast)
+    return result, profiler
+
+
+if __name__ == '__main__':
+    iterations = [int(arg) for arg in sys.argv[1:]] or ITERATIONS
+
+    lexer = scanner.Scanner()
+    lexer.build()
+    parser = Mparser.Parser(lexer, debug=False, write_tables=False)
+
+    print("{0:>8} {1:>12} {2:>12} {3:>12} {4:>12}".format(
+        "size", "plain [s]", "time [s]", "memory [s]", "after [s]"))
+    for size in iterations:
+        ast = parser.parse(PROGRAM.format(size), lexer=lexer)
+        plain, expected = measure(ast)
+        (timed, result), profiler = profiled(ast, False)
+        assert result == expected, "profiled run printed {0!r} instead of {1!r}".format(result, expected)
+        (traced, result), _ = profiled(ast, True)
+        assert result == expected, "profiled run printed {0!r} instead of {1!r}".format(result, expected)
+        # once disabled, the program runs the same code as before profiling
+        after, result = measure(ast)
+        print("{0:>8} {1:>12.4f} {2:>12.4f} {3:>12.4f} {4:>12.4f}".format(size, plain, timed, traced, after))
+    print()
+    print(profiler.report(limit=8))
@@ -0,0 +1,56 @@
+import itertools
+import sys
+import time
+
+from benchmarks.token_positions import generate_source
+from parser import Mparser
+from scanner import scanner
+
+SIZES = [10000, 100000, 1000000]
+
+
+def tokenize(lexer, text):
+    lexer.input(text)
+    start = time.perf_counter()
+    count = sum(1 for _ in iter(lexer.token, None))
+    return count, time.perf_counter() - start
+
+
+def parse(lexer, parser, text):
+    start = time.perf_counter()
+    parser.parse(text, lexer=lexer)
+    return time.perf_counter() - start
+
+
+def fields(token):
+    return token.type, token.value, token.lineno, token.lexpos, token.column
+
+
+# Compares the backends' tokens one at a time, as keeping every token of a big input would take most of the memory
+def same_tokens(lexers, text):
+    for lexer in lexers:
+        lexer.input(text)
+    streams = [map(fields, iter(lexer.token, None)) for lexer in lexers]
+    return all(len(set(tokens)) == 1 for tokens in itertools.zip_longest(*streams))
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+
+    lexers = {}
+    parsers = {}
+    for backend in scanner.BACKENDS:
+        lexers[backend] = scanner.Scanner(backend)
+        lexers[backend].build()
+        parsers[backend] = Mparser.Parser(lexers[backend], debug=False, write_tables=False)
+
+    print("{0:>10} {1:>8} {2:>10} {3:>14} {4:>12} {5:>12}".format(
+        "statements", "scanner", "tokens", "tokens/s", "lex [s]", "parse [s]"))
+    for size in sizes:
+        text = generate_source(size, "\n")
+        assert same_tokens(lexers.values(), text), "scanner backends disagree"
+        for backend in scanner.BACKENDS:
+            count, elapsed = tokenize(lexers[backend], text)
+            parsing = parse(lexers[backend], parsers[backend], text)
+            print("{0:>10} {1:>8} {2:>10} {3:>14.0f} {4:>12.3f} {5:>12.3f}".format(
+                size, backend, count, count / elapsed, elapsed, parsing))
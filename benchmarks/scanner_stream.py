@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.token_positions import generate_source
+from scanner import scanner
+
+STATEMENTS = 100000
+
+
+def read_whole(lexer, path):
+    with open(path) as file:
+        lexer.input(file.read())
+        return sum(1 for _ in iter(lexer.token, None))
+
+
+def stream(lexer, path):
+    with open(path) as file:
+        return sum(1 for _ in lexer.stream(file))
+
+
+# Time is measured on a second run without tracing allocations, which slows the scanner down several times
+def measure(function, lexer, path):
+    tracemalloc.start()
+    function(lexer, path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    count = function(lexer, path)
+    return count, time.perf_counter() - start, peak
+
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else STATEMENTS
+
+    lexer = scanner.Scanner()
+    lexer.build()
+
+    descriptor, path = tempfile.mkstemp(suffix='.txt')
+    try:
+        with os.fdopen(descriptor, 'w') as file:
+            file.write(generate_source(statements, "\n"))
+        size = os.path.getsize(path)
+
+        print("{0:.1f} MB of source".format(size / 2 ** 20))
+        print("{0:>12} {1:>10} {2:>10} {3:>14}".format("input", "tokens", "time [s]", "peak [MB]"))
+        for name, function in [("file.read()", read_whole), ("stream", stream)]:
+            count, elapsed, peak = measure(function, lexer, path)
+            print("{0:>12} {1:>10} {2:>10.2f} {3:>14.2f}".format(name, count, elapsed, peak / 2 ** 20))
+    finally:
+        os.remove(path)
@@ -0,0 +1,63 @@
+import io
+import sys
+import time
+import tracemalloc
+
+from interpreter import Interpreter, Matrices
+from interpreter.Memory import Memory
+from parser import Mparser
+from scanner import scanner
+
+SIZES = [1000, 3000, 10000]
+
+# Dense matrices of a size this large or more are not measured, as the program would need gigabytes
+MAX_DENSE_SIZE = 5000
+
+# An identity-like system built with eye, zeros and element writes, as generated programs do
+PROGRAM = """
+A = eye({0});
+B = zeros({0});
+B[1, 2] = 3;
+B[{0}, 1] = 4;
+C = A * B + A;
+D = C * C;
+E = D .* 2 - A;
+F = E / C;
+print D[1, 2], E[{0}, 1], F[1, 1];
+"""
+
+
+# Time to run and peak memory traced, which includes NumPy's and SciPy's arrays
+def measure(ast):
+    memory = Memory(io.StringIO())
+    tracemalloc.start()
+    start = time.perf_counter()
+    Interpreter.run(ast, memory)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, memory.output.getvalue().split()
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+
+    lexer = scanner.Scanner()
+    lexer.build()
+    parser = Mparser.Parser(lexer, debug=False, write_tables=False)
+    sparse_size = Matrices.MIN_SPARSE_SIZE
+
+    print("{0:>6} {1:>8} {2:>10} {3:>12}".format("size", "matrices", "time [s]", "peak [MB]"))
+    for size in sizes:
+        ast = parser.parse(PROGRAM.format(size), lexer=lexer)
+        results = []
+        for name, min_size in (("dense", float('inf')), ("sparse", sparse_size)):
+            if name == "dense" and size >= MAX_DENSE_SIZE:
+                print("{0:>6} {1:>8} {2:>10} {3:>12}".format(size, name, "-", "-"))
+                continue
+            Matrices.MIN_SPARSE_SIZE = min_size
+            elapsed, peak, printed = measure(ast)
+            results.append(printed)
+            print("{0:>6} {1:>8} {2:>10.3f} {3:>12.1f}".format(size, name, elapsed, peak / 2 ** 20))
+        Matrices.MIN_SPARSE_SIZE = sparse_size
+        assert all(printed == results[0] for printed in results), "dense and sparse results differ"
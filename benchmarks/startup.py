@@ -0,0 +1,48 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 10
+
+
+def run(*args):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(ROOT, "parser.py")] + list(args),
+                   cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+def measure(runs, prepare, *args):
+    timings = []
+    for _ in range(runs):
+        prepare()
+        timings.append(run(*args))
+    return min(timings), sum(timings) / len(timings)
+
+
+if __name__ == '__main__':
+    filename = sys.argv[1] if len(sys.argv) > 1 else "examples/full.txt"
+    cache_dir = tempfile.mkdtemp()
+
+    def no_cache():
+        pass
+
+    def cold_cache():
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    try:
+        results = [
+            ("default", measure(RUNS, no_cache, filename)),
+            ("cold cache", measure(RUNS, cold_cache, filename, "--table-cache", cache_dir)),
+            ("warm cache", measure(RUNS, no_cache, filename, "--table-cache", cache_dir)),
+        ]
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print("{0:>12} {1:>10} {2:>10}".format("mode", "min [ms]", "mean [ms]"))
+    for mode, (best, mean) in results:
+        print("{0:>12} {1:>10.1f} {2:>10.1f}".format(mode, best * 1e3, mean * 1e3))
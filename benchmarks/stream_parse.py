@@ -0,0 +1,67 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.parse_scaling import generate_program
+from parser import Mparser
+from scanner import scanner
+from scanner.scanner import TokenFeed
+
+STATEMENTS = 20000
+
+
+# Whole program at once: the first statement is only available with the last
+def parse_whole(parser, lexer, path):
+    with open(path) as file:
+        start = time.perf_counter()
+        program = parser.parse(file.read(), lexer=lexer)
+        return time.perf_counter() - start, len(program.children)
+
+
+def parse_streamed(parser, lexer, path):
+    with open(path) as file:
+        start = time.perf_counter()
+        first = None
+        count = 0
+        for block in parser.parse_statements(TokenFeed(lexer.stream(file))):
+            if first is None:
+                first = time.perf_counter() - start
+            count += len(block.children)
+        return first, count
+
+
+def measure(function, parser, lexer, path):
+    start = time.perf_counter()
+    first, count = function(parser, lexer, path)
+    total = time.perf_counter() - start
+
+    # traced separately, as tracing allocations slows parsing down several times
+    tracemalloc.start()
+    function(parser, lexer, path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, first, total, peak
+
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else STATEMENTS
+
+    lexer = scanner.Scanner()
+    lexer.build()
+    parser = Mparser.Parser(lexer, debug=False, write_tables=False)
+
+    descriptor, path = tempfile.mkstemp(suffix='.txt')
+    try:
+        with os.fdopen(descriptor, 'w') as file:
+            file.write(generate_program(statements))
+
+        print("{0:>10} {1:>12} {2:>16} {3:>10} {4:>10}".format(
+            "parse", "statements", "first [ms]", "total [s]", "peak [MB]"))
+        for name, function in [("whole", parse_whole), ("streamed", parse_streamed)]:
+            count, first, total, peak = measure(function, parser, lexer, path)
+            print("{0:>10} {1:>12} {2:>16.2f} {3:>10.2f} {4:>10.2f}".format(
+                name, count, first * 1e3, total, peak / 2 ** 20))
+    finally:
+        os.remove(path)
@@ -0,0 +1,59 @@
+import sys
+import time
+
+from parser import Mparser
+from scanner import scanner
+
+LINES = 50000
+ERRORS = [1, 10, 50]
+
+
+# A program of lines statements with a syntax error in every lines/errors-th one
+def generate_program(lines, errors):
+    step = lines // errors
+    program = []
+    for i in range(lines):
+        if i % step == step // 2:
+            program.append("x{0} = {0} + * y;".format(i))
+        else:
+            program.append("x{0} = {0} + y * [1, 2, 3; 4, 5, 6];".format(i))
+    return program
+
+
+def parse(parser, lexer, text):
+    try:
+        parser.parse(text, lexer=lexer)
+    except Mparser.ParseErrors as e:
+        return e.errors
+    return []
+
+
+# Time to see every error when a parse stops at the first one: each run gets up to the next error, which is then
+# fixed, and a last run checks the whole program. Parsing the text up to an error stands in for such a run.
+def one_error_per_run(parser, lexer, program, errors):
+    start = time.perf_counter()
+    for error in errors:
+        line = int(error.split()[4].rstrip(','))
+        parse(parser, lexer, "\n".join(program[:line]))
+    parse(parser, lexer, "\n".join(program))
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else LINES
+
+    lexer = scanner.Scanner()
+    lexer.build()
+    parser = Mparser.Parser(lexer, debug=False, write_tables=False)
+
+    print("{0:>10} {1:>10} {2:>16} {3:>20}".format("lines", "errors", "one parse [s]", "one per run [s]"))
+    for count in ERRORS:
+        program = generate_program(lines, count)
+
+        start = time.perf_counter()
+        errors = parse(parser, lexer, "\n".join(program))
+        elapsed = time.perf_counter() - start
+        assert len(errors) == count
+
+        print("{0:>10} {1:>10} {2:>16.2f} {3:>20.2f}".format(
+            lines, len(errors), elapsed, one_error_per_run(parser, lexer, program, errors)))
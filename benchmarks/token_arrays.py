@@ -0,0 +1,45 @@
+import sys
+import time
+import tracemalloc
+
+from benchmarks.token_positions import generate_source
+from scanner import scanner
+
+STATEMENTS = 100000
+
+
+# Counting identifiers, as a tool scanning tokens would, from token objects or from arrays
+def count_objects(lexer, text):
+    lexer.input(text)
+    tokens = list(iter(lexer.token, None))
+    return sum(1 for token in tokens if token.type == 'ID')
+
+
+def count_arrays(lexer, text):
+    return lexer.tokenize(text).count('ID')
+
+
+# Time is measured on a second run without tracing allocations, which slows the scanner down several times
+def measure(function, lexer, text):
+    tracemalloc.start()
+    function(lexer, text)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    count = function(lexer, text)
+    return count, time.perf_counter() - start, peak
+
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else STATEMENTS
+    text = generate_source(statements, "\n")
+
+    print("{0:>8} {1:>10} {2:>10} {3:>10} {4:>12}".format("scanner", "tokens", "ids", "time [s]", "peak [MB]"))
+    for backend in scanner.BACKENDS:
+        lexer = scanner.Scanner(backend)
+        lexer.build()
+        for name, function in (("objects", count_objects), ("arrays", count_arrays)):
+            count, elapsed, peak = measure(function, lexer, text)
+            print("{0:>8} {1:>10} {2:>10} {3:>10.2f} {4:>12.1f}".format(
+                backend, name, count, elapsed, peak / 2 ** 20))
@@ -0,0 +1,51 @@
+import sys
+import time
+
+from scanner import scanner
+
+SIZES = [10000, 100000, 1000000]
+
+
+def generate_source(statements, separator):
+    return separator.join("x{0} = [{0}, 2.5; 3, 4] .* y;".format(i) for i in range(statements))
+
+
+def legacy_column(text, token):
+    line_start = text.rfind('\n', 0, token.lexpos) + 1
+    return (token.lexpos - line_start) + 1
+
+
+def dump(lexer, text, next_token, column):
+    lexer.input(text)
+
+    start = time.perf_counter()
+    count = 0
+    while True:
+        tok = next_token()
+        if not tok:
+            break
+        column(text, tok)
+        count += 1
+    return count, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+
+    lexer = scanner.Scanner()
+    lexer.build()
+
+    print("{0:>10} {1:>12} {2:>10} {3:>14} {4:>14}".format("statements", "layout", "tokens", "indexed [s]",
+                                                           "rfind [s]"))
+    for size in sizes:
+        for layout, separator in (("multi-line", "\n"), ("single-line", " ")):
+            text = generate_source(size, separator)
+            count, indexed = dump(lexer, text, lexer.token, lambda text, tok: tok.column)
+            # The legacy lookup is quadratic on a single line, so only time it where it finishes.
+            if layout == "multi-line" or size <= 10000:
+                # Bypass Scanner.token, which would also resolve positions through the index.
+                _, legacy = dump(lexer, text, lexer.lexer.token, legacy_column)
+                legacy = "{0:.3f}".format(legacy)
+            else:
+                legacy = "skipped"
+            print("{0:>10} {1:>12} {2:>10} {3:>14.3f} {4:>14}".format(size, layout, count, indexed, legacy))
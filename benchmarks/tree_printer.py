@@ -0,0 +1,48 @@
+import io
+import os
+import sys
+import time
+
+from interpreter import Optimizer
+from parser import Mparser
+from scanner import scanner
+
+SIZES = [100, 1000, 10000]
+
+
+def print_per_line(ast, sink):
+    # how the printer used to work: one print call, and one write, per line
+    for line in ast.treeLines():
+        print(line, file=sink)
+
+
+def measure(dump, ast, sink):
+    start = time.perf_counter()
+    dump(ast, sink)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+
+    with open("examples/full.txt") as file:
+        example = file.read()
+
+    lexer = scanner.Scanner()
+    lexer.build()
+    parser = Mparser.Parser(lexer, debug=False, write_tables=False)
+
+    print("{0:>8} {1:>10} {2:>10} {3:>14} {4:>14} {5:>14}".format(
+        "copies", "nodes", "lines", "print [n/s]", "buffered [n/s]", "devnull [n/s]"))
+    with open(os.devnull, "w") as devnull:
+        for size in sizes:
+            ast = parser.parse(example * size, lexer=lexer)
+            nodes = Optimizer.count_nodes(ast)
+            lines = sum(1 for _ in ast.treeLines())
+
+            per_line = measure(print_per_line, ast, io.StringIO())
+            buffered = measure(lambda ast, sink: ast.printTree(file=sink), ast, io.StringIO())
+            discarded = measure(lambda ast, sink: ast.printTree(file=sink), ast, devnull)
+
+            print("{0:>8} {1:>10} {2:>10} {3:>14.0f} {4:>14.0f} {5:>14.0f}".format(
+                size, nodes, lines, nodes / per_line, nodes / buffered, nodes / discarded))
@@ -0,0 +1,32 @@
+import sys
+import time
+
+from benchmarks.parse_scaling import generate_program
+from interpreter import TypeChecker
+from parser import Mparser
+from scanner import scanner
+
+SIZES = [1000, 10000, 100000]
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+
+    lexer = scanner.Scanner()
+    lexer.build()
+    parser = Mparser.Parser(lexer, debug=False, write_tables=False)
+
+    print("{0:>10} {1:>10} {2:>10} {3:>16} {4:>8}".format(
+        "statements", "parse [s]", "check [s]", "check/stmt [us]", "errors"))
+    for size in sizes:
+        # y is assigned first, as the generated program reads it in every statement
+        ast, parsing = timed(lambda: parser.parse("y = 1;\n" + generate_program(size), lexer=lexer))
+        errors, checking = timed(lambda: TypeChecker.check(ast))
+        print("{0:>10} {1:>10.3f} {2:>10.3f} {3:>16.2f} {4:>8}".format(
+            size, parsing, checking, checking / size * 1e6, len(errors)))
@@ -0,0 +1,502 @@
+import operator
+from array import array
+
+import numpy as np
+
+from interpreter import Interpreter
+from parser.ast import AST
+from parser.ast.TreePrinter import addToClass
+from parser.ast.Walker import Walker, is_deep, run_steps
+
+# Opcodes. Every instruction is an (opcode, a, b, c) quadruple of ints in Code.instructions. Operands
+# name registers unless noted, unused ones are 0.
+#
+# Binary operators: register a = register b <op> register c.
+ADD = 0
+SUBTRACT = 1
+MULTIPLY = 2
+DIVIDE = 3
+DOT_ADD = 4
+DOT_SUBTRACT = 5
+DOT_MULTIPLY = 6
+DOT_DIVIDE = 7
+EQUAL = 8
+NOT_EQUAL = 9
+LESS = 10
+GREATER = 11
+LESS_EQUAL = 12
+GREATER_EQUAL = 13
+# Fused comparison and branch: unless register b <cmp> register c holds, continue at offset a.
+JUMP_UNLESS_EQUAL = 14
+JUMP_UNLESS_NOT_EQUAL = 15
+JUMP_UNLESS_LESS = 16
+JUMP_UNLESS_GREATER = 17
+JUMP_UNLESS_LESS_EQUAL = 18
+JUMP_UNLESS_GREATER_EQUAL = 19
+JUMP = 20                   # continue at offset a
+JUMP_UNLESS = 21            # unless register b holds, continue at offset a
+GET_RANGE = 22              # a = iterator over b:c
+FOR_ITER = 23               # b = next item of iterator a, when exhausted continue at offset c
+MOVE = 24                   # a = b
+COPY = 25                   # a = b, copying matrices
+NEGATIVE = 26               # a = -b
+TRANSPOSE = 27              # a = b'
+ZEROS = 28                  # a = zeros(b), b is a literal size
+ONES = 29
+EYE = 30
+LOAD_ELEMENT = 31           # a = b[c], c holds the 1-based index
+STORE_ELEMENT = 32          # a[c] = b
+PRINT = 33                  # print register a, ending the line when b is 1
+RETURN = 34
+STRAY = 35                  # fail on a break (a is 0) or continue (a is 1) outside of a loop
+
+OPCODE_NAMES = {value: name for name, value in globals().items() if name.isupper() and type(value) == int}
+
+# What each operand of an instruction is: a Register, an instruction Offset, a Number or unused.
+OPERAND_KINDS = dict([(opcode, 'RRR') for opcode in range(JUMP_UNLESS_EQUAL)] +
+                     [(opcode, 'ORR') for opcode in range(JUMP_UNLESS_EQUAL, JUMP)] +
+                     [(JUMP, 'O'), (JUMP_UNLESS, 'OR'), (GET_RANGE, 'RRR'), (FOR_ITER, 'RRO'), (MOVE, 'RR'),
+                      (COPY, 'RR'), (NEGATIVE, 'RR'), (TRANSPOSE, 'RR'), (ZEROS, 'RN'), (ONES, 'RN'), (EYE, 'RN'),
+                      (LOAD_ELEMENT, 'RRR'), (STORE_ELEMENT, 'RRR'), (PRINT, 'RN'), (RETURN, ''), (STRAY, 'N')])
+
+# Instruction operands (1 to 3) that are registers read by the instruction, for error reports.
+READS = dict([(opcode, (2, 3)) for opcode in range(JUMP)] +
+             [(JUMP_UNLESS, (2,)), (GET_RANGE, (2, 3)), (MOVE, (2,)), (COPY, (2,)), (NEGATIVE, (2,)),
+              (TRANSPOSE, (2,)), (LOAD_ELEMENT, (2,)), (STORE_ELEMENT, (1, 2)), (PRINT, (1,))])
+
+BINARY_OPCODES = {'+': ADD, '-': SUBTRACT, '*': MULTIPLY, '/': DIVIDE,
+                  '.+': DOT_ADD, '.-': DOT_SUBTRACT, '.*': DOT_MULTIPLY, './': DOT_DIVIDE,
+                  '==': EQUAL, '!=': NOT_EQUAL, '<': LESS, '>': GREATER, '<=': LESS_EQUAL, '>=': GREATER_EQUAL}
+
+OPERATOR_SYMBOLS = {opcode: symbol for symbol, opcode in BINARY_OPCODES.items()}
+
+# Indexed by opcode, for binary operators and fused comparisons alike.
+BINARY_FUNCTIONS = [Interpreter.BINARY_OPERATORS[OPERATOR_SYMBOLS[opcode]] for opcode in range(EQUAL)] + \
+                   [operator.eq, operator.ne, operator.lt, operator.gt, operator.le, operator.ge] * 2
+
+JUMP_OFFSET = JUMP_UNLESS_EQUAL - EQUAL
+
+ASSIGNMENTS = ('=', '+=', '-=', '*=', '/=')
+
+STATEMENTS = (AST.CodeBlock, AST.IfStatement, AST.WhileStatement, AST.ForStatement, AST.VectorizedLoop,
+              AST.PrintStatement, AST.ReturnStatement, AST.BreakStatement, AST.ContinueStatement, AST.Error)
+
+# Statements holding statements, which are compiled on an explicit stack, see compile_compound()
+COMPOUND = frozenset([AST.CodeBlock, AST.IfStatement, AST.WhileStatement, AST.ForStatement, AST.VectorizedLoop])
+
+
+class Code:
+    def __init__(self):
+        self.instructions = array('i')
+        self.lines = array('i')
+        self.columns = array('i')
+        # (register, value) pairs to preload
+        self.constants = []
+        self.names = []
+        self.register_count = 0
+        # (line, column) of the variable an operand of an instruction reads, by (instruction number, operand),
+        # where an undefined variable is reported rather than at the instruction
+        self.reads = {}
+
+    def __len__(self):
+        return len(self.instructions) // 4
+
+    def disassemble(self):
+        names = dict(self.names)
+        constants = dict(self.constants)
+
+        lines = []
+        for offset in range(0, len(self.instructions), 4):
+            opcode = self.instructions[offset]
+            operands = []
+            for kind, operand in zip(OPERAND_KINDS[opcode], self.instructions[offset + 1:offset + 4]):
+                if kind == 'R' and operand in names:
+                    operands.append("r{0}({1})".format(operand, names[operand]))
+                elif kind == 'R' and operand in constants:
+                    operands.append("r{0}({1!r})".format(operand, constants[operand]))
+                elif kind == 'R':
+                    operands.append("r{0}".format(operand))
+                else:
+                    operands.append(str(operand))
+            lines.append("{0:>6} {1:>6} {2:<26} {3}".format(self.lines[offset // 4], offset, OPCODE_NAMES[opcode],
+                                                           " ".join(operands)))
+        return "\n".join(lines)
+
+
+class Compiler:
+    def __init__(self):
+        self.code = Code()
+        self.variables = {}
+        self.constants = {}
+        self.temporaries = set()
+        self.free_temporaries = []
+        # (continue target, pending break jumps) per enclosing loop
+        self.loops = []
+        # the variables read into registers since the statement began that no instruction has used yet, by
+        # register; the first read of a register is the one an instruction using it reads first
+        self.reads = {}
+
+    def emit(self, node, opcode, a=0, b=0, c=0):
+        self.code.instructions.extend((opcode, a, b, c))
+        self.code.lines.append(node.line)
+        self.code.columns.append(node.column)
+        if self.reads:
+            operands = (a, b, c)
+            for operand in READS.get(opcode, ()):
+                variable = self.reads.pop(operands[operand - 1], None)
+                if variable is not None:
+                    self.code.reads[len(self.code) - 1, operand] = (variable.line, variable.column)
+        return len(self.code.instructions) - 4
+
+    # Sets an operand (1 to 3) of the instruction at offset, for jumps emitted before their target is known.
+    def patch(self, offset, operand, value):
+        self.code.instructions[offset + operand] = value
+
+    def here(self):
+        return len(self.code.instructions)
+
+    def register(self):
+        self.code.register_count += 1
+        return self.code.register_count - 1
+
+    def variable(self, name):
+        if name not in self.variables:
+            self.variables[name] = self.register()
+            self.code.names.append((self.variables[name], name))
+        return self.variables[name]
+
+    def constant(self, value):
+        # Literal matrices are unhashable and always distinct.
+        if isinstance(value, np.ndarray):
+            register = self.register()
+            self.code.constants.append((register, value))
+            return register
+
+        key = (type(value), value)
+        if key not in self.constants:
+            self.constants[key] = self.register()
+            self.code.constants.append((self.constants[key], value))
+        return self.constants[key]
+
+    def temporary(self):
+        if self.free_temporaries:
+            return self.free_temporaries.pop()
+
+        register = self.register()
+        self.temporaries.add(register)
+        return register
+
+    def release(self, register):
+        if register in self.temporaries and register not in self.free_temporaries:
+            self.free_temporaries.append(register)
+
+    def target(self, target):
+        return self.temporary() if target is None else target
+
+    def error(self, node, message):
+        return SyntaxError("Syntax error at line {0}, column {1}: {2}".format(node.line, node.column, message))
+
+
+def compile_program(program):
+    compiler = Compiler()
+    program.compile(compiler)
+    compiler.emit(program, RETURN)
+    return compiler.code
+
+
+# Compiles a statement and the statements nested in it through their compile_steps(), which yield the statements
+# they hold where their code goes, so nesting depth is bounded by memory, not by the recursion limit
+def compile_compound(statement, compiler, target=None):
+    def steps(node):
+        if node.__class__ in COMPOUND:
+            return node.compile_steps(compiler)
+        return node.compile(compiler)
+    run_steps(statement, steps)
+
+
+# Compiles nested operators like a+b+c+... on an explicit stack rather than recursing once per operator,
+# in the same order the recursive compile() would: left operand, right operand, then the operation.
+class OperatorGenerator(Walker):
+    def __init__(self, compiler, root, target):
+        self.compiler = compiler
+        self.root = root
+        self.target = target
+
+    def children(self, node):
+        if type(node) == AST.BinaryExpression and node.op not in ASSIGNMENTS:
+            return [node.left, node.right]
+        return ()
+
+    def leave(self, node, values):
+        if not values:
+            return node.compile(self.compiler)
+        return compile_operator(node, self.compiler, values[0], values[1],
+                                self.target if node is self.root else None)
+
+
+# Expressions compile to instructions leaving their value in a register and return that register.
+# Given a target they write their result there directly, which spares assignments a move.
+class BytecodeGenerator:
+    @addToClass(AST.Node)
+    def compile(self, compiler, target=None):
+        raise Exception("compile not defined in class " + self.__class__.__name__)
+
+    @addToClass(AST.CodeBlock)
+    def compile_steps(self, compiler):
+        for statement in self.children:
+            compiler.reads.clear()
+            if isinstance(statement, STATEMENTS) or (isinstance(statement, AST.BinaryExpression)
+                                                     and statement.op in ASSIGNMENTS):
+                yield statement
+            else:
+                # evaluated for its errors only
+                value = compiler.temporary()
+                statement.compile(compiler, value)
+                compiler.release(value)
+
+    @addToClass(AST.IntegerNumber)
+    def compile(self, compiler, target=None):
+        return compile_register(self, compiler, compiler.constant(self.value), target)
+
+    @addToClass(AST.FloatNumber)
+    def compile(self, compiler, target=None):
+        return compile_register(self, compiler, compiler.constant(self.value), target)
+
+    @addToClass(AST.StringValue)
+    def compile(self, compiler, target=None):
+        return compile_register(self, compiler, compiler.constant(self.value[1:-1]), target)
+
+    @addToClass(AST.Variable)
+    def compile(self, compiler, target=None):
+        register = compiler.variable(self.name)
+        if target is None:
+            compiler.reads.setdefault(register, self)
+        return compile_register(self, compiler, register, target)
+
+    @addToClass(AST.BinaryExpression)
+    def compile(self, compiler, target=None):
+        if self.op in ASSIGNMENTS:
+            self.compile_assignment(compiler)
+            return None
+
+        if is_deep(self):
+            return OperatorGenerator(compiler, self, target).walk(self)
+
+        return compile_operator(self, compiler, self.left.compile(compiler), self.right.compile(compiler), target)
+
+    @addToClass(AST.BinaryExpression)
+    def compile_assignment(self, compiler):
+        if isinstance(self.left, AST.ElementAccessExpression):
+            matrix = compiler.variable(self.left.variable.name)
+            index = compiler.constant(tuple(self.left.index.children))
+            value = self.right.compile(compiler)
+
+            if self.op != '=':
+                element = compiler.temporary()
+                compiler.emit(self.left, LOAD_ELEMENT, element, matrix, index)
+                compiler.emit(self, BINARY_OPCODES[self.op[:-1]], element, element, value)
+                compiler.release(value)
+                value = element
+
+            compiler.emit(self.left, STORE_ELEMENT, matrix, value, index)
+            compiler.release(value)
+            return
+
+        variable = compiler.variable(self.left.name)
+
+        if self.op != '=':
+            value = self.right.compile(compiler)
+            compiler.emit(self, BINARY_OPCODES[self.op[:-1]], variable, variable, value)
+            compiler.release(value)
+        elif isinstance(self.right, (AST.Variable, AST.TransposeStatement)):
+            # Matrices are values: a copied variable or its transpose must not share storage.
+            value = self.right.compile(compiler)
+            compiler.emit(self, COPY, variable, value)
+            compiler.release(value)
+        else:
+            self.right.compile(compiler, variable)
+
+    @addToClass(AST.UnaryExpression)
+    def compile(self, compiler, target=None):
+        value = self.right.compile(compiler)
+        compiler.release(value)
+
+        target = compiler.target(target)
+        compiler.emit(self, NEGATIVE, target, value)
+        return target
+
+    @addToClass(AST.Matrix)
+    def compile(self, compiler, target=None):
+        # Matrix literals only hold values, so they are built once here and copied on every load.
+        target = compiler.target(target)
+        compiler.emit(self, COPY, target, compiler.constant(self.evaluate(None)))
+        return target
+
+    @addToClass(AST.ReturnStatement)
+    def compile(self, compiler, target=None):
+        if self.value is not None:
+            value = compiler.temporary()
+            self.value.compile(compiler, value)
+            compiler.release(value)
+        compiler.emit(self, RETURN)
+
+    @addToClass(AST.BreakStatement)
+    def compile(self, compiler, target=None):
+        if not compiler.loops:
+            # an error only once it runs, as in the interpreter
+            compiler.emit(self, STRAY, 0)
+            return
+
+        compiler.loops[-1][1].append(compiler.emit(self, JUMP))
+
+    @addToClass(AST.ContinueStatement)
+    def compile(self, compiler, target=None):
+        if not compiler.loops:
+            compiler.emit(self, STRAY, 1)
+            return
+
+        compiler.emit(self, JUMP, compiler.loops[-1][0])
+
+    @addToClass(AST.ElementAccessExpression)
+    def compile(self, compiler, target=None):
+        matrix = self.variable.compile(compiler)
+        index = compiler.constant(tuple(self.index.children))
+
+        target = compiler.target(target)
+        compiler.emit(self, LOAD_ELEMENT, target, matrix, index)
+        return target
+
+    @addToClass(AST.IfStatement)
+    def compile_steps(self, compiler):
+        to_else = compile_condition(self.condition, compiler)
+        yield self.code_block
+
+        if self.else_statement is None:
+            compiler.patch(to_else, 1, compiler.here())
+        else:
+            to_end = compiler.emit(self, JUMP)
+            compiler.patch(to_else, 1, compiler.here())
+            yield self.else_statement
+            compiler.patch(to_end, 1, compiler.here())
+
+    @addToClass(AST.WhileStatement)
+    def compile_steps(self, compiler):
+        start = compiler.here()
+        to_end = compile_condition(self.condition, compiler)
+
+        compiler.loops.append((start, [to_end]))
+        yield self.code_block
+        compiler.emit(self, JUMP, start)
+
+        _, breaks = compiler.loops.pop()
+        for jump in breaks:
+            compiler.patch(jump, 1, compiler.here())
+
+    @addToClass(AST.RangeExpression)
+    def compile(self, compiler, target=None):
+        start = self.left.compile(compiler)
+        stop = self.right.compile(compiler)
+        compiler.release(start)
+        compiler.release(stop)
+
+        target = compiler.target(target)
+        compiler.emit(self, GET_RANGE, target, start, stop)
+        return target
+
+    @addToClass(AST.ForStatement)
+    def compile_steps(self, compiler):
+        variable = compiler.variable(self.iteration_variable_range.left.name)
+        iterator = self.iteration_variable_range.right.compile(compiler)
+
+        start = compiler.here()
+        to_end = compiler.emit(self, FOR_ITER, iterator, variable)
+
+        compiler.loops.append((start, []))
+        yield self.code_block
+        compiler.emit(self, JUMP, start)
+
+        _, breaks = compiler.loops.pop()
+        compiler.patch(to_end, 3, compiler.here())
+        for jump in breaks:
+            compiler.patch(jump, 1, compiler.here())
+
+        compiler.release(iterator)
+
+    # The VM runs the loop an iteration at a time; its registers are only typed at run time.
+    @addToClass(AST.VectorizedLoop)
+    def compile_steps(self, compiler):
+        yield self.loop
+
+    @addToClass(AST.TransposeStatement)
+    def compile(self, compiler, target=None):
+        value = self.value.compile(compiler)
+        compiler.release(value)
+
+        target = compiler.target(target)
+        compiler.emit(self, TRANSPOSE, target, value)
+        return target
+
+    @addToClass(AST.PrintStatement)
+    def compile(self, compiler, target=None):
+        for position, value in enumerate(self.values):
+            register = value.compile(compiler)
+            compiler.emit(value, PRINT, register, int(position == len(self.values) - 1))
+            compiler.release(register)
+
+    @addToClass(AST.ZerosStatement)
+    def compile(self, compiler, target=None):
+        target = compiler.target(target)
+        compiler.emit(self, ZEROS, target, self.value)
+        return target
+
+    @addToClass(AST.OnesStatement)
+    def compile(self, compiler, target=None):
+        target = compiler.target(target)
+        compiler.emit(self, ONES, target, self.value)
+        return target
+
+    @addToClass(AST.EyeStatement)
+    def compile(self, compiler, target=None):
+        target = compiler.target(target)
+        compiler.emit(self, EYE, target, self.value)
+        return target
+
+    @addToClass(AST.Error)
+    def compile(self, compiler, target=None):
+        pass
+
+
+def compile_register(node, compiler, register, target):
+    if target is None:
+        return register
+
+    compiler.emit(node, MOVE, target, register)
+    return target
+
+
+def compile_operator(node, compiler, left, right, target):
+    compiler.release(left)
+    compiler.release(right)
+
+    target = compiler.target(target)
+    compiler.emit(node, BINARY_OPCODES[node.op], target, left, right)
+    return target
+
+
+# Emits the branch skipping past a block unless condition holds and returns its offset for patching.
+# A comparison is fused with the branch into a single instruction.
+def compile_condition(condition, compiler):
+    if isinstance(condition, AST.BinaryExpression) and EQUAL <= BINARY_OPCODES.get(condition.op, -1):
+        left = condition.left.compile(compiler)
+        right = condition.right.compile(compiler)
+        compiler.release(left)
+        compiler.release(right)
+        return compiler.emit(condition, BINARY_OPCODES[condition.op] + JUMP_OFFSET, 0, left, right)
+
+    value = condition.compile(compiler)
+    compiler.release(value)
+    return compiler.emit(condition, JUMP_UNLESS, 0, value)
+
+
+for kind in COMPOUND:
+    kind.compile = compile_compound
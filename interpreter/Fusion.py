@@ -0,0 +1,139 @@
+import numpy as np
+
+# Element-wise arithmetic on large matrices is deferred: instead of a full temporary matrix per operator,
+# evaluating A.*B .+ D./E' builds an Expression graph over the operands, which are evaluated matrices, transposed
+# views of them or scalars, and forcing the graph computes the whole expression a block of rows at a time.
+# Every operator of a block reads and writes scratch buffers that stay in cache, and the result goes straight into
+# one preallocated output, which for +=, -=, *= and /= is the updated matrix itself.
+# Only dense float matrices of at least MIN_SIZE elements are deferred; smaller ones, sparse ones and anything
+# that is not element-wise are computed at once as before. The operators are the same NumPy ufuncs applied to
+# the same elements in the same order, so results are identical.
+MIN_SIZE = 2 ** 14
+
+# Elements in a block of rows: 256 KB scratch buffers, small enough for the few a chain needs to stay in the L2
+# cache and large enough that calling the ufuncs once per block costs little
+BLOCK_SIZE = 2 ** 15
+
+# Operators that are always element-wise, and those that are when one operand is a scalar
+ELEMENT_WISE = {'+': np.add, '-': np.subtract, '.+': np.add, '.-': np.subtract, '.*': np.multiply, './': np.divide}
+WITH_SCALAR = {'*': np.multiply, '/': np.divide}
+
+SCALARS = frozenset([int, float, np.int64, np.float64])
+
+
+# A deferred element-wise operation: function applied to operands, which are Expressions, matrices or scalars
+class Expression:
+    __slots__ = ('function', 'operands', 'shape')
+
+    def __init__(self, function, operands, shape):
+        self.function = function
+        self.operands = operands
+        self.shape = shape
+
+
+# Shape of a value that can be an operand of an Expression, or None
+def operand_shape(value):
+    if value.__class__ is Expression:
+        return value.shape
+    if value.__class__ is np.ndarray and value.dtype == np.float64 and value.ndim == 2 and value.size >= MIN_SIZE:
+        return value.shape
+    return None
+
+
+# The Expression for left <op> right, or None when it has to be computed at once
+def combine(op, left, right):
+    left_scalar = left.__class__ in SCALARS
+    right_scalar = right.__class__ in SCALARS
+    if left_scalar and right_scalar:
+        return None
+
+    if left_scalar or right_scalar:
+        function = ELEMENT_WISE.get(op) or WITH_SCALAR.get(op)
+        shape = operand_shape(right if left_scalar else left)
+    else:
+        # * and / of two matrices are a product and a quotient
+        function = ELEMENT_WISE.get(op)
+        shape = operand_shape(left)
+        if shape != operand_shape(right):
+            return None
+
+    if function is None or shape is None:
+        return None
+    return Expression(function, (left, right), shape)
+
+
+def negate(value):
+    shape = operand_shape(value)
+    return Expression(np.negative, (value,), shape) if shape is not None else None
+
+
+# Operations in evaluation order as (function, operands, target), operands being ('matrix', value),
+# ('scalar', value) or ('register', number) and target a register number, or None for the output.
+# A register is reused once its value has been read, so a chain of n operators needs one or two registers
+# rather than n temporaries.
+# Built on an explicit stack, as the graph of a 100k-term a+b+c+... chain is that deep.
+def schedule(expression):
+    operations = []
+    free = []
+    registers = 0
+    stack = [(expression, False)]
+    results = []
+    while stack:
+        node, ready = stack.pop()
+        if node.__class__ is not Expression:
+            results.append(('matrix' if node.__class__ is np.ndarray else 'scalar', node))
+            continue
+        if not ready:
+            stack.append((node, True))
+            stack.extend((operand, False) for operand in reversed(node.operands))
+            continue
+
+        operands = results[-len(node.operands):]
+        del results[-len(node.operands):]
+        for kind, value in operands:
+            if kind == 'register':
+                free.append(value)
+        if free:
+            target = free.pop()
+        else:
+            target = registers
+            registers += 1
+        operations.append((node.function, operands, target))
+        results.append(('register', target))
+
+    function, operands, _ = operations[-1]
+    operations[-1] = (function, operands, None)
+    return operations, registers
+
+
+# Whether out can take the result: each element is written after the last read of that element,
+# so the output may be an operand itself, but not overlap one in any other way, as A' overlaps A.
+def can_write(expression, out, operations):
+    if out.__class__ is not np.ndarray or out.shape != expression.shape or out.dtype != np.float64 \
+            or not out.flags.writeable:
+        return False
+    return all(value is out or not np.may_share_memory(value, out)
+               for _, operands, _ in operations for kind, value in operands if kind == 'matrix')
+
+
+# The value of an Expression, written into out when it is given and can take it. Anything else is returned as it is.
+def force(value, out=None):
+    if value.__class__ is not Expression:
+        return value
+
+    operations, registers = schedule(value)
+    if out is None or not can_write(value, out, operations):
+        out = np.empty(value.shape)
+
+    rows, columns = value.shape
+    block = max(1, BLOCK_SIZE // columns)
+    scratch = [np.empty((min(block, rows), columns)) for _ in range(registers)]
+
+    for start in range(0, rows, block):
+        stop = min(start + block, rows)
+        buffers = [buffer[:stop - start] for buffer in scratch]
+        for function, operands, target in operations:
+            arguments = [value[start:stop] if kind == 'matrix' else buffers[value] if kind == 'register' else value
+                         for kind, value in operands]
+            function(*arguments, out=out[start:stop] if target is None else buffers[target])
+    return out
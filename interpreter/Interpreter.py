@@ -0,0 +1,401 @@
+import math
+import operator
+import warnings
+
+import numpy as np
+
+from parser.ast import AST
+from parser.ast.TreePrinter import addToClass
+from parser.ast.Walker import Walker, is_deep
+from interpreter import Fusion, Matrices
+from interpreter.Memory import Memory
+
+
+class BreakException(Exception):
+    pass
+
+
+class ContinueException(Exception):
+    pass
+
+
+class ReturnValueException(Exception):
+    def __init__(self, value):
+        self.value = value
+
+
+def runtime_error(node, message):
+    return RuntimeError("Runtime error at line {0}, column {1}: {2}".format(node.line, node.column, message))
+
+
+# Matrices may be dense or sparse, see interpreter.Matrices
+BINARY_OPERATORS = {
+    '+': Matrices.add,
+    '-': Matrices.subtract,
+    '*': Matrices.multiply,
+    '/': Matrices.divide,
+
+    '.+': Matrices.element_add,
+    '.-': Matrices.element_subtract,
+    '.*': Matrices.element_multiply,
+    './': Matrices.element_divide,
+
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '>': operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+}
+
+ASSIGNMENT_OPERATORS = {
+    '=': None,
+    '+=': Matrices.add,
+    '-=': Matrices.subtract,
+    '*=': Matrices.multiply,
+    '/=': Matrices.divide,
+}
+
+is_true = Matrices.is_true
+
+# Statements holding statements, which run those on an explicit stack, see execute()
+COMPOUND = frozenset([AST.CodeBlock, AST.IfStatement, AST.WhileStatement, AST.ForStatement, AST.VectorizedLoop])
+
+
+def to_index(matrix, index):
+    if any(i < 1 for i in index):
+        raise IndexError("indices start at 1")
+
+    index = tuple(i - 1 for i in index)
+    if len(index) == 1 and matrix.ndim > 1:
+        # a single index walks the matrix column by column
+        index = np.unravel_index(index[0], matrix.shape, order='F')
+    return index
+
+
+# start:stop includes both ends, as in MATLAB.
+def make_range(start, stop):
+    if isinstance(start, int) and isinstance(stop, int):
+        return range(start, stop + 1)
+    return [start + step for step in range(math.floor(stop - start) + 1)]
+
+
+def run(program, memory=None):
+    if memory is None:
+        memory = Memory()
+
+    # Division by zero yields inf or nan, as in MATLAB, rather than a warning per operation.
+    try:
+        with np.errstate(divide='ignore', invalid='ignore'), Matrices.quiet():
+            program.evaluate(memory)
+    except ReturnValueException:
+        memory.returned = True
+    except (BreakException, ContinueException) as e:
+        # raised with the statement
+        raise runtime_error(e.args[0], "'{0}' outside of a loop".format(
+            'break' if isinstance(e, BreakException) else 'continue'))
+
+    return memory
+
+
+# Runs a statement and the statements nested in it through their evaluate_steps(), so an if within an if within a
+# loop nests generators on a list rather than Python calls, and break, continue and return reach the loops and
+# the program around them as the exceptions they are. This is run_steps() written out for statements, which
+# saves a call per statement in loops.
+def execute(statement, memory):
+    stack = [statement.evaluate_steps(memory)]
+    error = None
+    while stack:
+        top = stack[-1]
+        try:
+            if error is None:
+                statement = next(top)
+            else:
+                statement = top.throw(error)
+                error = None
+        except StopIteration:
+            stack.pop()
+            error = None
+            continue
+        except Exception as e:
+            stack.pop()
+            error = e
+            continue
+        stack.append(statement.evaluate_steps(memory))
+
+    if error is not None:
+        raise error
+
+
+def apply_operator(node, left, right):
+    try:
+        return BINARY_OPERATORS[node.op](left, right)
+    except (TypeError, ValueError, ZeroDivisionError, np.linalg.LinAlgError) as e:
+        raise runtime_error(node, "cannot evaluate '{0}': {1}".format(node.op, e))
+
+
+# left <op> right, deferred when it is element-wise on large matrices, see interpreter.Fusion
+def defer_operator(node, left, right):
+    if left.__class__ in Matrices.SCALARS and right.__class__ in Matrices.SCALARS:
+        return apply_operator(node, left, right)
+    expression = Fusion.combine(node.op, left, right)
+    if expression is not None:
+        return expression
+    return apply_operator(node, Fusion.force(left), Fusion.force(right))
+
+
+# The value of an expression, computing what was deferred
+def force(value):
+    if value.__class__ is Fusion.Expression:
+        # the representation the operators would have given it
+        return Matrices.adapt(Fusion.force(value))
+    return value
+
+
+# Defers nested operators like a+b+c+... on an explicit stack rather than recursing once per operator;
+# everything else is deferred by its own defer().
+class OperatorEvaluator(Walker):
+    def __init__(self, memory):
+        self.memory = memory
+
+    def children(self, node):
+        if type(node) == AST.BinaryExpression and node.op not in ASSIGNMENT_OPERATORS:
+            return [node.left, node.right]
+        return ()
+
+    def leave(self, node, values):
+        if values:
+            return defer_operator(node, values[0], values[1])
+        return node.defer(self.memory)
+
+
+class Interpreter:
+    @addToClass(AST.Node)
+    def evaluate(self, memory):
+        raise Exception("evaluate not defined in class " + self.__class__.__name__)
+
+    # The value of an expression or an Expression computing it. Only operators defer anything;
+    # a transpose is a view of its matrix, which they read as it is.
+    @addToClass(AST.Node)
+    def defer(self, memory):
+        return self.evaluate(memory)
+
+    # evaluate_steps() of a compound statement yields the compound statements it runs, see execute(), and runs
+    # the others itself. The block of a statement is run as part of it.
+    @addToClass(AST.CodeBlock)
+    def evaluate_steps(self, memory):
+        for statement in self.children:
+            if statement.__class__ in COMPOUND:
+                yield statement
+            else:
+                statement.evaluate(memory)
+
+    @addToClass(AST.IntegerNumber)
+    def evaluate(self, memory):
+        return self.value
+
+    @addToClass(AST.FloatNumber)
+    def evaluate(self, memory):
+        return self.value
+
+    @addToClass(AST.StringValue)
+    def evaluate(self, memory):
+        # the scanner keeps the surrounding quotes
+        return self.value[1:-1]
+
+    @addToClass(AST.Variable)
+    def evaluate(self, memory):
+        try:
+            return memory.variables[self.name]
+        except KeyError:
+            raise runtime_error(self, "undefined variable '{0}'".format(self.name))
+
+    @addToClass(AST.BinaryExpression)
+    def evaluate(self, memory):
+        if self.op in ASSIGNMENT_OPERATORS:
+            return self.assign(memory)
+
+        if is_deep(self):
+            return force(OperatorEvaluator(memory).walk(self))
+
+        left = self.left.defer(memory)
+        right = self.right.defer(memory)
+        if left.__class__ in Matrices.SCALARS and right.__class__ in Matrices.SCALARS:
+            return apply_operator(self, left, right)
+        return force(defer_operator(self, left, right))
+
+    @addToClass(AST.BinaryExpression)
+    def defer(self, memory):
+        if self.op in ASSIGNMENT_OPERATORS:
+            return self.assign(memory)
+
+        if is_deep(self):
+            return OperatorEvaluator(memory).walk(self)
+
+        return defer_operator(self, self.left.defer(memory), self.right.defer(memory))
+
+    @addToClass(AST.BinaryExpression)
+    def assign(self, memory):
+        operation = ASSIGNMENT_OPERATORS[self.op]
+        if operation is not None and isinstance(self.left, AST.Variable):
+            # A += B and the like write into A when it is a large matrix, see interpreter.Fusion
+            value = self.right.defer(memory)
+            current = self.left.evaluate(memory)
+            if current.__class__ not in Matrices.SCALARS:
+                expression = Fusion.combine(self.op[0], current, value)
+                if expression is not None:
+                    memory.variables[self.left.name] = Matrices.adapt(Fusion.force(expression, out=current))
+                    return
+            value = force(value)
+        else:
+            value = self.right.evaluate(memory)
+
+        # Matrices are values: a copied variable or its transpose must not share storage.
+        if isinstance(self.right, (AST.Variable, AST.TransposeStatement)) and Matrices.is_matrix(value):
+            value = value.copy()
+
+        if operation is not None:
+            try:
+                value = operation(self.left.evaluate(memory), value)
+            except (ValueError, ZeroDivisionError, np.linalg.LinAlgError) as e:
+                raise runtime_error(self, "cannot evaluate '{0}': {1}".format(self.op, e))
+
+        if isinstance(self.left, AST.ElementAccessExpression):
+            self.left.store(memory, value)
+        else:
+            memory.variables[self.left.name] = value
+
+    @addToClass(AST.UnaryExpression)
+    def evaluate(self, memory):
+        return force(self.defer(memory))
+
+    @addToClass(AST.UnaryExpression)
+    def defer(self, memory):
+        value = self.right.defer(memory)
+        expression = Fusion.negate(value)
+        if expression is not None:
+            return expression
+        try:
+            return -force(value)
+        except TypeError as e:
+            raise runtime_error(self, str(e))
+
+    @addToClass(AST.Matrix)
+    def evaluate(self, memory):
+        if self.children and isinstance(self.children[0], AST.Matrix):
+            rows = [[value.evaluate(memory) for value in row.children] for row in self.children]
+        else:
+            rows = [[value.evaluate(memory) for value in self.children]]
+
+        try:
+            return np.array(rows, dtype=float)
+        except ValueError:
+            if len(set(len(row) for row in rows)) > 1:
+                raise runtime_error(self, "matrix rows differ in length")
+            return np.array(rows, dtype=object)
+
+    @addToClass(AST.ReturnStatement)
+    def evaluate(self, memory):
+        value = self.value.evaluate(memory) if self.value is not None else None
+        raise ReturnValueException(value)
+
+    @addToClass(AST.BreakStatement)
+    def evaluate(self, memory):
+        raise BreakException(self)
+
+    @addToClass(AST.ContinueStatement)
+    def evaluate(self, memory):
+        raise ContinueException(self)
+
+    @addToClass(AST.ElementAccessExpression)
+    def evaluate(self, memory):
+        matrix = self.variable.evaluate(memory)
+
+        try:
+            return matrix[to_index(matrix, self.index.children)]
+        except (IndexError, TypeError, ValueError, AttributeError):
+            raise runtime_error(self, "index {0} out of range for '{1}'".format(self.index.children,
+                                                                                self.variable.name))
+
+    @addToClass(AST.ElementAccessExpression)
+    def store(self, memory, value):
+        matrix = self.variable.evaluate(memory)
+
+        try:
+            memory.variables[self.variable.name] = Matrices.store(matrix, to_index(matrix, self.index.children),
+                                                                  value)
+        except (IndexError, TypeError, ValueError, AttributeError):
+            raise runtime_error(self, "index {0} out of range for '{1}'".format(self.index.children,
+                                                                                self.variable.name))
+
+    @addToClass(AST.IfStatement)
+    def evaluate_steps(self, memory):
+        if is_true(self.condition.evaluate(memory)):
+            yield from self.code_block.evaluate_steps(memory)
+        elif self.else_statement is not None:
+            yield self.else_statement
+
+    @addToClass(AST.WhileStatement)
+    def evaluate_steps(self, memory):
+        while is_true(self.condition.evaluate(memory)):
+            try:
+                yield from self.code_block.evaluate_steps(memory)
+            except BreakException:
+                break
+            except ContinueException:
+                pass
+
+    @addToClass(AST.RangeExpression)
+    def evaluate(self, memory):
+        start = self.left.evaluate(memory)
+        stop = self.right.evaluate(memory)
+        try:
+            return make_range(start, stop)
+        except (TypeError, ValueError) as e:
+            raise runtime_error(self, str(e))
+
+    @addToClass(AST.ForStatement)
+    def evaluate_steps(self, memory):
+        name = self.iteration_variable_range.left.name
+        variables = memory.variables
+
+        for value in self.iteration_variable_range.right.evaluate(memory):
+            variables[name] = value
+            try:
+                yield from self.code_block.evaluate_steps(memory)
+            except BreakException:
+                break
+            except ContinueException:
+                pass
+
+    @addToClass(AST.TransposeStatement)
+    def evaluate(self, memory):
+        return Matrices.transpose(self.value.evaluate(memory))
+
+    @addToClass(AST.PrintStatement)
+    def evaluate(self, memory):
+        print(*[Matrices.dense(value.evaluate(memory)) for value in self.values], file=memory.output)
+
+    @addToClass(AST.ZerosStatement)
+    def evaluate(self, memory):
+        return Matrices.zeros(self.value)
+
+    @addToClass(AST.OnesStatement)
+    def evaluate(self, memory):
+        return Matrices.ones(self.value)
+
+    @addToClass(AST.EyeStatement)
+    def evaluate(self, memory):
+        return Matrices.eye(self.value)
+
+    @addToClass(AST.Error)
+    def evaluate(self, memory):
+        pass
+
+
+# Values that are never deferred, deferred without the detour through AST.Node.defer()
+for kind in (AST.IntegerNumber, AST.FloatNumber, AST.Variable):
+    kind.defer = kind.evaluate
+
+for kind in COMPOUND:
+    kind.evaluate = execute
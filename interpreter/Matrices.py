@@ -0,0 +1,240 @@
+import contextlib
+import operator
+import warnings
+
+import numpy as np
+
+try:
+    import scipy.sparse
+    import scipy.sparse.linalg
+    sparse = scipy.sparse
+except ImportError:
+    sparse = None
+
+# Matrices are NumPy arrays, or, when SciPy is installed and most of a large matrix is zeros, SciPy sparse arrays
+# in CSR (or CSC, for a transpose) form. Operations take either and pick the representation of their result from
+# how many of its elements are nonzero, so eye(10000) takes the memory of its diagonal, and a product with it the
+# time of its nonzeros, while a sparse matrix that fills up goes back to being dense.
+#     - Matrices with fewer than MIN_SPARSE_SIZE elements are always dense: they take at most 2 MB and the
+#       sparse bookkeeping would cost more than it saves.
+#     - A dense result becomes sparse when at most SPARSE_FILL of its elements are nonzero, a sparse one dense
+#       when more than DENSE_FILL are. The gap keeps a matrix near the threshold from converting back and forth.
+#     - Element writes into a sparse matrix convert it when it fills up. Counting the nonzeros of a dense matrix
+#       takes as long as copying it, so one only becomes sparse when an operation produces it.
+# Adding a scalar, which fills a matrix anyway, and other operations with no sparse counterpart work on dense
+# copies. Comparisons work on either and give a matrix of the same kind.
+MIN_SPARSE_SIZE = 2 ** 18
+SPARSE_FILL = 0.05
+DENSE_FILL = 0.2
+
+# Columns solved for at once when dividing by a sparse matrix, which bounds the dense memory the solution takes
+SOLVE_BLOCK = 256
+
+
+# Classes of values that are never matrices, which operators handle without looking further
+SCALARS = frozenset([int, float, bool, str, np.int64, np.float64, np.bool_])
+
+
+if sparse is not None:
+    is_sparse = sparse.issparse
+else:
+    def is_sparse(value):
+        return False
+
+
+def is_matrix(value):
+    return isinstance(value, np.ndarray) or is_sparse(value)
+
+
+# The dense form of a matrix, which is also what printing a matrix shows whichever form it is kept in
+def dense(value):
+    return value.toarray() if is_sparse(value) else value
+
+
+def size(matrix):
+    return matrix.shape[0] * matrix.shape[1]
+
+
+# The representation to keep a matrix in. Anything that is not a matrix is returned as it is.
+def adapt(value):
+    if value.__class__ is np.ndarray:
+        if sparse is None or value.ndim != 2 or value.size < MIN_SPARSE_SIZE or value.dtype == object:
+            return value
+        if np.count_nonzero(value) <= SPARSE_FILL * value.size:
+            return sparse.csr_array(value)
+        return value
+
+    if is_sparse(value):
+        if size(value) < MIN_SPARSE_SIZE or value.nnz > DENSE_FILL * size(value):
+            return value.toarray()
+        if value.format not in ('csr', 'csc'):
+            # element-wise products come back as COO, which cannot be indexed
+            return value.tocsr()
+    return value
+
+
+def zeros(n):
+    if sparse is not None and n * n >= MIN_SPARSE_SIZE:
+        return sparse.csr_array((n, n))
+    return np.zeros((n, n))
+
+
+def ones(n):
+    return np.ones((n, n))
+
+
+def eye(n):
+    if sparse is not None and n * n >= MIN_SPARSE_SIZE:
+        diagonal = np.arange(n)
+        return sparse.coo_array((np.ones(n), (diagonal, diagonal)), shape=(n, n)).tocsr()
+    return np.eye(n)
+
+
+# Conditions on matrices hold when they hold for every element.
+def is_true(value):
+    if value.__class__ is bool:
+        return value
+    if isinstance(value, np.ndarray):
+        return bool(value.all())
+    if is_sparse(value):
+        return value.count_nonzero() == size(value)
+    return bool(value)
+
+
+# Whether every element of value is finite. A value whose elements cannot be tested counts as not finite.
+def is_finite(value):
+    if is_sparse(value):
+        value = value.data
+    try:
+        return bool(np.isfinite(value).all())
+    except TypeError:
+        return False
+
+
+# Whether a product may skip the zeros its sparse operands do not store. 0 * x is 0 only for finite x, so when the
+# other operand holds inf or NaN the product is taken on dense copies and gives NaN wherever dense operands would.
+def skips_zeros(left, right):
+    return (not is_sparse(left) or is_finite(right)) and (not is_sparse(right) or is_finite(left))
+
+
+def transpose(value):
+    return value.T if is_matrix(value) else value
+
+
+# Stores value at a 0-based index of matrix and returns the matrix to keep, which is a dense copy once a sparse
+# one has filled up.
+def store(matrix, index, value):
+    if not is_sparse(matrix):
+        matrix[index] = value
+        return matrix
+
+    # a zero written where nothing is stored would be stored
+    if value.__class__ in SCALARS and value == 0 and matrix[index] == 0:
+        return matrix
+    # a new nonzero moves the stored elements after it, which SciPy warns about, see quiet()
+    matrix[index] = value
+    return adapt(matrix)
+
+
+# SciPy warns about sparse comparisons and element writes, which are slower than on dense matrices but still take
+# less than converting the matrix. Programs run with the warnings off.
+@contextlib.contextmanager
+def quiet():
+    with warnings.catch_warnings():
+        if sparse is not None:
+            warnings.simplefilter('ignore', sparse.SparseEfficiencyWarning)
+        yield
+
+
+# An operator given the functions for dense operands and for operands of which at least one is sparse
+def sparse_aware(dense_operation, sparse_operation):
+    def operation(left, right):
+        if left.__class__ in SCALARS and right.__class__ in SCALARS:
+            return dense_operation(left, right)
+        if is_sparse(left) or is_sparse(right):
+            return adapt(sparse_operation(left, right))
+        return adapt(dense_operation(left, right))
+    return operation
+
+
+def sparse_add(left, right):
+    if is_matrix(left) and is_matrix(right):
+        return left + right
+    return dense(left) + dense(right)
+
+
+def sparse_subtract(left, right):
+    if is_matrix(left) and is_matrix(right):
+        return left - right
+    return dense(left) - dense(right)
+
+
+# `*` and `/` are matrix operations when both operands are matrices and scalar ones otherwise,
+# the dotted operators are always element-wise.
+def matrix_multiply(left, right):
+    if is_matrix(left) and is_matrix(right):
+        return left @ right
+    return left * right
+
+
+def sparse_multiply(left, right):
+    if skips_zeros(left, right):
+        return matrix_multiply(left, right)
+    return matrix_multiply(dense(left), dense(right))
+
+
+def solve(left, right):
+    # left / right == left * inv(right), without forming the inverse
+    if not is_sparse(right):
+        return np.linalg.solve(right.T, dense(left).T).T
+
+    try:
+        factors = sparse.linalg.splu(right.T.tocsc())
+    except RuntimeError:
+        # the factorization fails on an exactly singular matrix
+        raise np.linalg.LinAlgError("Singular matrix")
+
+    if not is_sparse(left):
+        return factors.solve(np.asarray(left.T, order='F')).T
+
+    # a block of right-hand sides at a time, keeping only the nonzeros of each block's solution
+    columns = left.T.tocsc()
+    if columns.shape[0] != right.shape[0]:
+        raise ValueError("shapes {0} and {1} do not match".format(left.shape, right.shape))
+    blocks = [sparse.csc_array(factors.solve(columns[:, start:start + SOLVE_BLOCK].toarray()))
+              for start in range(0, columns.shape[1], SOLVE_BLOCK)]
+    return sparse.hstack(blocks, format='csc').T
+
+
+def matrix_divide(left, right):
+    if is_matrix(left) and is_matrix(right):
+        return solve(left, right)
+    if is_sparse(left) and right != 0 and is_finite(right):
+        return left / right
+    return dense(left) / dense(right)
+
+
+def sparse_element_multiply(left, right):
+    if not skips_zeros(left, right):
+        return np.multiply(dense(left), dense(right))
+    if is_sparse(left):
+        return left.multiply(right) if is_matrix(right) else left * right
+    return right.multiply(left) if is_matrix(left) else left * right
+
+
+def sparse_element_divide(left, right):
+    # only a nonzero finite scalar divisor keeps the zeros of a sparse matrix zero, 0 / NaN is NaN
+    if is_sparse(left) and not is_matrix(right) and right != 0 and is_finite(right):
+        return left / right
+    return np.divide(dense(left), dense(right))
+
+
+add = sparse_aware(operator.add, sparse_add)
+subtract = sparse_aware(operator.sub, sparse_subtract)
+multiply = sparse_aware(matrix_multiply, sparse_multiply)
+divide = sparse_aware(matrix_divide, matrix_divide)
+
+element_add = sparse_aware(np.add, sparse_add)
+element_subtract = sparse_aware(np.subtract, sparse_subtract)
+element_multiply = sparse_aware(np.multiply, sparse_element_multiply)
+element_divide = sparse_aware(np.divide, sparse_element_divide)
@@ -0,0 +1,9 @@
+import sys
+
+
+class Memory:
+    def __init__(self, output=None):
+        self.variables = {}
+        self.output = sys.stdout if output is None else output
+        # set once a return statement ends the program, so a program run a statement at a time stops there
+        self.returned = False
@@ -0,0 +1,463 @@
+import numpy as np
+
+from interpreter.Interpreter import BINARY_OPERATORS
+from parser.ast import AST
+from parser.ast.TreePrinter import addToClass
+from parser.ast.Walker import Walker, is_deep, run_steps, walk
+
+ARITHMETIC = ('+', '-', '*', '/', '.+', '.-', '.*', './')
+ASSIGNMENTS = ('=', '+=', '-=', '*=', '/=')
+NUMERIC = ('int', 'float', 'scalar', 'matrix')
+
+# Statements holding statements, which are simplified on an explicit stack, see simplify_compound()
+COMPOUND = frozenset([AST.CodeBlock, AST.IfStatement, AST.WhileStatement, AST.ForStatement])
+
+
+# What is statically known about a value: its kind ('int', 'float', 'scalar' for a number of unknown type,
+# 'matrix' or 'string') and, for matrices, its (rows, columns) shape. Unknown parts are None.
+class Info:
+    def __init__(self, kind=None, shape=None):
+        self.kind = kind
+        self.shape = shape
+
+    def __eq__(self, other):
+        return isinstance(other, Info) and (self.kind, self.shape) == (other.kind, other.shape)
+
+    def is_square(self, size):
+        return self.kind == 'matrix' and self.shape == (size, size)
+
+
+UNKNOWN = Info()
+
+
+def count_nodes(node):
+    return sum(entering for _, entering in walk(node))
+
+
+def assigned_names(root):
+    names = set()
+    for node, entering in walk(root):
+        if not entering:
+            continue
+        if isinstance(node, AST.BinaryExpression) and node.op in ASSIGNMENTS:
+            target = node.left.variable if isinstance(node.left, AST.ElementAccessExpression) else node.left
+            names.add(target.name)
+        elif isinstance(node, AST.ForStatement):
+            names.add(node.iteration_variable_range.left.name)
+    return names
+
+
+# Names assigned anywhere inside each loop, by id of the loop, gathered bottom-up in one walk of the program.
+# A loop body runs many times, so these are all the variables whose values can change from one iteration to the
+# next. Assignments are statements, so the walk does not go into expressions, and the sets of children are
+# merged into the largest one, which keeps it close to linear.
+class LoopAssignments(Walker):
+    def __init__(self):
+        self.loops = {}
+
+    def children(self, node):
+        if type(node) == AST.CodeBlock:
+            return node.children
+        if type(node) == AST.IfStatement:
+            return [node.code_block] if node.else_statement is None else [node.code_block, node.else_statement]
+        if type(node) in (AST.WhileStatement, AST.ForStatement):
+            return [node.code_block]
+        return ()
+
+    def leave(self, node, values):
+        values = [names for names in values if names]
+        names = max(values, key=len) if values else None
+        for other in values:
+            if other is not names:
+                names |= other
+
+        target = None
+        if type(node) == AST.BinaryExpression and node.op in ASSIGNMENTS:
+            target = node.left.variable if isinstance(node.left, AST.ElementAccessExpression) else node.left
+        elif type(node) == AST.ForStatement:
+            target = node.iteration_variable_range.left
+        if target is not None:
+            names = names if names is not None else set()
+            names.add(target.name)
+
+        if type(node) in (AST.WhileStatement, AST.ForStatement):
+            self.loops[id(node)] = frozenset(names or ())
+        return names if names else None
+
+
+def literal(value, node):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if type(value) == int:
+        return AST.IntegerNumber(value, line=node.line, column=node.column)
+    if type(value) == float:
+        return AST.FloatNumber(value, line=node.line, column=node.column)
+    return None
+
+
+# Interned trees share expressions between places where variables can be known differently, so a simplified
+# operand goes into a copy of its expression rather than into the expression itself, which is kept as it is
+# when none of its operands changed.
+def rebuilt(node, **fields):
+    if all(getattr(node, field) is value for field, value in fields.items()):
+        return node
+    copy = object.__new__(type(node))
+    copy.line = node.line
+    copy.column = node.column
+    for field in type(node).__slots__:
+        setattr(copy, field, fields[field] if field in fields else getattr(node, field))
+    return copy
+
+
+def is_number(node, value=None):
+    return type(node) in (AST.IntegerNumber, AST.FloatNumber) and (value is None or node.value == value)
+
+
+def operator_info(op, left, right):
+    if op not in ARITHMETIC or left.kind not in NUMERIC or right.kind not in NUMERIC:
+        return UNKNOWN
+
+    if left.kind == 'matrix' and right.kind == 'matrix':
+        if left.shape is None or right.shape is None:
+            return Info('matrix')
+        if op == '*':
+            return Info('matrix', (left.shape[0], right.shape[1])) if left.shape[1] == right.shape[0] \
+                else UNKNOWN
+        if op == '/':
+            return Info('matrix', (left.shape[0], right.shape[0])) if left.shape[1] == right.shape[1] \
+                else UNKNOWN
+        return Info('matrix', left.shape) if left.shape == right.shape else UNKNOWN
+
+    if left.kind == 'matrix':
+        return left
+    if right.kind == 'matrix':
+        return right
+
+    if left.kind == right.kind == 'int' and op in ('+', '-', '*', '.+', '.-', '.*'):
+        return Info('int')
+    if 'float' in (left.kind, right.kind) or op in ('/', './'):
+        return Info('float') if 'scalar' not in (left.kind, right.kind) else Info('scalar')
+    return Info('scalar')
+
+
+# Simplifies nested operators like a+b+c+... on an explicit stack rather than recursing once per operator.
+# Each step returns the simplified node with its info, so no operand is inferred twice.
+class OperatorSimplifier(Walker):
+    def __init__(self, optimizer):
+        self.optimizer = optimizer
+
+    def children(self, node):
+        if type(node) == AST.BinaryExpression and node.op not in ASSIGNMENTS:
+            return [node.left, node.right]
+        return ()
+
+    def leave(self, node, values):
+        if not values:
+            node = node.simplify(self.optimizer)
+            return node, node.info(self.optimizer)
+
+        (left, left_info), (right, right_info) = values
+        node = rebuilt(node, left=left, right=right)
+        simplified = node.simplify_operator(self.optimizer, left_info, right_info)
+        if simplified is node:
+            return node, operator_info(node.op, left_info, right_info)
+        if simplified is node.left:
+            return simplified, left_info
+        if simplified is node.right:
+            return simplified, right_info
+        return simplified, simplified.info(self.optimizer)
+
+
+# Infers what is known about nested arithmetic on an explicit stack, see OperatorSimplifier.
+class OperatorInfo(Walker):
+    def __init__(self, optimizer):
+        self.optimizer = optimizer
+
+    def children(self, node):
+        if type(node) == AST.BinaryExpression and node.op in ARITHMETIC:
+            return [node.left, node.right]
+        return ()
+
+    def leave(self, node, values):
+        if values:
+            return operator_info(node.op, values[0], values[1])
+        return node.info(self.optimizer)
+
+
+# Simplifies a program before it is executed or compiled, in place except for expressions, see rebuilt():
+#     - arithmetic on number literals is folded,
+#     - double transposes cancel and transposes of eye/zeros/ones are dropped,
+#     - products with eye(n), sums with zeros(n), element-wise products with ones(n) and arithmetic
+#       identities with 0 and 1 are dropped when the other operand is known to have a fitting shape.
+# Kinds and shapes of variables are tracked along the program; anything assigned inside a loop or
+# a branch is forgotten where the control flow joins.
+class Optimizer:
+    def __init__(self):
+        self.variables = {}
+        self.removed = 0
+        self.loops = {}
+
+    # Names of what the loops of program assign are gathered in one walk before it is simplified, as walking
+    # each loop on its own would go through the body of a loop once more for every loop around it.
+    def optimize(self, program):
+        before = count_nodes(program)
+        loops = LoopAssignments()
+        loops.walk(program)
+        self.loops = loops.loops
+        program = program.simplify(self)
+        self.removed += before - count_nodes(program)
+        return program
+
+    def assigned(self, loop):
+        names = self.loops.get(id(loop))
+        return names if names is not None else assigned_names(loop)
+
+    def forget(self, names):
+        for name in names:
+            self.variables.pop(name, None)
+
+
+# Simplifies a statement and the statements nested in it through their simplify_steps(), which yield the
+# statements they hold and get them back simplified, so nesting depth is bounded by memory, not by the recursion
+# limit
+def simplify_compound(statement, optimizer):
+    def steps(node):
+        if node.__class__ in COMPOUND:
+            return node.simplify_steps(optimizer)
+        return node.simplify(optimizer)
+    return run_steps(statement, steps)
+
+
+def optimize(program):
+    optimizer = Optimizer()
+    program = optimizer.optimize(program)
+    return program, optimizer.removed
+
+
+# simplify() returns the node to use in place of self, info() what is known about its value.
+class Simplifier:
+    @addToClass(AST.Node)
+    def simplify(self, optimizer):
+        return self
+
+    @addToClass(AST.Node)
+    def info(self, optimizer):
+        return UNKNOWN
+
+    @addToClass(AST.CodeBlock)
+    def simplify_steps(self, optimizer):
+        children = []
+        for statement in self.children:
+            children.append((yield statement))
+        self.children = children
+        return self
+
+    @addToClass(AST.IntegerNumber)
+    def info(self, optimizer):
+        return Info('int')
+
+    @addToClass(AST.FloatNumber)
+    def info(self, optimizer):
+        return Info('float')
+
+    @addToClass(AST.StringValue)
+    def info(self, optimizer):
+        return Info('string')
+
+    @addToClass(AST.Variable)
+    def info(self, optimizer):
+        return optimizer.variables.get(self.name, UNKNOWN)
+
+    @addToClass(AST.ElementAccessExpression)
+    def info(self, optimizer):
+        return Info('scalar') if self.variable.info(optimizer).kind == 'matrix' else UNKNOWN
+
+    @addToClass(AST.ZerosStatement)
+    def info(self, optimizer):
+        return Info('matrix', (self.value, self.value))
+
+    @addToClass(AST.OnesStatement)
+    def info(self, optimizer):
+        return Info('matrix', (self.value, self.value))
+
+    @addToClass(AST.EyeStatement)
+    def info(self, optimizer):
+        return Info('matrix', (self.value, self.value))
+
+    @addToClass(AST.Matrix)
+    def info(self, optimizer):
+        if self.children and isinstance(self.children[0], AST.Matrix):
+            widths = set(len(row.children) for row in self.children)
+            if len(widths) != 1:
+                return UNKNOWN
+            return Info('matrix', (len(self.children), widths.pop()))
+        return Info('matrix', (1, len(self.children)))
+
+    @addToClass(AST.TransposeStatement)
+    def simplify(self, optimizer):
+        self = rebuilt(self, value=self.value.simplify(optimizer))
+
+        if isinstance(self.value, AST.TransposeStatement):
+            return self.value.value
+        if type(self.value) in (AST.IntegerNumber, AST.FloatNumber, AST.ZerosStatement, AST.OnesStatement,
+                                AST.EyeStatement):
+            return self.value
+        return self
+
+    @addToClass(AST.TransposeStatement)
+    def info(self, optimizer):
+        info = self.value.info(optimizer)
+        if info.kind == 'matrix' and info.shape is not None:
+            return Info('matrix', info.shape[::-1])
+        return info
+
+    @addToClass(AST.UnaryExpression)
+    def simplify(self, optimizer):
+        self = rebuilt(self, right=self.right.simplify(optimizer))
+
+        if isinstance(self.right, AST.UnaryExpression):
+            return self.right.right
+        if is_number(self.right):
+            return literal(-self.right.value, self)
+        return self
+
+    @addToClass(AST.UnaryExpression)
+    def info(self, optimizer):
+        return self.right.info(optimizer)
+
+    @addToClass(AST.BinaryExpression)
+    def simplify(self, optimizer):
+        if self.op in ASSIGNMENTS:
+            return self.simplify_assignment(optimizer)
+
+        if is_deep(self):
+            return OperatorSimplifier(optimizer).walk(self)[0]
+
+        self = rebuilt(self, left=self.left.simplify(optimizer), right=self.right.simplify(optimizer))
+        return self.simplify_operator(optimizer, self.left.info(optimizer), self.right.info(optimizer))
+
+    # Called with both operands already simplified and what is known about them.
+    @addToClass(AST.BinaryExpression)
+    def simplify_operator(self, optimizer, left_info, right_info):
+        if self.op not in ARITHMETIC:
+            return self
+
+        left, right = self.left, self.right
+
+        if is_number(left) and is_number(right) and not (self.op in ('/', './') and right.value == 0):
+            try:
+                return literal(BINARY_OPERATORS[self.op](left.value, right.value), self) or self
+            except (OverflowError, TypeError):
+                return self
+
+        # eye(n)*A, A*eye(n)
+        if self.op == '*' and type(left) == AST.EyeStatement and right_info.kind == 'matrix' \
+                and right_info.shape is not None and right_info.shape[0] == left.value:
+            return right
+        if self.op == '*' and type(right) == AST.EyeStatement and left_info.kind == 'matrix' \
+                and left_info.shape is not None and left_info.shape[1] == right.value:
+            return left
+
+        # zeros(n)+A, A+zeros(n), A-zeros(n) and element-wise forms
+        if self.op in ('+', '.+') and type(left) == AST.ZerosStatement and right_info.is_square(left.value):
+            return right
+        if self.op in ('+', '-', '.+', '.-') and type(right) == AST.ZerosStatement \
+                and left_info.is_square(right.value):
+            return left
+
+        # ones(n).*A, A.*ones(n), A./ones(n)
+        if self.op == '.*' and type(left) == AST.OnesStatement and right_info.is_square(left.value):
+            return right
+        if self.op in ('.*', './') and type(right) == AST.OnesStatement and left_info.is_square(right.value):
+            return left
+
+        # x+0, 0+x, x-0, x*1, 1*x with integer literals, which never change the type of x
+        if self.op in ('+', '.+') and type(left) == AST.IntegerNumber and left.value == 0 \
+                and right_info.kind in NUMERIC:
+            return right
+        if self.op in ('+', '-', '.+', '.-') and type(right) == AST.IntegerNumber and right.value == 0 \
+                and left_info.kind in NUMERIC:
+            return left
+        if self.op in ('*', '.*') and type(left) == AST.IntegerNumber and left.value == 1 \
+                and right_info.kind in NUMERIC:
+            return right
+        if self.op in ('*', '.*') and type(right) == AST.IntegerNumber and right.value == 1 \
+                and left_info.kind in NUMERIC:
+            return left
+
+        return self
+
+    @addToClass(AST.BinaryExpression)
+    def simplify_assignment(self, optimizer):
+        self.right = self.right.simplify(optimizer)
+
+        if isinstance(self.left, AST.Variable):
+            if self.op == '=':
+                optimizer.variables[self.left.name] = self.right.info(optimizer)
+            else:
+                operation = AST.BinaryExpression(self.op[:-1], self.left, self.right)
+                optimizer.variables[self.left.name] = operation.info(optimizer)
+        return self
+
+    @addToClass(AST.BinaryExpression)
+    def info(self, optimizer):
+        if self.op not in ARITHMETIC:
+            return UNKNOWN
+        if is_deep(self):
+            return OperatorInfo(optimizer).walk(self)
+        return operator_info(self.op, self.left.info(optimizer), self.right.info(optimizer))
+
+    @addToClass(AST.IfStatement)
+    def simplify_steps(self, optimizer):
+        self.condition = self.condition.simplify(optimizer)
+
+        before = dict(optimizer.variables)
+        self.code_block = yield self.code_block
+        after_then = optimizer.variables
+
+        optimizer.variables = dict(before)
+        if self.else_statement is not None:
+            self.else_statement = yield self.else_statement
+        after_else = optimizer.variables
+
+        optimizer.variables = {name: info for name, info in after_then.items() if after_else.get(name) == info}
+        return self
+
+    @addToClass(AST.WhileStatement)
+    def simplify_steps(self, optimizer):
+        assigned = optimizer.assigned(self)
+
+        optimizer.forget(assigned)
+        self.condition = self.condition.simplify(optimizer)
+        self.code_block = yield self.code_block
+        optimizer.forget(assigned)
+        return self
+
+    @addToClass(AST.ForStatement)
+    def simplify_steps(self, optimizer):
+        assigned = optimizer.assigned(self)
+        loop_range = self.iteration_variable_range.right
+
+        loop_range.left = loop_range.left.simplify(optimizer)
+        loop_range.right = loop_range.right.simplify(optimizer)
+
+        optimizer.forget(assigned)
+        optimizer.variables[self.iteration_variable_range.left.name] = Info('scalar')
+        self.code_block = yield self.code_block
+        optimizer.forget(assigned)
+        return self
+
+    @addToClass(AST.PrintStatement)
+    def simplify(self, optimizer):
+        self.values = [value.simplify(optimizer) for value in self.values]
+        return self
+
+    @addToClass(AST.ReturnStatement)
+    def simplify(self, optimizer):
+        if self.value is not None:
+            self.value = self.value.simplify(optimizer)
+        return self
+
+
+for kind in COMPOUND:
+    kind.simplify = simplify_compound
@@ -0,0 +1,256 @@
+import inspect
+import time
+import tracemalloc
+
+from parser.ast import AST
+
+# Profiling replaces the evaluate(), defer() and evaluate_steps() methods of the node classes with wrappers that
+# time each call, and puts the methods back when it ends, so a program run without it runs exactly the code it
+# always did.
+# For each node and each source line it records:
+#     - count: how many times it was evaluated,
+#     - cumulative time: from entering it to leaving it, including the nodes evaluated inside it,
+#     - self time: the cumulative time less that of the nodes inside it,
+#     - allocated bytes: the most memory the evaluation had allocated at once beyond what was allocated when it
+#       started, as traced by tracemalloc, which NumPy reports its arrays to. The first evaluations of a node
+#       also count the few hundred bytes the profiler keeps for it.
+# A line counts the evaluations that enter it from another line, so a+b*c on one line is one evaluation of it,
+# and its cumulative time is theirs; its self time adds up that of all its nodes. Blocks are not lines of their
+# own: their self time, the cost of going from one statement to the next, goes to the line holding them.
+# Time and allocations of operators an Expression defers (see interpreter.Fusion) go to the node that forces it.
+# The profiler is not thread-safe; statements run by interpreter.Scheduler cannot be profiled.
+
+# Methods replaced while profiling
+METHODS = ('evaluate', 'defer', 'evaluate_steps')
+
+# Frame names of nodes without a tree label of their own
+FRAME_NAMES = {AST.CodeBlock: "BLOCK", AST.VectorizedLoop: "VECTORIZED"}
+
+# Nodes that belong to the line of the statement holding them
+BLOCKS = (AST.CodeBlock,)
+
+# Nodes whose evaluation allocates nothing, whose memory is not looked at
+LEAVES = (AST.IntegerNumber, AST.FloatNumber, AST.StringValue, AST.Variable)
+
+
+def node_classes():
+    classes = []
+    pending = [AST.Node]
+    while pending:
+        cls = pending.pop()
+        classes.append(cls)
+        pending.extend(cls.__subclasses__())
+    return classes
+
+
+# The name of a node in a flame graph, where ';' separates frames
+def frame_name(node):
+    name = FRAME_NAMES.get(type(node))
+    if name is None:
+        try:
+            name = str(node.treeLabel())
+        except Exception:
+            name = type(node).__name__
+    return "{0} (line {1})".format(name.replace(';', ','), node.line)
+
+
+class Statistics:
+    __slots__ = ('count', 'total', 'own', 'allocated')
+
+    def __init__(self):
+        self.count = 0
+        # seconds
+        self.total = 0.0
+        self.own = 0.0
+        self.allocated = 0
+
+
+class Frame:
+    __slots__ = ('node', 'parent', 'line', 'path', 'traced', 'start', 'children', 'base', 'peak')
+
+    def __init__(self, node, parent, line, path, traced, base):
+        self.node = node
+        self.parent = parent
+        # the line the node counts for, None for the block of the whole program
+        self.line = line
+        self.path = path
+        # whether allocations are looked at
+        self.traced = traced
+        self.start = 0.0
+        # seconds spent in the nodes evaluated inside this one
+        self.children = 0.0
+        # traced bytes when the node was entered and the most traced since
+        self.base = base
+        self.peak = base
+
+
+# Profiles the programs run while it is enabled, as a context manager or with enable() and disable().
+# With memory=False allocations are not traced, which makes profiling several times faster. Times are floats of
+# seconds, as tracemalloc traces every new int but not the floats Python reuses.
+class Profiler:
+    def __init__(self, memory=True):
+        self.memory = memory
+        # by node; equal subtrees interned by the parser are one node, see parser.ast.Interner
+        self.nodes = {}
+        self.lines = {}
+        # seconds of self time by path of frame names
+        self.stacks = {}
+        self.stack = []
+        self.names = {}
+        # paths by path of the parent and frame name, built once
+        self.paths = {}
+        self.replaced = []
+        self.tracing = False
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exception):
+        self.disable()
+
+    def enable(self):
+        if self.replaced:
+            return
+        for cls in node_classes():
+            for name in METHODS:
+                method = cls.__dict__.get(name)
+                if method is not None:
+                    self.replaced.append((cls, name, method))
+                    setattr(cls, name, self.wrap(method))
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.tracing = True
+
+    def disable(self):
+        for cls, name, method in reversed(self.replaced):
+            setattr(cls, name, method)
+        self.replaced = []
+        if self.tracing:
+            tracemalloc.stop()
+            self.tracing = False
+
+    # The method timed. Statements holding statements are run by generators, see interpreter.Interpreter.execute(),
+    # which are timed from their first step to their last. The wrapper addToClass() puts around methods is left out:
+    # tracemalloc walks the whole stack on every allocation, so each frame more per node makes tracing slower.
+    def wrap(self, method):
+        method = getattr(method, '__wrapped__', method)
+        enter = self.enter
+        leave = self.leave
+
+        if inspect.isgeneratorfunction(method):
+            def profiled(node, memory):
+                frame = enter(node)
+                if frame is None:
+                    return (yield from method(node, memory))
+                try:
+                    return (yield from method(node, memory))
+                finally:
+                    leave(frame)
+        else:
+            def profiled(node, memory):
+                frame = enter(node)
+                if frame is None:
+                    return method(node, memory)
+                try:
+                    return method(node, memory)
+                finally:
+                    leave(frame)
+        return profiled
+
+    # The frame of an evaluation of node starting now, or None when it is part of the evaluation on top
+    def enter(self, node):
+        stack = self.stack
+        parent = stack[-1] if stack else None
+        if parent is not None and parent.node is node:
+            # evaluate() deferring to defer() or running evaluate_steps() is one evaluation
+            return None
+
+        name = self.names.get(node)
+        if name is None:
+            name = self.names[node] = frame_name(node)
+        if parent is not None:
+            path = self.paths.get((parent.path, name))
+            if path is None:
+                path = self.paths[parent.path, name] = parent.path + ';' + name
+            line = parent.line if isinstance(node, BLOCKS) else node.line
+        else:
+            path = name
+            line = None if isinstance(node, BLOCKS) else node.line
+
+        # the peak tracemalloc reports is the most traced since the frame on top of the stack was entered
+        traced = self.memory and not isinstance(node, LEAVES)
+        base = 0
+        if traced:
+            base, peak = tracemalloc.get_traced_memory()
+            if parent is not None and peak > parent.peak:
+                parent.peak = peak
+            tracemalloc.reset_peak()
+        frame = Frame(node, parent, line, path, traced, base)
+        stack.append(frame)
+        frame.start = time.perf_counter()
+        return frame
+
+    def leave(self, frame):
+        elapsed = time.perf_counter() - frame.start
+        self.stack.pop()
+        parent = frame.parent
+        if frame.traced:
+            # and of the frame under it from now on, as that includes this one
+            peak = tracemalloc.get_traced_memory()[1]
+            if peak > frame.peak:
+                frame.peak = peak
+            if parent is not None and frame.peak > parent.peak:
+                parent.peak = frame.peak
+        self.record(frame, parent, elapsed)
+
+    def record(self, frame, parent, elapsed):
+        node = frame.node
+        own = elapsed - frame.children
+        allocated = frame.peak - frame.base
+        if parent is not None:
+            parent.children += elapsed
+
+        statistics = self.nodes.get(node)
+        if statistics is None:
+            statistics = self.nodes[node] = Statistics()
+        statistics.count += 1
+        statistics.total += elapsed
+        statistics.own += own
+        statistics.allocated = max(statistics.allocated, allocated)
+
+        if frame.line is not None:
+            line = self.lines.get(frame.line)
+            if line is None:
+                line = self.lines[frame.line] = Statistics()
+            line.own += own
+            if not isinstance(node, BLOCKS) and (parent is None or parent.line != frame.line):
+                line.count += 1
+                line.total += elapsed
+                line.allocated = max(line.allocated, allocated)
+
+        self.stacks[frame.path] = self.stacks.get(frame.path, 0.0) + own
+
+    # The report: lines, then the nodes taking the most time, by cumulative time
+    def report(self, limit=20):
+        text = ["{0:>6} {1:>10} {2:>14} {3:>10} {4:>14}".format(
+            "line", "count", "cumulative [s]", "self [s]", "allocated [KB]")]
+        for number, line in sorted(self.lines.items(), key=lambda item: -item[1].total):
+            text.append("{0:>6} {1:>10} {2:>14.6f} {3:>10.6f} {4:>14.1f}".format(
+                number, line.count, line.total, line.own, line.allocated / 1024))
+
+        text.append("")
+        text.append("{0:>12} {1:<24} {2:>10} {3:>14} {4:>10} {5:>14}".format(
+            "position", "node", "count", "cumulative [s]", "self [s]", "allocated [KB]"))
+        nodes = sorted(self.nodes.items(), key=lambda entry: -entry[1].total)
+        for node, statistics in nodes[:limit]:
+            text.append("{0:>12} {1:<24} {2:>10} {3:>14.6f} {4:>10.6f} {5:>14.1f}".format(
+                "{0}:{1}".format(node.line, node.column), self.names[node].rsplit(' (line', 1)[0][:24],
+                statistics.count, statistics.total, statistics.own, statistics.allocated / 1024))
+        return "\n".join(text)
+
+    # Self time in microseconds by stack of frames, one "frame;frame;... count" line each, as flamegraph.pl and
+    # other flame graph tools read
+    def collapsed_stacks(self):
+        return "".join("{0} {1}\n".format(path, int(own * 1e6))
+                       for path, own in sorted(self.stacks.items()) if own >= 1e-6)
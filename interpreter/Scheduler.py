@@ -0,0 +1,239 @@
+import heapq
+import io
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from interpreter import Interpreter
+from interpreter.Memory import Memory
+from interpreter.Optimizer import ASSIGNMENTS, UNKNOWN, Optimizer, assigned_names, operator_info
+from parser.ast import AST
+from parser.ast.Walker import children, walk
+
+# Top-level statements of a program that do not depend on each other run at the same time: a statement waits only
+# for the statements before it that write a variable it reads or writes, or read a variable it writes. NumPy
+# releases the GIL in matrix products, solves and element-wise operations on large matrices, so independent heavy
+# statements run on several cores, while the others run in order on the calling thread, which costs less than
+# handing them over. Every variable gets the value it would get running the program in order, and each statement
+# prints into a buffer of its own that is written out in program order.
+#     - A statement with a return, break or continue anywhere in it waits for everything before it, and everything
+#       after it waits for it.
+#     - When a statement fails, the statements before it still run and the error is raised once they are done,
+#       after the output up to the error. Independent statements after it that were already running finish,
+#       so their variables may be set, but nothing they printed is written.
+# Matrix products already use every core through the BLAS library, so the gain is largest for element-wise
+# operations, matrix construction and loops running next to them.
+
+# Elements of a matrix from which working with it is heavy enough to be worth a thread
+HEAVY_SIZE = 2 ** 16
+
+# Statements that can hold other statements, which are worth a thread whatever they compute
+COMPOUND = (AST.CodeBlock, AST.IfStatement, AST.WhileStatement, AST.ForStatement, AST.VectorizedLoop)
+
+# Statements that change where the program goes next
+JUMPS = (AST.ReturnStatement, AST.BreakStatement, AST.ContinueStatement)
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def is_heavy_info(info):
+    return info.kind == 'matrix' and (info.shape is None or info.shape[0] * info.shape[1] >= HEAVY_SIZE)
+
+
+def is_assignment(node):
+    return type(node) == AST.BinaryExpression and node.op in ASSIGNMENTS
+
+
+# Names a statement reads and writes, those of them it reads whole rather than an element of, and whether it
+# jumps. The target of a plain assignment is only written, an element written is read and written, as the rest
+# of its matrix is kept.
+def accesses(statement):
+    reads = set()
+    whole = set()
+    writes = set()
+    jumps = False
+
+    def expand(node):
+        if is_assignment(node):
+            return [node.right]
+        if type(node) == AST.ElementAccessExpression:
+            return ()
+        return children(node)
+
+    for node, entering in walk(statement, expand):
+        if not entering:
+            continue
+        kind = type(node)
+        if kind == AST.Variable:
+            reads.add(node.name)
+            whole.add(node.name)
+        elif kind == AST.ElementAccessExpression:
+            reads.add(node.variable.name)
+        elif kind in JUMPS:
+            jumps = True
+        elif is_assignment(node):
+            target = node.left
+            if type(target) == AST.ElementAccessExpression:
+                reads.add(target.variable.name)
+                writes.add(target.variable.name)
+            else:
+                writes.add(target.name)
+                if node.op != '=':
+                    reads.add(target.name)
+                    whole.add(target.name)
+    return reads, whole, writes, jumps
+
+
+class Task:
+    __slots__ = ('index', 'statement', 'heavy', 'waiting', 'dependents')
+
+    def __init__(self, index, statement, heavy):
+        self.index = index
+        self.statement = statement
+        self.heavy = heavy
+        # statements this one still waits for
+        self.waiting = 0
+        self.dependents = []
+
+
+# The statements of a program with the dependencies between them. What is known of the kinds and shapes of
+# variables, as the optimizer tracks it, tells which statements are heavy.
+def plan(statements):
+    tasks = []
+    writers = {}
+    readers = {}
+    since_jump = []
+    jump = None
+    optimizer = Optimizer()
+
+    for index, statement in enumerate(statements):
+        reads, whole, writes, jumps = accesses(statement)
+        task = Task(index, statement, is_heavy(statement, whole, optimizer))
+
+        dependencies = set()
+        for name in reads | writes:
+            if name in writers:
+                dependencies.add(writers[name])
+        for name in writes:
+            dependencies.update(readers.get(name, ()))
+        if jumps:
+            dependencies.update(since_jump)
+            since_jump = []
+        elif jump is not None:
+            dependencies.add(jump)
+
+        for name in reads:
+            readers.setdefault(name, set()).add(index)
+        for name in writes:
+            writers[name] = index
+            readers[name] = set()
+        if jumps:
+            jump = index
+        else:
+            since_jump.append(index)
+
+        task.waiting = len(dependencies)
+        for dependency in dependencies:
+            tasks[dependency].dependents.append(index)
+        tasks.append(task)
+    return tasks
+
+
+# Whether a statement is worth a thread, given the names it reads whole, tracking what it assigns on the way
+def is_heavy(statement, whole, optimizer):
+    if isinstance(statement, COMPOUND):
+        optimizer.forget(assigned_names(statement))
+        return True
+
+    heavy = any(is_heavy_info(optimizer.variables.get(name, UNKNOWN)) for name in whole)
+    if is_assignment(statement):
+        info = statement.right.info(optimizer)
+        if type(statement.left) == AST.Variable:
+            if statement.op != '=':
+                info = operator_info(statement.op[:-1], statement.left.info(optimizer), info)
+            optimizer.variables[statement.left.name] = info
+        return heavy or is_heavy_info(info)
+    if type(statement) == AST.PrintStatement:
+        return heavy or any(is_heavy_info(value.info(optimizer)) for value in statement.values)
+    return heavy
+
+
+# What a statement printed and the exception it raised, if any. The statement has its own output and
+# shares the variables.
+def execute(statement, variables):
+    memory = Memory(io.StringIO())
+    memory.variables = variables
+    try:
+        # the error state is per thread, see Interpreter.run()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            statement.evaluate(memory)
+    except Exception as e:
+        return memory.output.getvalue(), e
+    return memory.output.getvalue(), None
+
+
+# A program to run with its independent statements in parallel, which Interpreter.run() takes in place of the
+# program. Programs with fewer than two heavy statements run in order as they are.
+class Schedule:
+    def __init__(self, program, workers=None):
+        self.program = program
+        self.workers = workers or default_workers()
+
+    def evaluate(self, memory):
+        statements = self.program.children if type(self.program) == AST.CodeBlock else [self.program]
+        tasks = plan(statements) if self.workers > 1 else []
+        if sum(task.heavy for task in tasks) < 2:
+            self.program.evaluate(memory)
+            return
+
+        ready = [task.index for task in tasks if task.waiting == 0]
+        heapq.heapify(ready)
+        outputs = [None] * len(tasks)
+        errors = {}
+        # the first statement that failed, after which nothing more is started
+        failed = len(tasks)
+        written = 0
+
+        def finish(index, result):
+            nonlocal failed
+            outputs[index], error = result
+            if error is not None:
+                errors[index] = error
+                failed = min(failed, index)
+                return
+            for dependent in tasks[index].dependents:
+                task = tasks[dependent]
+                task.waiting -= 1
+                if task.waiting == 0:
+                    heapq.heappush(ready, dependent)
+
+        running = {}
+        with ThreadPoolExecutor(self.workers) as pool:
+            while ready or running:
+                while ready:
+                    task = tasks[heapq.heappop(ready)]
+                    if task.index > failed:
+                        continue
+                    if task.heavy:
+                        running[pool.submit(execute, task.statement, memory.variables)] = task.index
+                    else:
+                        finish(task.index, execute(task.statement, memory.variables))
+                if running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finish(running.pop(future), future.result())
+
+                # output in program order, up to and including the statement that failed
+                while written <= failed and written < len(tasks) and outputs[written] is not None:
+                    memory.output.write(outputs[written])
+                    written += 1
+
+        if failed < len(tasks):
+            raise errors[failed]
+
+
+def run(program, memory=None, workers=None):
+    return Interpreter.run(Schedule(program, workers), memory)
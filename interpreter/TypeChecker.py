@@ -0,0 +1,363 @@
+from interpreter.Optimizer import ARITHMETIC, ASSIGNMENTS, NUMERIC, UNKNOWN, Info, LoopAssignments, operator_info
+from parser.Cache import paused_gc
+from parser.ast import AST
+from parser.ast.TreePrinter import addToClass
+from parser.ast.Walker import Walker, is_deep, run_steps
+
+ELEMENT_WISE = ('+', '-', '.+', '.-', '.*', './')
+
+# Statements holding statements, which are checked on an explicit stack, see check_compound()
+COMPOUND = frozenset([AST.CodeBlock, AST.IfStatement, AST.WhileStatement, AST.ForStatement])
+
+
+def shape_text(shape):
+    return "{0}x{1}".format(*shape)
+
+
+# Why op cannot be applied to values described by left and right, or None when it can or it is not known.
+# '*' and '/' are matrix operations on two matrices, everything else is element-wise, as in the interpreter.
+def operator_error(op, left, right):
+    if op not in ARITHMETIC:
+        return None
+    if 'string' in (left.kind, right.kind) and (left.kind in NUMERIC or right.kind in NUMERIC):
+        return "cannot apply '{0}' to a string and a number".format(op)
+    if left.kind != 'matrix' or right.kind != 'matrix' or left.shape is None or right.shape is None:
+        return None
+
+    if op == '*' and left.shape[1] != right.shape[0] or \
+            op == '/' and (right.shape[0] != right.shape[1] or left.shape[1] != right.shape[1]) or \
+            op in ELEMENT_WISE and left.shape != right.shape:
+        return "shapes {0} and {1} do not match in '{2}'".format(shape_text(left.shape), shape_text(right.shape), op)
+    return None
+
+
+# What two paths that join know about a value
+def join(first, second):
+    if first == second:
+        return first
+    if first.kind == second.kind:
+        return Info(first.kind)
+    return UNKNOWN
+
+
+# Variables in nested scopes: the program, then a scope for each branch and loop body being checked.
+# A scope holds what is known of the values of the variables assigned in it; when it closes they are joined into
+# the scope around it.
+class SymbolTable:
+    def __init__(self):
+        self.scopes = [{}]
+
+    # What is known of the value of a variable, or None when it is not assigned on any path
+    def lookup(self, name):
+        for scope in reversed(self.scopes):
+            info = scope.get(name)
+            if info is not None:
+                return info
+        return None
+
+    def assign(self, name, info):
+        self.scopes[-1][name] = info
+
+    def push(self):
+        self.scopes.append({})
+
+    def pop(self):
+        return self.scopes.pop()
+
+    # Joins the scopes of the two branches of an if into this one; a missing else branch has an empty scope
+    def merge(self, first, second):
+        for name in first.keys() | second.keys():
+            before = self.lookup(name)
+            one = first.get(name, before)
+            other = second.get(name, before)
+            if one is None or other is None:
+                self.assign(name, one or other)
+            else:
+                self.assign(name, join(one, other))
+
+    @property
+    def variables(self):
+        return {name: info for scope in self.scopes for name, info in scope.items()}
+
+
+# Checks arithmetic nested deeper than the interpreter recurses on an explicit stack, see OperatorInfo.
+class OperatorChecker(Walker):
+    def __init__(self, checker):
+        self.checker = checker
+
+    def children(self, node):
+        if type(node) == AST.BinaryExpression and node.op not in ASSIGNMENTS:
+            return [node.left, node.right]
+        return ()
+
+    def leave(self, node, values):
+        if values:
+            return self.checker.operator(node, node.op, values[0], values[1])
+        return node.check(self.checker)
+
+
+# Semantic analysis of a parsed program, reporting every error it finds in one walk:
+#     - variables used before they are assigned on any path,
+#     - operands whose shapes do not fit the operator, with shapes inferred from eye, zeros, ones and matrix
+#       literals and carried along assignments,
+#     - indices outside a matrix of known shape, and indexing of values that are not matrices,
+#     - matrix literals with rows of different lengths,
+#     - break and continue outside of a loop.
+# Only what is certain is reported: a variable assigned in a loop is unknown throughout the loop, and where
+# branches join a variable keeps only what both agree on.
+# A checker can be given the statements of a program one at a time, as the optimizer can; variables
+# holds the kinds and shapes inferred for the variables after the statements checked so far.
+class TypeChecker:
+    def __init__(self):
+        self.symbols = SymbolTable()
+        self.errors = []
+        self.loops = {}
+        self.loop_depth = 0
+
+    # Checks program and returns the errors found in it.
+    # Like parsing, checking makes many small objects and no cycles, so the cyclic collector is paused for it.
+    def check(self, program):
+        first = len(self.errors)
+        with paused_gc():
+            loops = LoopAssignments()
+            loops.walk(program)
+            self.loops = loops.loops
+            program.check(self)
+        return self.errors[first:]
+
+    @property
+    def variables(self):
+        return self.symbols.variables
+
+    def error(self, node, message):
+        self.errors.append("Semantic error at line {0}, column {1}: {2}".format(node.line, node.column, message))
+
+    def operator(self, node, op, left, right):
+        message = operator_error(op, left, right)
+        if message is not None:
+            self.error(node, message)
+            return UNKNOWN
+        return operator_info(op, left, right)
+
+    # Opens the scope of a loop body, where every variable the loop assigns may already hold any value
+    def enter_loop(self, loop):
+        self.symbols.push()
+        for name in self.loops.get(id(loop), ()):
+            self.symbols.assign(name, UNKNOWN)
+        self.loop_depth += 1
+
+    # The body may run any number of times, so nothing is known of what it assigns
+    def leave_loop(self):
+        self.loop_depth -= 1
+        for name in self.symbols.pop():
+            self.symbols.assign(name, UNKNOWN)
+
+    def index(self, node, info):
+        if info.kind is not None and info.kind != 'matrix':
+            self.error(node, "'{0}' is not a matrix and cannot be indexed".format(node.variable.name))
+            return
+
+        indices = node.index.children
+        if any(index < 1 for index in indices):
+            self.error(node, "index {0} of '{1}': indices start at 1".format(indices, node.variable.name))
+        elif len(indices) > 2:
+            self.error(node, "{0} indices for the 2-dimensional '{1}'".format(len(indices), node.variable.name))
+        elif info.shape is not None:
+            limits = info.shape if len(indices) == 2 else (info.shape[0] * info.shape[1],)
+            if any(index > limit for index, limit in zip(indices, limits)):
+                self.error(node, "index {0} out of range for '{1}' of shape {2}".format(
+                    indices, node.variable.name, shape_text(info.shape)))
+
+
+def check(program):
+    return TypeChecker().check(program)
+
+
+# Checks a statement and the statements nested in it through their check_steps(), which yield the statements they
+# hold in the order they are checked
+def check_compound(statement, checker):
+    def steps(node):
+        if node.__class__ in COMPOUND:
+            return node.check_steps(checker)
+        return node.check(checker)
+    return run_steps(statement, steps)
+
+
+# check() checks a node and returns what is known about its value
+class Checker:
+    @addToClass(AST.Node)
+    def check(self, checker):
+        return UNKNOWN
+
+    @addToClass(AST.CodeBlock)
+    def check_steps(self, checker):
+        for statement in self.children:
+            yield statement
+        return UNKNOWN
+
+    @addToClass(AST.IntegerNumber)
+    def check(self, checker):
+        return Info('int')
+
+    @addToClass(AST.FloatNumber)
+    def check(self, checker):
+        return Info('float')
+
+    @addToClass(AST.StringValue)
+    def check(self, checker):
+        return Info('string')
+
+    @addToClass(AST.Variable)
+    def check(self, checker):
+        info = checker.symbols.lookup(self.name)
+        if info is None:
+            checker.error(self, "variable '{0}' is used before it is assigned".format(self.name))
+            # reported once: from here on it is as if it were assigned on some path
+            checker.symbols.assign(self.name, UNKNOWN)
+            return UNKNOWN
+        return info
+
+    @addToClass(AST.BinaryExpression)
+    def check(self, checker):
+        if self.op in ASSIGNMENTS:
+            return self.check_assignment(checker)
+        if is_deep(self):
+            return OperatorChecker(checker).walk(self)
+        return checker.operator(self, self.op, self.left.check(checker), self.right.check(checker))
+
+    @addToClass(AST.BinaryExpression)
+    def check_assignment(self, checker):
+        value = self.right.check(checker)
+
+        if isinstance(self.left, AST.ElementAccessExpression):
+            target = self.left.check(checker)
+            if self.op != '=':
+                checker.operator(self, self.op[:-1], target, value)
+            elif value.kind == 'matrix' and value.shape is not None and value.shape != (1, 1) or \
+                    value.kind == 'string':
+                # a matrix of unknown shape may be 1x1, which the interpreter stores as its element
+                checker.error(self, "cannot store a {0} in an element of '{1}'".format(
+                    value.kind, self.left.variable.name))
+            return UNKNOWN
+
+        if self.op != '=':
+            value = checker.operator(self, self.op[:-1], self.left.check(checker), value)
+        checker.symbols.assign(self.left.name, value)
+        return UNKNOWN
+
+    @addToClass(AST.UnaryExpression)
+    def check(self, checker):
+        info = self.right.check(checker)
+        if info.kind == 'string':
+            checker.error(self, "cannot negate a string")
+            return UNKNOWN
+        return info
+
+    @addToClass(AST.Matrix)
+    def check(self, checker):
+        if self.children and isinstance(self.children[0], AST.Matrix):
+            rows = [row.children for row in self.children]
+        else:
+            rows = [self.children]
+        for row in rows:
+            for value in row:
+                value.check(checker)
+
+        widths = set(len(row) for row in rows)
+        if len(widths) > 1:
+            checker.error(self, "matrix rows differ in length")
+            return Info('matrix')
+        return Info('matrix', (len(rows), widths.pop()))
+
+    @addToClass(AST.ElementAccessExpression)
+    def check(self, checker):
+        checker.index(self, self.variable.check(checker))
+        return Info('scalar')
+
+    @addToClass(AST.TransposeStatement)
+    def check(self, checker):
+        info = self.value.check(checker)
+        if info.kind == 'matrix' and info.shape is not None:
+            return Info('matrix', info.shape[::-1])
+        return info
+
+    @addToClass(AST.ZerosStatement)
+    def check(self, checker):
+        return Info('matrix', (self.value, self.value))
+
+    @addToClass(AST.OnesStatement)
+    def check(self, checker):
+        return Info('matrix', (self.value, self.value))
+
+    @addToClass(AST.EyeStatement)
+    def check(self, checker):
+        return Info('matrix', (self.value, self.value))
+
+    @addToClass(AST.RangeExpression)
+    def check(self, checker):
+        for bound in (self.left, self.right):
+            if bound.check(checker).kind in ('matrix', 'string'):
+                checker.error(bound, "range bounds must be numbers")
+        return UNKNOWN
+
+    @addToClass(AST.PrintStatement)
+    def check(self, checker):
+        for value in self.values:
+            value.check(checker)
+        return UNKNOWN
+
+    @addToClass(AST.ReturnStatement)
+    def check(self, checker):
+        if self.value is not None:
+            self.value.check(checker)
+        return UNKNOWN
+
+    @addToClass(AST.BreakStatement)
+    def check(self, checker):
+        if not checker.loop_depth:
+            checker.error(self, "'break' outside of a loop")
+        return UNKNOWN
+
+    @addToClass(AST.ContinueStatement)
+    def check(self, checker):
+        if not checker.loop_depth:
+            checker.error(self, "'continue' outside of a loop")
+        return UNKNOWN
+
+    @addToClass(AST.IfStatement)
+    def check_steps(self, checker):
+        self.condition.check(checker)
+
+        checker.symbols.push()
+        yield self.code_block
+        then_scope = checker.symbols.pop()
+
+        checker.symbols.push()
+        if self.else_statement is not None:
+            yield self.else_statement
+        else_scope = checker.symbols.pop()
+
+        checker.symbols.merge(then_scope, else_scope)
+        return UNKNOWN
+
+    @addToClass(AST.WhileStatement)
+    def check_steps(self, checker):
+        checker.enter_loop(self)
+        self.condition.check(checker)
+        yield self.code_block
+        checker.leave_loop()
+        return UNKNOWN
+
+    @addToClass(AST.ForStatement)
+    def check_steps(self, checker):
+        self.iteration_variable_range.right.check(checker)
+
+        checker.enter_loop(self)
+        checker.symbols.assign(self.iteration_variable_range.left.name, Info('scalar'))
+        yield self.code_block
+        checker.leave_loop()
+        return UNKNOWN
+
+
+for kind in COMPOUND:
+    kind.check = check_compound
@@ -0,0 +1,358 @@
+import numpy as np
+
+from interpreter.Interpreter import to_index
+from interpreter.Optimizer import ARITHMETIC, ASSIGNMENTS
+from parser.ast import AST
+from parser.ast.TreePrinter import addToClass
+from parser.ast.Walker import Walker, walk
+
+# A for loop whose body only assigns values computed from the loop variable and from variables the loop does not
+# assign runs all its iterations at once: each expression is evaluated for a whole range of the loop variable as
+# one NumPy array operation, a plain assignment keeps the value of the last iteration, and a compound one like
+# s += i or A[1, 2] *= i folds the values in with ufunc.accumulate, which applies the operator left to right
+# exactly as the loop does. Results are the same numbers of the same types as an iteration at a time.
+# Element indices are integer literals in this language, so the elements a loop writes are the same in every
+# iteration, and a loop reading anything it assigns depends on its earlier iterations and is not vectorized.
+# The analysis is static; at run time a loop whose values the arrays would not reproduce exactly falls back to
+# running an iteration at a time, as do short loops:
+#     - values that are not numbers, integers beyond INTEGER_LIMIT anywhere in the computation, where NumPy
+#       would overflow or round unlike Python, and '/' by zero, which raises in Python;
+#     - undefined variables or indices out of range, so the error comes from the loop as it would have.
+MIN_ITERATIONS = 32
+
+# Iterations computed at once, which bounds the memory of the arrays
+CHUNK_SIZE = 2 ** 16
+
+# Integers of this magnitude or more are not computed in arrays
+INTEGER_LIMIT = 2 ** 53
+
+# Functions of the operators on numbers; the dotted ones give NumPy scalars even on Python numbers
+FUNCTIONS = {'+': np.add, '-': np.subtract, '*': np.multiply, '/': np.divide,
+             '.+': np.add, '.-': np.subtract, '.*': np.multiply, './': np.divide}
+
+# Classes of numbers a vectorized loop computes with, and whether they are NumPy scalars
+NUMBERS = {int: False, float: False, np.int64: True, np.float64: True}
+
+# What a loop body may not contain, as reported
+STATEMENT_OBSTACLES = {
+    AST.PrintStatement: "it prints",
+    AST.IfStatement: "it branches",
+    AST.WhileStatement: "it contains a loop",
+    AST.ForStatement: "it contains a loop",
+    AST.VectorizedLoop: "it contains a loop",
+    AST.BreakStatement: "it breaks out of the loop",
+    AST.ContinueStatement: "it continues the loop",
+    AST.ReturnStatement: "it returns",
+}
+
+EXPRESSION_OBSTACLES = {
+    AST.StringValue: "a string",
+    AST.Matrix: "a matrix",
+    AST.TransposeStatement: "a transpose",
+    AST.ZerosStatement: "zeros()",
+    AST.OnesStatement: "ones()",
+    AST.EyeStatement: "eye()",
+}
+
+
+class Fallback(Exception):
+    pass
+
+
+def loop_variable(loop):
+    return loop.iteration_variable_range.left.name
+
+
+def target_name(target):
+    return target.variable.name if type(target) == AST.ElementAccessExpression else target.name
+
+
+def target_key(target):
+    if type(target) == AST.ElementAccessExpression:
+        return target.variable.name, tuple(target.index.children)
+    return target.name
+
+
+# The statements of a loop body, with nested blocks flattened
+def statements(block):
+    for node, entering in walk(block, lambda node: node.children if type(node) == AST.CodeBlock else ()):
+        if entering and type(node) != AST.CodeBlock:
+            yield node
+
+
+def is_assignment(node):
+    return type(node) == AST.BinaryExpression and node.op in ASSIGNMENTS
+
+
+# Why the iterations of loop cannot run at once, or None when they can
+def obstacle(loop):
+    body = list(statements(loop.code_block))
+    if not body:
+        return "its body is empty"
+
+    variable = loop_variable(loop)
+    keys = set()
+    # names assigned whole and names of matrices whose elements are assigned
+    names = set()
+    matrices = set()
+    for statement in body:
+        if not is_assignment(statement):
+            return STATEMENT_OBSTACLES.get(type(statement), "it has a statement that is not an assignment")
+        name = target_name(statement.left)
+        if name == variable:
+            return "it assigns the loop variable '{0}'".format(name)
+        key = target_key(statement.left)
+        if key in keys:
+            return "it assigns '{0}' more than once".format(name)
+        keys.add(key)
+        (matrices if type(key) == tuple else names).add(name)
+    if names & matrices:
+        return "it assigns '{0}' and its elements".format(min(names & matrices))
+
+    assigned = names | matrices
+    for statement in body:
+        for node, entering in walk(statement.right):
+            if not entering:
+                continue
+            kind = type(node)
+            if kind in EXPRESSION_OBSTACLES:
+                return "it computes with {0}".format(EXPRESSION_OBSTACLES[kind])
+            if kind == AST.BinaryExpression and node.op not in ARITHMETIC:
+                return "it uses '{0}', which has no vectorized form".format(node.op)
+            if kind == AST.Variable and node.name in assigned:
+                return "an iteration reads '{0}', which the iterations before it assign".format(node.name)
+    return None
+
+
+# Replaces the for loops that can run at once with VectorizedLoops and reports on every loop
+class Vectorizer(Walker):
+    def __init__(self):
+        # (line, column, message) for each loop, in the order the walk leaves them, inner loops first
+        self.loops = []
+
+    def vectorize(self, program):
+        return self.walk(program)
+
+    @property
+    def report(self):
+        return [message for _, _, message in sorted(self.loops, key=lambda loop: loop[:2])]
+
+    def children(self, node):
+        kind = type(node)
+        if kind == AST.CodeBlock:
+            return node.children
+        if kind == AST.IfStatement:
+            return [node.code_block] if node.else_statement is None else [node.code_block, node.else_statement]
+        if kind in (AST.WhileStatement, AST.ForStatement):
+            return [node.code_block]
+        return ()
+
+    def leave(self, node, values):
+        kind = type(node)
+        if kind == AST.CodeBlock:
+            node.children[:] = values
+        elif kind == AST.IfStatement:
+            node.code_block = values[0]
+            if node.else_statement is not None:
+                node.else_statement = values[1]
+        elif kind in (AST.WhileStatement, AST.ForStatement):
+            node.code_block = values[0]
+
+        if kind != AST.ForStatement:
+            return node
+
+        reason = obstacle(node)
+        message = "Loop over '{0}' at line {1}, column {2} is ".format(loop_variable(node), node.line, node.column)
+        if reason is not None:
+            self.loops.append((node.line, node.column, message + "not vectorized: " + reason))
+            return node
+        self.loops.append((node.line, node.column, message + "vectorized"))
+        return AST.VectorizedLoop(node, line=node.line, column=node.column)
+
+
+# The program with its independent loops vectorized, and the report on its loops
+def vectorize(program):
+    vectorizer = Vectorizer()
+    program = vectorizer.vectorize(program)
+    return program, vectorizer.report
+
+
+# A value of an expression over a chunk of iterations: an array, or a number when it is the same in all of them,
+# whether the loop would have it as a NumPy scalar, and for integers an upper bound of their magnitude
+class Vector:
+    __slots__ = ('value', 'numpy', 'bound')
+
+    def __init__(self, value, numpy, bound=None):
+        self.value = value
+        self.numpy = numpy
+        self.bound = bound
+
+    def is_integer(self):
+        return self.bound is not None
+
+
+def checked_bound(bound):
+    if not bound < INTEGER_LIMIT:
+        raise Fallback()
+    return bound
+
+
+def number(value):
+    numpy = NUMBERS.get(value.__class__)
+    if numpy is None:
+        raise Fallback()
+    if value.__class__ in (int, np.int64):
+        return Vector(value, numpy, checked_bound(float(abs(value))))
+    return Vector(value, numpy)
+
+
+# The value of an element of a matrix of floats
+def element(memory, node):
+    matrix = memory.variables.get(node.variable.name)
+    if matrix.__class__ is not np.ndarray or matrix.dtype != np.float64:
+        raise Fallback()
+    try:
+        return matrix[to_index(matrix, node.index.children)]
+    except IndexError:
+        raise Fallback()
+
+
+def apply(op, left, right):
+    bound = None
+    if left.is_integer() and right.is_integer() and op not in ('/', './'):
+        bound = checked_bound(left.bound * right.bound if op in ('*', '.*') else left.bound + right.bound)
+
+    # Python raises on division by zero, NumPy gives inf or nan as the dotted operator does
+    numpy = op[0] == '.' or left.numpy or right.numpy
+    if op == '/' and not numpy and np.any(np.equal(right.value, 0)):
+        raise Fallback()
+
+    return Vector(FUNCTIONS[op](left.value, right.value), numpy, bound)
+
+
+# Evaluates the expressions of a vectorized loop for a chunk of its iterations
+class ChunkEvaluator(Walker):
+    def __init__(self, memory, variable, values):
+        self.memory = memory
+        self.variable = variable
+        self.values = values
+
+    def children(self, node):
+        if type(node) == AST.BinaryExpression:
+            return [node.left, node.right]
+        if type(node) == AST.UnaryExpression:
+            return [node.right]
+        return ()
+
+    def leave(self, node, values):
+        kind = type(node)
+        if kind == AST.BinaryExpression:
+            return apply(node.op, values[0], values[1])
+        if kind == AST.UnaryExpression:
+            operand = values[0]
+            return Vector(np.negative(operand.value), operand.numpy, operand.bound)
+        if kind in (AST.IntegerNumber, AST.FloatNumber):
+            return number(node.value)
+        if kind == AST.Variable:
+            if node.name == self.variable:
+                return self.values
+            if node.name not in self.memory.variables:
+                raise Fallback()
+            return number(self.memory.variables[node.name])
+        if kind == AST.ElementAccessExpression:
+            return Vector(element(self.memory, node), True)
+        raise Fallback()
+
+
+# Where the result of one assignment of the body goes and what it holds so far
+class Target:
+    def __init__(self, memory, statement):
+        self.statement = statement
+        self.function = FUNCTIONS.get(statement.op[0]) if statement.op != '=' else None
+        self.value = None
+
+        # an element is looked up even when it is only written, which fails as the loop would
+        target = statement.left
+        if type(target) == AST.ElementAccessExpression:
+            value = element(memory, target)
+            if self.function is not None:
+                self.value = Vector(value, True)
+        elif self.function is not None:
+            if target.name not in memory.variables:
+                raise Fallback()
+            self.value = number(memory.variables[target.name])
+
+    # Takes in the values of the right side for a chunk of n iterations
+    def update(self, vector, n):
+        if self.function is None:
+            value = vector.value[-1] if vector.value.__class__ is np.ndarray else vector.value
+            self.value = Vector(value, vector.numpy, vector.bound)
+            return
+
+        op = self.statement.op[0]
+        current = self.value
+        integer = current.is_integer() and vector.is_integer() and op != '/'
+        bound = None
+        if integer:
+            if op == '*':
+                bound = checked_bound(current.bound * vector.bound ** n)
+            else:
+                bound = checked_bound(current.bound + vector.bound * n)
+
+        numpy = current.numpy or vector.numpy
+        if op == '/' and not numpy and np.any(np.equal(vector.value, 0)):
+            raise Fallback()
+
+        values = np.empty(n + 1, dtype=np.int64 if integer else np.float64)
+        values[0] = current.value
+        values[1:] = vector.value
+        self.value = Vector(self.function.accumulate(values)[-1], numpy, bound)
+
+    def store(self, memory):
+        value = self.value.value
+        if not self.value.numpy and isinstance(value, np.generic):
+            value = value.item()
+        target = self.statement.left
+        if type(target) == AST.ElementAccessExpression:
+            target.store(memory, value)
+        else:
+            memory.variables[target.name] = value
+
+
+# Runs the iterations of a loop as arrays, or returns False without having changed anything
+# when the loop has to run an iteration at a time
+def run(loop, memory):
+    values = loop.iteration_variable_range.right.evaluate(memory)
+    if len(values) < MIN_ITERATIONS:
+        return False
+
+    variable = loop_variable(loop)
+    try:
+        first, last = number(values[0]), number(values[-1])
+        bound = max(first.bound, last.bound) if first.is_integer() and last.is_integer() else None
+
+        body = list(statements(loop.code_block))
+        targets = [Target(memory, statement) for statement in body]
+        for start in range(0, len(values), CHUNK_SIZE):
+            chunk = values[start:start + CHUNK_SIZE]
+            if type(chunk) == range:
+                array = np.arange(chunk.start, chunk.stop, dtype=np.int64)
+            else:
+                array = np.array(chunk, dtype=np.int64 if bound is not None else np.float64)
+            evaluator = ChunkEvaluator(memory, variable, Vector(array, first.numpy, bound))
+            for target in targets:
+                target.update(evaluator.walk(target.statement.right), len(array))
+    except Fallback:
+        return False
+
+    for target in targets:
+        target.store(memory)
+    memory.variables[variable] = values[-1]
+    return True
+
+
+class LoopRunner:
+    @addToClass(AST.VectorizedLoop)
+    def evaluate_steps(self, memory):
+        if not run(self.loop, memory):
+            yield self.loop
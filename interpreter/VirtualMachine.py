@@ -0,0 +1,175 @@
+import numpy as np
+
+from interpreter.Compiler import ADD, SUBTRACT, JUMP_UNLESS_EQUAL, JUMP, JUMP_UNLESS, GET_RANGE, \
+    FOR_ITER, MOVE, COPY, NEGATIVE, TRANSPOSE, ZEROS, ONES, EYE, LOAD_ELEMENT, STORE_ELEMENT, PRINT, RETURN, STRAY, \
+    BINARY_FUNCTIONS, OPERATOR_SYMBOLS, JUMP_OFFSET, READS
+from interpreter import Matrices
+from interpreter.Interpreter import is_true, make_range, to_index
+from interpreter.Memory import Memory
+
+EXHAUSTED = object()
+
+
+# Value of a variable that has not been assigned yet. Operations that would not fail on an arbitrary
+# object fail on it, the others are caught when the error is reported.
+class Undefined:
+    __array_ufunc__ = None
+
+    def __init__(self, name):
+        self.name = name
+
+    def fail(self, *args):
+        raise NameError("undefined variable '{0}'".format(self.name))
+
+    __eq__ = __ne__ = __bool__ = __str__ = fail
+    __hash__ = object.__hash__
+
+
+# Runs compiled code. Variables, constants and temporaries live in one flat list of registers,
+# variables are loaded from and written back to memory around the run.
+def run(code, memory=None):
+    if memory is None:
+        memory = Memory()
+
+    registers = [None] * code.register_count
+    for register, name in code.names:
+        registers[register] = memory.variables[name] if name in memory.variables else Undefined(name)
+    for register, value in code.constants:
+        registers[register] = value
+
+    try:
+        with np.errstate(divide='ignore', invalid='ignore'), Matrices.quiet():
+            memory.returned = execute(code, registers, memory.output)
+    finally:
+        for register, name in code.names:
+            if registers[register].__class__ is not Undefined:
+                memory.variables[name] = registers[register]
+
+    return memory
+
+
+# Returns whether a return statement ended the program before the end of its code
+def execute(code, registers, output):
+    instructions = code.instructions.tolist()
+    binary = BINARY_FUNCTIONS
+    integer = int
+    printing = []
+    pc = 0
+
+    try:
+        while True:
+            opcode = instructions[pc]
+            a = instructions[pc + 1]
+            b = instructions[pc + 2]
+            c = instructions[pc + 3]
+            pc += 4
+
+            if opcode == ADD:
+                left = registers[b]
+                right = registers[c]
+                if left.__class__ is integer and right.__class__ is integer:
+                    registers[a] = left + right
+                else:
+                    registers[a] = Matrices.add(left, right)
+            elif opcode == SUBTRACT:
+                left = registers[b]
+                right = registers[c]
+                if left.__class__ is integer and right.__class__ is integer:
+                    registers[a] = left - right
+                else:
+                    registers[a] = Matrices.subtract(left, right)
+            elif opcode == FOR_ITER:
+                value = next(registers[a], EXHAUSTED)
+                if value is EXHAUSTED:
+                    pc = c
+                else:
+                    registers[b] = value
+            elif opcode == JUMP:
+                pc = a
+            elif opcode < JUMP_UNLESS_EQUAL:
+                registers[a] = binary[opcode](registers[b], registers[c])
+            elif opcode < JUMP:
+                value = binary[opcode](registers[b], registers[c])
+                if not (value if value.__class__ is bool else is_true(value)):
+                    pc = a
+            elif opcode == JUMP_UNLESS:
+                value = registers[b]
+                if not (value if value.__class__ is bool else is_true(value)):
+                    pc = a
+            elif opcode == MOVE:
+                value = registers[b]
+                if value.__class__ is Undefined:
+                    value.fail()
+                registers[a] = value
+            elif opcode == COPY:
+                value = registers[b]
+                if Matrices.is_matrix(value):
+                    value = value.copy()
+                elif value.__class__ is Undefined:
+                    value.fail()
+                registers[a] = value
+            elif opcode == LOAD_ELEMENT:
+                matrix = registers[b]
+                registers[a] = matrix[to_index(matrix, registers[c])]
+            elif opcode == STORE_ELEMENT:
+                matrix = registers[a]
+                registers[a] = Matrices.store(matrix, to_index(matrix, registers[c]), registers[b])
+            elif opcode == GET_RANGE:
+                registers[a] = iter(make_range(registers[b], registers[c]))
+            elif opcode == NEGATIVE:
+                registers[a] = -registers[b]
+            elif opcode == TRANSPOSE:
+                value = registers[b]
+                if Matrices.is_matrix(value):
+                    value = value.T
+                elif value.__class__ is Undefined:
+                    value.fail()
+                registers[a] = value
+            elif opcode == ZEROS:
+                registers[a] = Matrices.zeros(b)
+            elif opcode == ONES:
+                registers[a] = Matrices.ones(b)
+            elif opcode == EYE:
+                registers[a] = Matrices.eye(b)
+            elif opcode == PRINT:
+                value = registers[a]
+                if value.__class__ is Undefined:
+                    value.fail()
+                printing.append(Matrices.dense(value))
+                if b:
+                    print(*printing, file=output)
+                    printing = []
+            elif opcode == RETURN:
+                return pc < len(instructions)
+            elif opcode == STRAY:
+                raise RuntimeError("Runtime error at line {0}, column {1}: '{2}' outside of a loop".format(
+                    code.lines[pc // 4 - 1], code.columns[pc // 4 - 1], ('break', 'continue')[a]))
+            else:
+                raise SystemError("unknown opcode {0}".format(opcode))
+    except (NameError, ValueError, IndexError, TypeError, AttributeError, ZeroDivisionError,
+            np.linalg.LinAlgError) as e:
+        raise runtime_error(code, registers, instructions, pc - 4, e)
+
+
+def runtime_error(code, registers, instructions, offset, error):
+    opcode = instructions[offset]
+    operands = instructions[offset + 1:offset + 4]
+    names = dict(code.names)
+
+    line = code.lines[offset // 4]
+    column = code.columns[offset // 4]
+    message = str(error)
+    undefined = [operand for operand in READS.get(opcode, ())
+                 if registers[operands[operand - 1]].__class__ is Undefined]
+
+    if undefined:
+        message = "undefined variable '{0}'".format(registers[operands[undefined[0] - 1]].name)
+        line, column = code.reads.get((offset // 4, undefined[0]), (line, column))
+    elif opcode < JUMP:
+        symbol = OPERATOR_SYMBOLS[opcode if opcode < JUMP_UNLESS_EQUAL else opcode - JUMP_OFFSET]
+        message = "cannot evaluate '{0}': {1}".format(symbol, error)
+    elif opcode in (LOAD_ELEMENT, STORE_ELEMENT):
+        matrix = operands[1] if opcode == LOAD_ELEMENT else operands[0]
+        message = "index {0} out of range for '{1}'".format(list(registers[operands[2]]), names.get(matrix))
+
+    return RuntimeError("Runtime error at line {0}, column {1}: {2}".format(line, column, message))
@@ -0,0 +1 @@
+__all__ = ["Interpreter", "Memory", "Compiler", "VirtualMachine", "Optimizer", "TypeChecker", "Matrices", "Fusion", "Vectorizer", "Scheduler", "Profiler"]
@@ -1,26 +1,290 @@
+import argparse
+import os
 import sys
+import time
 
-from parser import Mparser
-from scanner import scanner
+from parser import Cache
+
+DEFAULT_TABLE_CACHE = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+                                   'compiler', 'tables')
+
+# Extension of trees stored with --save-ast, as in parser.ast.Binary, which is not imported unless needed
+SAVED_AST_SUFFIX = '.mast'
+
+# Seconds between checks of the file in watch mode
+WATCH_INTERVAL = 0.2
 
 if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Parse a matrix language program and print its AST.")
+    arg_parser.add_argument('filename', nargs='?', default="examples/full.txt")
+    arg_parser.add_argument('--execute', action='store_true', help="run the program instead of printing its AST")
+    arg_parser.add_argument('--optimize', action='store_true',
+                            help="fold constants and drop identity operations before printing or running")
+    arg_parser.add_argument('--vectorize', action='store_true',
+                            help="run for loops whose iterations are independent over their whole range at once "
+                                 "and report on standard error why the others are run an iteration at a time")
+    arg_parser.add_argument('--check', action='store_true',
+                            help="check the program for semantic errors, like operands of mismatched shapes, "
+                                 "before printing or running it, and report all of them instead")
+    arg_parser.add_argument('--backend', choices=['ast', 'vm'], default='ast',
+                            help="with --execute, walk the tree or compile it to bytecode for the register VM")
+    arg_parser.add_argument('--jobs', '-j', type=int, nargs='?', const=0, default=None, metavar='N',
+                            help="with --execute on the ast backend, run independent top-level statements that "
+                                 "work on large matrices on N threads (default one per core); output stays in "
+                                 "program order")
+    arg_parser.add_argument('--profile', action='store_true',
+                            help="count and time the evaluations of every node and line of the program, with the "
+                                 "memory they allocate, and print the busiest to standard error")
+    arg_parser.add_argument('--flamegraph', metavar='FILE',
+                            help="profile the program and write the time of its nodes to FILE as collapsed stacks "
+                                 "for flame graph tools; implies --profile")
+    arg_parser.add_argument('--output', '-o', type=argparse.FileType('w'), default=sys.stdout, metavar='FILE',
+                            help="write the AST to FILE instead of standard output")
+    arg_parser.add_argument('--table-cache', nargs='?', const=DEFAULT_TABLE_CACHE, default=None, metavar='DIR',
+                            help="fast startup: load lexer and parser tables pregenerated in DIR "
+                                 "(default {0}), regenerating them only when the grammar changes"
+                                 .format(DEFAULT_TABLE_CACHE))
+    arg_parser.add_argument('--scanner', choices=['ply', 'fast'], default='ply',
+                            help="lex with PLY or with the faster regex lexer, which gives the same tokens")
+    arg_parser.add_argument('--ast-cache', nargs='?', const=Cache.DEFAULT_DIR, default=None, metavar='DIR',
+                            help="load the AST of a file parsed before from DIR (default {0}) instead of parsing it "
+                                 "again, and store it there otherwise".format(Cache.DEFAULT_DIR))
+    arg_parser.add_argument('--ast-cache-size', type=float, default=Cache.DEFAULT_MAX_SIZE / 2 ** 20, metavar='MB',
+                            help="evict the least recently used ASTs when the cache grows past MB megabytes "
+                                 "(default %(default)g)")
+    arg_parser.add_argument('--cache-stats', action='store_true',
+                            help="print AST cache hits, misses and size to standard error")
+    arg_parser.add_argument('--save-ast', metavar='FILE',
+                            help="also store the parsed tree in FILE in the binary AST format; a FILE ending in "
+                                 "{0} can be given in place of a program to use its tree without parsing"
+                            .format(SAVED_AST_SUFFIX))
+    arg_parser.add_argument('--intern', action='store_true',
+                            help="store equal expressions, like a literal matrix written many times, once and "
+                                 "print how many were shared to standard error; errors in a shared expression "
+                                 "give the position of its first occurrence")
+    arg_parser.add_argument('--watch', action='store_true',
+                            help="keep running and print or run the program again each time the file is saved, "
+                                 "reparsing only the statements that changed")
+    arg_parser.add_argument('--stream', action='store_true',
+                            help="print or run each top-level statement as soon as it is parsed, reading the file "
+                                 "a chunk at a time, so a huge program starts at once and is never held whole; "
+                                 "statements before a syntax error still run")
+    args = arg_parser.parse_args()
+    if args.jobs is not None and args.backend != 'ast':
+        arg_parser.error("--jobs needs the ast backend")
+    args.profile = args.profile or args.flamegraph is not None
+    if args.profile and (not args.execute or args.backend != 'ast' or args.jobs is not None):
+        arg_parser.error("--profile and --flamegraph need --execute with the ast backend and without --jobs")
+    if args.watch and args.intern:
+        arg_parser.error("--watch cannot be combined with --intern: statements reparsed after an edit would share "
+                         "expressions whose positions belong to other statements")
+    if args.stream and (args.watch or args.ast_cache or args.save_ast):
+        arg_parser.error("--stream cannot be combined with --watch, --ast-cache or --save-ast, "
+                         "which need the whole program")
+
+    def report_profile(profiler):
+        print(profiler.report(), file=sys.stderr)
+        if args.flamegraph is not None:
+            with open(args.flamegraph, 'w') as stacks:
+                stacks.write(profiler.collapsed_stacks())
+
+    def process(ast):
+        if args.check:
+            from interpreter import TypeChecker
+            errors = TypeChecker.check(ast)
+            if errors:
+                print("\n".join(errors))
+                return
+        if args.optimize:
+            from interpreter import Optimizer
+            ast, removed = Optimizer.optimize(ast)
+            print("Optimizer removed {0} nodes".format(removed), file=sys.stderr)
+        if args.vectorize:
+            from interpreter import Vectorizer
+            ast, report = Vectorizer.vectorize(ast)
+            for line in report:
+                print(line, file=sys.stderr)
+        if args.execute and args.jobs is not None:
+            from interpreter import Scheduler
+            Scheduler.run(ast, workers=args.jobs or None)
+        elif args.execute and args.profile:
+            from interpreter import Interpreter
+            from interpreter.Profiler import Profiler
+            profiler = Profiler()
+            try:
+                with profiler:
+                    Interpreter.run(ast)
+            finally:
+                report_profile(profiler)
+        elif args.execute and args.backend == 'ast':
+            from interpreter import Interpreter
+            Interpreter.run(ast)
+        elif args.execute:
+            from interpreter import Compiler, VirtualMachine
+            VirtualMachine.run(Compiler.compile_program(ast))
+        else:
+            ast.printTree(file=args.output)
+
+    # The statements of a streamed program share the variables and what the optimizer knows about them,
+    # as the statements of one program do
+    # Once a statement has semantic errors the rest are only checked.
+    def process_statements(blocks):
+        if args.check:
+            from interpreter.TypeChecker import TypeChecker
+            checker = TypeChecker()
+        if args.optimize:
+            from interpreter.Optimizer import Optimizer
+            optimizer = Optimizer()
+        if args.vectorize:
+            from interpreter import Vectorizer
+        if args.execute:
+            from interpreter import Compiler, Interpreter, Scheduler, VirtualMachine
+            from interpreter.Memory import Memory
+            memory = Memory()
+        if args.profile:
+            from interpreter.Profiler import Profiler
+            profiler = Profiler()
+            profiler.enable()
+
+        try:
+            for block in blocks:
+                if args.check:
+                    errors = checker.check(block)
+                    if errors:
+                        print("\n".join(errors))
+                    if checker.errors:
+                        continue
+                if args.optimize:
+                    block = optimizer.optimize(block)
+                if args.vectorize:
+                    block, report = Vectorizer.vectorize(block)
+                    for line in report:
+                        print(line, file=sys.stderr)
+                if args.execute and args.jobs is not None:
+                    Scheduler.run(block, memory, workers=args.jobs or None)
+                elif args.execute and args.backend == 'ast':
+                    Interpreter.run(block, memory)
+                elif args.execute:
+                    VirtualMachine.run(Compiler.compile_program(block), memory)
+                else:
+                    block.printTree(file=args.output)
+                if args.execute and memory.returned:
+                    break
+        finally:
+            if args.profile:
+                profiler.disable()
+                report_profile(profiler)
+            if args.optimize:
+                print("Optimizer removed {0} nodes".format(optimizer.removed), file=sys.stderr)
+
+    if args.filename.endswith(SAVED_AST_SUFFIX):
+        from parser.ast import Binary
+        try:
+            ast = Binary.load(args.filename).program
+        except (OSError, ValueError) as e:
+            print("Cannot load {0}: {1}".format(args.filename, e))
+            sys.exit(0)
+        try:
+            process(ast)
+        except RuntimeError as e:
+            print(e)
+        sys.exit(0)
 
     try:
-        filename = sys.argv[1] if len(sys.argv) > 1 else "examples/full.txt"
+        filename = args.filename
         file = open(filename, "r")
     except IOError:
         print("Cannot open {0} file".format(filename))
         sys.exit(0)
 
-    text = file.read()
+    if args.intern:
+        from parser.ast.Interner import Interner
+        interner = Interner()
+    else:
+        interner = None
 
-    lexer = scanner.Scanner()
-    lexer.build()
+    def report_interned():
+        if interner is not None:
+            print("Interned {0} distinct expressions, {1} more occurrences shared them"
+                  .format(len(interner), interner.shared), file=sys.stderr)
 
-    parser = Mparser.Parser(lexer)
+    # Importing PLY and loading its tables takes longer than loading a cached tree, so it waits until needed
+    def build_parser():
+        from parser import Mparser
+        from scanner import scanner
 
-    try:
-       ast = parser.parse(text, lexer=lexer)
-       ast.printTree()
-    except SyntaxError as e:
-        print(e)
+        lexer = scanner.Scanner(args.scanner)
+        lexer.build(cache_dir=args.table_cache)
+        return lexer, Mparser.Parser(lexer, cache_dir=args.table_cache, interner=interner)
+
+    if args.stream:
+        from scanner.scanner import TokenFeed
+        lexer, parser = build_parser()
+        try:
+            process_statements(parser.parse_statements(TokenFeed(lexer.stream(file))))
+        except (SyntaxError, RuntimeError) as e:
+            print(e)
+        report_interned()
+        sys.exit(0)
+
+    if not args.watch:
+        cache = Cache.ASTCache(args.ast_cache, int(args.ast_cache_size * 2 ** 20)) if args.ast_cache else None
+        try:
+            # the cache needs the whole text for its key, otherwise the scanner reads the file a chunk at a time
+            text = file.read() if cache is not None else None
+            ast = cache.load(text) if cache is not None else None
+            if ast is None:
+                lexer, parser = build_parser()
+                if text is None:
+                    from scanner.scanner import TokenFeed
+                    ast = parser.parse(None, lexer=TokenFeed(lexer.stream(file)))
+                else:
+                    ast = parser.parse(text, lexer=lexer)
+                if cache is not None and ast is not None and not cache.store(text, ast):
+                    print("AST not cached: {0}".format(cache.failure), file=sys.stderr)
+            elif interner is not None:
+                ast = interner.intern(ast)
+            report_interned()
+            if args.save_ast and ast is not None:
+                from parser.ast import Binary
+                with open(args.save_ast, 'wb') as saved:
+                    Binary.dump(ast, saved)
+            process(ast)
+        except (SyntaxError, RuntimeError) as e:
+            print(e)
+        if cache is not None and args.cache_stats:
+            cache.report()
+        sys.exit(0)
+
+    # Watch mode keeps the program parsed between saves and reparses only the statements each save changed.
+    # The optimizer and the vectorizer rewrite the tree in place, so they get a copy rather than the tree kept for
+    # the next save.
+    from parser.Incremental import IncrementalParser, find_edit
+    from parser.ast.Walker import copy_tree
+    lexer, parser = build_parser()
+    incremental = IncrementalParser(parser, lexer)
+    text = file.read()
+    parsed = ''
+    modified = os.stat(filename).st_mtime_ns
+    while True:
+        try:
+            incremental.edit(*find_edit(parsed, text))
+            process(copy_tree(incremental.program) if args.optimize or args.vectorize else incremental.program)
+        except (SyntaxError, RuntimeError) as e:
+            print(e)
+        args.output.flush()
+        parsed = text
+
+        try:
+            while text == parsed:
+                time.sleep(WATCH_INTERVAL)
+                try:
+                    if os.stat(filename).st_mtime_ns != modified:
+                        modified = os.stat(filename).st_mtime_ns
+                        with open(filename, "r") as file:
+                            text = file.read()
+                except OSError:
+                    # the file is being replaced by an editor saving it
+                    pass
+        except KeyboardInterrupt:
+            sys.exit(0)
@@ -0,0 +1,142 @@
+import contextlib
+import glob
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from parser import Cache, Mparser
+from scanner import scanner
+
+# Extension of the programs picked up from a directory
+SUFFIX = '.txt'
+
+# Scanner and parser of a worker process, built once by start_worker() and used for every file it gets
+worker = None
+
+
+# What parsing one file gave: the wall and CPU time it took, everything the scanner and parser reported, whether
+# the tree came from the AST cache and, when asked for, the tree. Trees are sent back as the flat tables of
+# parser.Cache.flatten(), which pickle at any depth, and only rebuilt when read.
+class Result:
+    def __init__(self, filename, size, seconds, cpu, diagnostics, tree=None, cached=False):
+        self.filename = filename
+        self.size = size
+        self.seconds = seconds
+        self.cpu = cpu
+        self.diagnostics = diagnostics
+        self.tree = tree
+        self.cached = cached
+
+    @property
+    def ok(self):
+        return not self.diagnostics
+
+    @property
+    def ast(self):
+        if self.tree is None:
+            return None
+        with Cache.paused_gc():
+            return Cache.unflatten(*self.tree)
+
+
+# Files named by each path: a directory stands for the programs anywhere below it, anything else is a glob.
+# Each file is listed once, in the order the paths name them.
+def find_files(paths):
+    filenames = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, subdirectories, names in os.walk(path):
+                subdirectories.sort()
+                filenames.extend(os.path.join(directory, name) for name in sorted(names) if name.endswith(SUFFIX))
+        else:
+            filenames.extend(sorted(glob.glob(path, recursive=True)))
+    return list(dict.fromkeys(filenames))
+
+
+def start_worker(cache_dir, keep_trees, output_dir, root, ast_cache, backend='ply'):
+    global worker
+
+    lexer = scanner.Scanner(backend)
+    lexer.build(cache_dir=cache_dir)
+    parser = Mparser.Parser(lexer, cache_dir=cache_dir)
+    if ast_cache is not None:
+        ast_cache = Cache.ASTCache(*ast_cache)
+    worker = (lexer, parser, keep_trees, output_dir, root, ast_cache)
+
+
+# Parses one file with the worker's scanner and parser. Scanner and parser errors are printed to standard output,
+# so they are captured and kept as the file's diagnostics.
+def parse_file(filename):
+    lexer, parser, keep_trees, output_dir, root, ast_cache = worker
+
+    start = time.perf_counter()
+    cpu = time.process_time()
+    diagnostics = []
+    ast = None
+    cached = False
+    size = 0
+    with contextlib.redirect_stdout(io.StringIO()) as messages:
+        try:
+            with open(filename, "r") as file:
+                text = file.read()
+            size = len(text)
+            ast = ast_cache.load(text) if ast_cache is not None else None
+            cached = ast is not None
+            if not cached:
+                ast = parser.parse(text, lexer=lexer)
+                if ast_cache is not None and ast is not None:
+                    ast_cache.store(text, ast)
+        except Mparser.ParseErrors as e:
+            diagnostics.extend(e.errors)
+        except (OSError, UnicodeDecodeError) as e:
+            diagnostics.append(str(e))
+    diagnostics[:0] = messages.getvalue().splitlines()
+
+    tree = None
+    if ast is not None and output_dir is not None:
+        target = os.path.join(output_dir, os.path.relpath(os.path.abspath(filename), root) + '.ast')
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "w") as file:
+            ast.printTree(file=file)
+    if ast is not None and keep_trees:
+        with Cache.paused_gc():
+            tree = Cache.flatten(ast)
+
+    return Result(filename, size, time.perf_counter() - start, time.process_time() - cpu, diagnostics, tree,
+                  cached)
+
+
+# Parses filenames on a pool of jobs worker processes and returns their results in the same order.
+# The lexer and LALR tables are built here once and stored in cache_dir (a temporary directory when not given),
+# so each worker only loads them. Every worker keeps its scanner and parser for all the files it is handed.
+# keep_trees sends each AST back to this process; output_dir has the workers print each AST to a .ast file
+# there instead, mirroring the files' paths below their common directory.
+# ast_cache is the (directory, max_size) of an AST cache the workers load trees from and store them in.
+# backend is the scanner backend the workers lex with, one of scanner.BACKENDS.
+def compile_files(filenames, jobs=None, cache_dir=None, keep_trees=False, output_dir=None, ast_cache=None,
+                  backend='ply'):
+    jobs = jobs or os.cpu_count() or 1
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(filename)) for filename in filenames]) \
+        if filenames else os.getcwd()
+
+    temporary = cache_dir is None
+    if temporary:
+        cache_dir = tempfile.mkdtemp()
+    try:
+        # generates the tables the workers load
+        start_worker(cache_dir, keep_trees, output_dir, root, ast_cache, backend)
+
+        if jobs == 1 or len(filenames) < 2:
+            return [parse_file(filename) for filename in filenames]
+
+        # a few chunks per worker amortises the messages between processes and still balances uneven files
+        chunksize = max(1, len(filenames) // (jobs * 8))
+        with multiprocessing.Pool(jobs, start_worker,
+                              (cache_dir, keep_trees, output_dir, root, ast_cache, backend)) as pool:
+            return pool.map(parse_file, filenames, chunksize)
+    finally:
+        if temporary:
+            shutil.rmtree(cache_dir, ignore_errors=True)
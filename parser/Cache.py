@@ -0,0 +1,239 @@
+import contextlib
+import gc
+import hashlib
+import os
+import marshal
+import sys
+import tempfile
+import zlib
+
+from parser.ast import AST
+from parser.ast.Walker import children
+
+# Bumped whenever the way trees are stored changes
+FORMAT = 3
+
+# Modules whose changes can change the tree parsed from the same source
+SOURCES = [os.path.join('scanner', 'scanner.py'), os.path.join('parser', 'Mparser.py'),
+           os.path.join('parser', 'ast', 'AST.py')]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'compiler', 'ast')
+DEFAULT_MAX_SIZE = 256 * 2 ** 20
+
+SUFFIX = '.ast'
+
+
+# Fingerprint of the scanner, grammar and node classes, read from their source so that computing it does not
+# import PLY or build any tables.
+def version():
+    digest = hashlib.sha256("{0} {1}".format(FORMAT, marshal.version).encode())
+    for source in SOURCES:
+        with open(os.path.join(ROOT, source), 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()[:16]
+
+
+# Pickling or unpickling a tree makes or fills in a node at a time without creating any reference cycles, so, as
+# while parsing, the cyclic collector would only rescan an ever-growing heap.
+@contextlib.contextmanager
+def paused_gc():
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+# A tree as a flat table of lists, tuples, numbers and strings, which marshal and pickle store and load without
+# recursing once per level of the tree, as pickle does for nested nodes: the class names, then a
+# (class, line, column, fields...) record per node, the root first, where a child node is the 1-tuple of its
+# number. A node reached twice, as after interning, is stored once.
+def flatten(root):
+    numbers = {}
+    nodes = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if id(node) in numbers:
+            continue
+        numbers[id(node)] = len(nodes)
+        nodes.append(node)
+        stack.extend(reversed(children(node)))
+
+    classes = {}
+    records = []
+    for node in nodes:
+        cls = type(node)
+        record = [classes.setdefault(cls.__name__, len(classes)), node.line, node.column]
+        for field in cls.__slots__:
+            value = getattr(node, field, None)
+            if isinstance(value, AST.Node):
+                value = (numbers[id(value)],)
+            elif type(value) == list:
+                value = [(numbers[id(item)],) if isinstance(item, AST.Node) else item for item in value]
+            record.append(value)
+        records.append(tuple(record))
+    return list(classes), records
+
+
+# The tree of a flat table. Only node classes are made, so a damaged or forged table makes no other objects.
+def unflatten(classes, records):
+    classes = [getattr(AST, name, None) for name in classes]
+    for cls in classes:
+        if not (isinstance(cls, type) and issubclass(cls, AST.Node)):
+            raise ValueError("not a node class")
+    nodes = [object.__new__(classes[record[0]]) for record in records]
+    for node, record in zip(nodes, records):
+        node.line = record[1]
+        node.column = record[2]
+        for field, value in zip(type(node).__slots__, record[3:]):
+            if type(value) == tuple:
+                value = nodes[value[0]]
+            elif type(value) == list:
+                value = [nodes[item[0]] if type(item) == tuple else item for item in value]
+            setattr(node, field, value)
+    return nodes[0]
+
+
+# Parsed programs stored on disk under the hash of their source and the version of the parser that built them,
+# so an unchanged file is loaded without lexing or parsing it again and a change to the grammar or the nodes
+# leaves every old entry unused. Trees are flattened, marshalled and compressed, so trees of any depth are stored.
+# Unlike unpickling, loading an entry runs no code it names, so a cache directory others can write to is safe.
+# Entries are files named by their key; loading one touches it, so modification times order the entries from
+# least to most recently used. Storing an entry evicts the least recently used ones until the cache fits in
+# max_size bytes. The size is counted from the directory once and then kept up to date with what this cache
+# stores, so other processes sharing the directory can take it past max_size until this one looks again.
+# Writes go through a rename, so processes sharing a cache never read a partial entry.
+class ASTCache:
+    def __init__(self, directory=DEFAULT_DIR, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.version = version()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.failures = 0
+        # why the last tree that was not stored was not
+        self.failure = None
+        # bytes in the directory as last counted plus what was stored since
+        self.size = None
+
+    def key(self, text):
+        digest = hashlib.sha256(self.version.encode())
+        digest.update(text.encode())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key[2:] + SUFFIX)
+
+    # The tree stored for text, or None
+    def load(self, text):
+        path = self.path(self.key(text))
+        try:
+            with open(path, 'rb') as file, paused_gc():
+                ast = unflatten(*marshal.loads(zlib.decompress(file.read())))
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, zlib.error, EOFError, AttributeError, IndexError, TypeError, ValueError):
+            # a damaged entry is dropped and parsed again
+            self.misses += 1
+            self.remove(path)
+            return None
+
+        self.hits += 1
+        return ast
+
+    # Stores the tree parsed from text and returns whether it did; when it did not, failure says why.
+    def store(self, text, ast):
+        with paused_gc():
+            data = zlib.compress(marshal.dumps(flatten(ast)))
+        if len(data) > self.max_size:
+            return self.fail("the tree takes {0} bytes, more than the whole cache".format(len(data)))
+
+        path = self.path(self.key(text))
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            descriptor, staging = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(descriptor, 'wb') as file:
+                    file.write(data)
+                os.replace(staging, path)
+            except OSError:
+                self.remove(staging)
+                raise
+        except OSError as e:
+            return self.fail(str(e))
+
+        self.stores += 1
+        if self.size is not None:
+            self.size += len(data)
+        if self.size is None or self.size > self.max_size:
+            self.evict()
+        return True
+
+    def fail(self, reason):
+        self.failures += 1
+        self.failure = reason
+        return False
+
+    # (path, size, last use) of every entry
+    def entries(self):
+        entries = []
+        for directory, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(SUFFIX):
+                    path = os.path.join(directory, name)
+                    try:
+                        status = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((path, status.st_size, status.st_mtime_ns))
+        return entries
+
+    def evict(self):
+        entries = self.entries()
+        size = sum(entry_size for _, entry_size, _ in entries)
+        self.size = size
+        if size <= self.max_size:
+            return
+
+        entries.sort(key=lambda entry: entry[2])
+        for path, entry_size, _ in entries:
+            if size <= self.max_size:
+                break
+            if self.remove(path):
+                self.evictions += 1
+            size -= entry_size
+        self.size = size
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            self.remove(path)
+        self.size = 0
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    # Number of entries and the bytes they take
+    def usage(self):
+        entries = self.entries()
+        return len(entries), sum(size for _, size, _ in entries)
+
+    def report(self, file=sys.stderr):
+        count, size = self.usage()
+        print("AST cache {0}: {1} hits, {2} misses, {3} stored, {4} not stored, {5} evicted; {6} entries, "
+              "{7:.1f} of {8:.1f} MB".format(self.directory, self.hits, self.misses, self.stores, self.failures,
+                                             self.evictions, count, size / 2 ** 20, self.max_size / 2 ** 20),
+              file=file)
@@ -0,0 +1,191 @@
+import numpy as np
+
+from parser.Mparser import ParseErrors, split_statements
+from parser.ast.AST import CodeBlock
+from parser.ast.Walker import walk
+from scanner.scanner import TokenFeed, has_open_string
+
+
+# The edit turning old into new, as (start, end, replacement) with old[start:end] replaced.
+# Bisects over slice comparisons for the common prefix and suffix, which is fast on long texts.
+def find_edit(old, new):
+    low, high = 0, min(len(old), len(new))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[:middle] == new[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    prefix = low
+
+    low, high = 0, min(len(old), len(new)) - prefix
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[len(old) - middle:] == new[len(new) - middle:]:
+            low = middle
+        else:
+            high = middle - 1
+    return prefix, len(old) - low, new[prefix:len(new) - low]
+
+
+# Rows of IncrementalParser.table, which has a column per piece
+START, LINE, COLUMN, FIRST, SHIFT, DIRTY = range(6)
+
+
+# Keeps a program parsed while its text is edited, for editors and watch mode.
+#     The text is kept as pieces, each starting where a top-level statement starts. An edit re-lexes and reparses
+#     only the pieces on the lines it touches and splices their nodes into program.children; every other
+#     statement's subtree is reused as it is.
+#     table holds for each piece the offset, line and column of its start, the index of its first node in
+#     program.children, how many lines its nodes are to be moved by and whether it has to be lexed again with
+#     the next edit, as it did not parse or holds a string that later text may close. Everything after an edit
+#     moves by the same amount, which is a single NumPy operation per column rather than a loop over the pieces.
+#     Moving the nodes of the later statements to their new lines takes a walk over them, so it waits until
+#     program is read, which moves every node once as no two statements share one. A parser interning
+#     expressions would have them share nodes, so it is not accepted.
+class IncrementalParser:
+    def __init__(self, parser, lexer):
+        if parser.interner is not None:
+            raise ValueError("An incremental parser cannot intern expressions: shared nodes cannot follow the "
+                             "lines of every statement they occur in")
+        self.parser = parser
+        self.lexer = lexer
+        self.reset()
+
+    def reset(self):
+        self.block = CodeBlock()
+        self.texts = ['']
+        self.table = np.array([[0], [1], [1], [0], [0], [0]], dtype=np.int64)
+        # number of top-level statements the last parse or edit went through
+        self.reparsed = 0
+
+    @property
+    def program(self):
+        for index in np.flatnonzero(self.table[SHIFT]):
+            shift = int(self.table[SHIFT, index])
+            for child in self.block.children[self.first(index):self.first(index + 1)]:
+                for node, entering in walk(child):
+                    if entering:
+                        node.line += shift
+            self.table[SHIFT, index] = 0
+        return self.block
+
+    @property
+    def text(self):
+        return ''.join(self.texts)
+
+    def parse(self, text):
+        self.reset()
+        self.edit(0, 0, text)
+        return self.program
+
+    # Replaces text[start:end] with replacement and updates program.
+    # Syntax errors are raised together once the rest of the edit is applied: a statement with an error is left out
+    # of the program and parsed again, and its errors raised again, with every edit until it is fixed.
+    def edit(self, start, end, replacement):
+        count = len(self.texts)
+        first = self.find(start)
+        last = self.find(end)
+        dirty = np.flatnonzero(self.table[DIRTY])
+        if len(dirty):
+            first, last = min(first, int(dirty[0])), max(last, int(dirty[-1]))
+
+        while True:
+            offset, line, column = (int(value) for value in self.table[START:FIRST, first])
+            old = ''.join(self.texts[first:last + 1])
+            text = old[:start - offset] + replacement + old[end - offset:]
+
+            # A piece starting on the last line of the edit has moved along it and is lexed again as well,
+            # so is everything after a string the edit leaves open.
+            if last + 1 < count:
+                newline = text.rfind('\n')
+                if (column + len(text) if newline < 0 else len(text) - newline) != self.table[COLUMN, last + 1]:
+                    last += 1
+                    continue
+                if has_open_string(text):
+                    last = count - 1
+                    continue
+
+            pieces, blocks, errors, complete = self.reparse(text, offset, line, column)
+            if pieces is None:
+                first -= 1
+            elif (not complete or first == 0 and not self.reparsed) and last + 1 < count:
+                # the program takes its position from its first statement
+                last += 1
+            else:
+                break
+
+        begin, stop = self.first(first), self.first(last + 1)
+        children = [child for block in blocks if block is not None for child in block.children]
+        self.block.children[begin:stop] = children
+        if first == 0 and blocks[0] is not None:
+            self.block.line, self.block.column = blocks[0].line, blocks[0].column
+
+        columns = np.zeros((len(self.table), len(pieces)), dtype=np.int64)
+        for column, (piece_start, piece_stop, piece_line, piece_column), block in zip(columns.T, pieces, blocks):
+            column[START:FIRST] = offset + piece_start, piece_line, piece_column
+            column[FIRST] = begin
+            column[DIRTY] = block is None or has_open_string(text[piece_start:piece_stop])
+            begin += len(block.children) if block is not None else 0
+
+        if last + 1 < count:
+            later = self.table[:, last + 1:]
+            lines = line + text.count('\n') - int(later[LINE, 0])
+            later[START] += len(text) - len(old)
+            later[FIRST] += len(children) - (stop - self.first(first))
+            if lines:
+                later[LINE] += lines
+                later[SHIFT] += lines
+
+        self.texts[first:last + 1] = [text[piece_start:piece_stop] for piece_start, piece_stop, _, _ in pieces]
+        if len(pieces) == last + 1 - first:
+            self.table[:, first:last + 1] = columns
+        else:
+            self.table = np.concatenate((self.table[:, :first], columns, self.table[:, last + 1:]), axis=1)
+
+        if errors:
+            raise ParseErrors(errors)
+
+    # Lexes and parses text, which starts at offset, line and column of the program, one top-level statement
+    # at a time. Returns the pieces it splits into as (start, end, line, column) with start and end relative
+    # to text, the block parsed from each (None when it does not parse), all the syntax errors and whether
+    # the last statement is complete, as it may otherwise go on in the text after.
+    # Pieces are None when text starts with an else, which belongs to the statement before it.
+    def reparse(self, text, offset, line, column):
+        pieces = []
+        blocks = []
+        errors = []
+        closed = True
+
+        self.lexer.input(text, line, column)
+        for tokens, closed in split_statements(self.lexer):
+            if not pieces:
+                if tokens[0].type == 'ELSE' and offset > 0:
+                    return None, None, None, False
+                pieces.append([0, len(text), line, column])
+            else:
+                head = tokens[0]
+                pieces[-1][1] = head.lexpos
+                pieces.append([head.lexpos, len(text), head.lineno, head.column])
+
+            try:
+                blocks.append(self.parser.parse(None, lexer=TokenFeed(tokens)))
+            except ParseErrors as e:
+                blocks.append(None)
+                errors.extend(e.errors)
+        self.reparsed = len(blocks)
+
+        if not pieces:
+            pieces.append([0, len(text), line, column])
+            blocks.append(CodeBlock())
+
+        return pieces, blocks, errors, closed
+
+    # Index of the piece holding offset
+    def find(self, offset):
+        return int(np.searchsorted(self.table[START], offset, side='right')) - 1
+
+    def first(self, index):
+        if index == len(self.texts):
+            return len(self.block.children)
+        return int(self.table[FIRST, index])
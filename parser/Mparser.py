@@ -1,12 +1,68 @@
 #!/usr/bin/python
 
 # from scanner import scanner
+import gc
+import hashlib
+import os
+import shutil
+import tempfile
+
+import ply.lex as lex
 import ply.yacc as yacc
 
 from parser.ast.AST import CodeBlock, BinaryExpression, UnaryExpression, Matrix, IntegerNumber, FloatNumber, \
     StringValue, ReturnStatement, BreakStatement, ContinueStatement, Variable, ElementAccessExpression, \
     IfStatement, WhileStatement, RangeExpression, ForStatement, TransposeStatement, PrintStatement, EyeStatement, \
-    ZerosStatement, OnesStatement, ListOfIntegers
+    ZerosStatement, OnesStatement, ListOfIntegers, Error
+from scanner.scanner import TokenFeed
+
+OPENING = ('LPAREN', 'LSQUARE_BRACKET', 'LCURLY_BRACKET')
+CLOSING = ('RPAREN', 'RSQUARE_BRACKET', 'RCURLY_BRACKET')
+
+# The opening bracket each closing one matches
+MATCHING = dict(zip(CLOSING, OPENING))
+
+
+# Splits a token stream into top-level statements, yielding each statement's tokens and whether it is complete.
+# A statement ends with a semicolon or closing brace outside any brackets, unless an else or another
+# semicolon follows: both still belong to it. The program is the concatenation of these statements.
+# A closing bracket closes the innermost open bracket of its kind and any left open inside that one; one that
+# matches no open bracket is a syntax error left to the parser and does not change what is open.
+def split_statements(lexer):
+    tokens = []
+    # the open brackets, innermost last
+    brackets = []
+    closed = False
+    while True:
+        token = lexer.token()
+        if token is None:
+            break
+
+        if closed and token.type != 'ELSE' and token.type != 'SEMICOLON':
+            yield tokens, True
+            tokens = []
+
+        tokens.append(token)
+        if token.type in OPENING:
+            brackets.append(token.type)
+        elif token.type in CLOSING and MATCHING[token.type] in brackets:
+            opening = MATCHING[token.type]
+            while brackets.pop() != opening:
+                pass
+        closed = not brackets and (token.type == 'SEMICOLON' or token.type == 'RCURLY_BRACKET')
+
+    if tokens:
+        yield tokens, closed
+
+
+# Every syntax error found in one parse, in the order of the input, one per line of the message.
+# program is the tree recovered around them, with an Error node for each statement or block that was skipped,
+# or None when the parse could not get to the end of the input.
+class ParseErrors(SyntaxError):
+    def __init__(self, errors, program=None):
+        super().__init__('\n'.join(errors))
+        self.errors = errors
+        self.program = program
 
 
 class Parser:
@@ -25,28 +81,103 @@ class Parser:
         # ('nonassoc', 'COLON')
     )
 
-    def __init__(self, lexer, **kwargs):
+    # With an interner, the expressions of every parsed tree are interned in it, see parser.ast.Interner.
+    def __init__(self, lexer, cache_dir=None, interner=None, **kwargs):
         self.tokens = lexer.tokens
         self.lexer = lexer
-        self.parser = yacc.yacc(module=self, start='program', **kwargs)
+        self.errors = []
+        self.interner = interner
+        # the last token read by the parse under way, where an unexpected end of input is reported
+        self.last_token = None
+
+        if cache_dir is None:
+            self.parser = yacc.yacc(module=self, start='program', **kwargs)
+        else:
+            self.parser = self._cached_yacc(cache_dir, **kwargs)
+
+    # Fingerprint of the grammar: tokens, precedence and every production, in definition order.
+    def signature(self):
+        digest = hashlib.sha256(yacc.__version__.encode())
+        digest.update(repr(self.tokens).encode())
+        digest.update(repr(self.precedence).encode())
+
+        rules = [getattr(self, name) for name in dir(self) if name.startswith('p_') and name != 'p_error']
+        productions = sorted((rule.__code__.co_firstlineno, rule.__name__, rule.__doc__) for rule in rules)
+        digest.update(repr([(name, doc) for _, name, doc in productions]).encode())
+
+        return digest.hexdigest()[:16]
+
+    # Loads the LALR tables generated for this grammar's signature from cache_dir, skipping grammar
+    # validation entirely. On a miss the tables are generated once and stored there for later runs.
+    # Tables are pickled rather than written as a parsetab module: unpickling is several times faster
+    # than executing the module and does not depend on bytecode caching.
+    def _cached_yacc(self, cache_dir, **kwargs):
+        kwargs.setdefault('debug', False)
+
+        name = 'parsetab_' + self.signature() + '.pickle'
+        path = os.path.join(cache_dir, name)
+
+        if os.path.exists(path):
+            return yacc.yacc(module=self, start='program', picklefile=path, optimize=True, **kwargs)
+
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            staging = tempfile.mkdtemp(dir=cache_dir)
+        except OSError:
+            return yacc.yacc(module=self, start='program', write_tables=False, **kwargs)
+
+        # Generate into a private directory and rename, so concurrent builds never see a partial table.
+        try:
+            parser = yacc.yacc(module=self, start='program', picklefile=os.path.join(staging, name),
+                               outputdir=staging, **kwargs)
+            try:
+                os.replace(os.path.join(staging, name), path)
+            except OSError:
+                pass
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        return parser
+
+    # Source position of the n-th symbol of a production, as keyword arguments for a node.
+    # Tokens carry their own position, a nonterminal takes the position of the node it reduced to.
+    def position(self, p, n):
+        symbol = p.slice[n]
+
+        if isinstance(symbol, lex.LexToken):
+            return {'line': symbol.lineno, 'column': getattr(symbol, 'column', 0)}
+
+        node = symbol.value[0] if type(symbol.value) == list else symbol.value
+        return {'line': node.line, 'column': node.column}
 
     def p_program(self, p):
         """program : multiline_statement"""
 
         p[0] = p[1]
 
+    # Errors are collected rather than raised, so the parser can recover and report the rest in the same parse.
+    # Recovery pops back to the innermost statement or block and skips tokens up to the semicolon or closing
+    # brace that ends it, see the error productions below.
     def p_error(self, p):
         if p:
-            raise SyntaxError(
+            self.errors.append(
                 "Syntax error at line {0}, column {1}: "
-                "LexToken({2}, '{3}')".format(p.lineno,
-                                              self.lexer.find_column(
-                                                  self.lexer.get_data(),
-                                                  p),
-                                              p.type, p.value))
-            # self.parser.errok()
+                "LexToken({2}, '{3}')".format(p.lineno, p.column, p.type, p.value))
+        elif self.last_token is not None:
+            # the input ends where its last token does
+            self.errors.append("Unexpected end of input at line {0}, column {1}, after LexToken({2}, '{3}')".format(
+                self.last_token.lineno, getattr(self.last_token, 'column', 0), self.last_token.type,
+                self.last_token.value))
         else:
-            print("Unexpected end of input")
+            self.errors.append("Unexpected end of input at line 1, column 1")
+
+    # A statement or block skipped by error recovery. It is positioned at the token the error was found at,
+    # and the parser is told it has recovered, so an error right after it is reported too.
+    def recovered(self, p, n):
+        token = p[n]
+        self.parser.errok()
+        return CodeBlock(Error(token.lineno, getattr(token, 'column', 0)), line=token.lineno,
+                         column=getattr(token, 'column', 0))
 
     def p_multiline_statement_1(self, p):
         """multiline_statement : code_block"""
@@ -54,7 +185,8 @@ class Parser:
 
     def p_multiline_statement_2(self, p):
         """multiline_statement :  multiline_statement code_block"""
-        p[0] = p[1] + p[2]
+        p[1] += p[2]
+        p[0] = p[1]
 
     def p_code_block_1(self, p):
         """code_block : statement"""
@@ -66,10 +198,21 @@ class Parser:
 
         p[0] = p[2]
 
+    def p_code_block_error_1(self, p):
+        """code_block : LCURLY_BRACKET error RCURLY_BRACKET"""
+
+        p[0] = self.recovered(p, 2)
+
+    def p_code_block_error_2(self, p):
+        """code_block : LCURLY_BRACKET multiline_statement error RCURLY_BRACKET"""
+
+        p[2] += self.recovered(p, 3)
+        p[0] = p[2]
+
     def p_statement_1(self, p):
         """statement : SEMICOLON"""
 
-        p[0] = CodeBlock(line=p.lineno)
+        p[0] = CodeBlock(**self.position(p, 1))
 
     def p_statement_2(self, p):
         """statement : statement SEMICOLON"""
@@ -79,7 +222,7 @@ class Parser:
     def p_statement_3(self, p):
         """statement : expression_statement SEMICOLON"""
 
-        p[0] = CodeBlock(p[1], line=p.lineno)
+        p[0] = CodeBlock(p[1], **self.position(p, 1))
 
     def p_statement_4(self, p):
         """statement : if_statement
@@ -89,7 +232,12 @@ class Parser:
                      | return_statement
                      | break_statement
                      | continue_statement"""
-        p[0] = CodeBlock(p[1], line=p.lineno)
+        p[0] = CodeBlock(p[1], **self.position(p, 1))
+
+    def p_statement_error(self, p):
+        """statement : error SEMICOLON"""
+
+        p[0] = self.recovered(p, 1)
 
     def p_expression_statement(self, p):
         """expression_statement : expression
@@ -115,7 +263,7 @@ class Parser:
                   | variable_access_expression MULTIPLIES_ASSIGN expression
                   | variable_access_expression DIVIDES_ASSIGN expression"""
 
-        p[0] = BinaryExpression(p[2], p[1], p[3], line=p.lineno)
+        p[0] = BinaryExpression(p[2], p[1], p[3], **self.position(p, 1))
 
     def p_math_expression_1(self, p):
         """math_expression : math_expression PLUS math_expression
@@ -127,7 +275,7 @@ class Parser:
                            | math_expression DOT_TIMES math_expression
                            | math_expression DOT_DIVIDE math_expression
                            """
-        p[0] = BinaryExpression(p[2], p[1], p[3], line=p.lineno)
+        p[0] = BinaryExpression(p[2], p[1], p[3], **self.position(p, 1))
 
     def p_math_expression_2(self, p):
         """math_expression : LPAREN math_expression RPAREN"""
@@ -146,25 +294,26 @@ class Parser:
     def p_math_expression_4(self, p):
         """math_expression : MINUS variable_access_expression"""
 
-        p[0] = UnaryExpression(p[1], p[2], line=p.lineno)
+        p[0] = UnaryExpression(p[1], p[2], **self.position(p, 1))
 
     def p_matrix(self, p):
         """matrix : LSQUARE_BRACKET matrix_content RSQUARE_BRACKET"""
 
-        p[0] = Matrix(p[2], line=p.lineno)
+        p[0] = Matrix(p[2], **self.position(p, 1))
 
     def p_matrix_content_1(self, p):
         """matrix_content : matrix_row"""
 
-        p[0] = Matrix(p[1], line=p.lineno)
+        p[0] = Matrix(p[1], **self.position(p, 1))
 
     def p_matrix_content_2(self, p):
         """matrix_content : matrix_content SEMICOLON matrix_row"""
 
         if type(p[1]) == list:
-            p[0] = p[1] + [Matrix(p[3], line=p.lineno)]
+            p[1].append(Matrix(p[3], **self.position(p, 3)))
+            p[0] = p[1]
         else:
-            p[0] = [p[1], Matrix(p[3], line=p.lineno)]
+            p[0] = [p[1], Matrix(p[3], **self.position(p, 3))]
 
     def p_matrix_row_1(self, p):
         """matrix_row : value"""
@@ -174,27 +323,29 @@ class Parser:
     def p_matrix_row_2(self, p):
         """matrix_row : matrix_row COMA value"""
 
-        p[0] = p[1] + [p[3]]
+        p[1].append(p[3])
+        p[0] = p[1]
 
     def p_variable_access_expression_1(self, p):
         """variable_access_expression : ID"""
 
-        p[0] = Variable(p[1], line=p.lineno)
+        p[0] = Variable(p[1], **self.position(p, 1))
 
     def p_variable_access_expression_2(self, p):
         """variable_access_expression : ID LSQUARE_BRACKET list_of_integers RSQUARE_BRACKET"""
 
-        p[0] = ElementAccessExpression(Variable(p[1], line=p.lineno), p[3], line=p.lineno)
+        p[0] = ElementAccessExpression(Variable(p[1], **self.position(p, 1)), p[3], **self.position(p, 1))
 
     def p_list_of_integers_1(self, p):
         """list_of_integers : INT_NUM"""
 
-        p[0] = ListOfIntegers(int(p[1]), line=p.lineno)
+        p[0] = ListOfIntegers(int(p[1]), **self.position(p, 1))
 
     def p_list_of_integers_2(self, p):
         """list_of_integers : list_of_integers COMA INT_NUM"""
 
-        p[0] = p[1] + p[3]
+        p[1] += int(p[3])
+        p[0] = p[1]
 
     def p_contitional_expression(self, p):
         """conditional_expression : expression EQUAL expression
@@ -204,17 +355,17 @@ class Parser:
                                   | expression LESS_EQUAL expression
                                   | expression GREATER_EQUAL expression"""
 
-        p[0] = BinaryExpression(p[2], p[1], p[3], line=p.lineno)
+        p[0] = BinaryExpression(p[2], p[1], p[3], **self.position(p, 1))
 
     def p_if_statement_2(self, p):
         """if_statement : IF expression code_block"""
 
-        p[0] = IfStatement(p[2], p[3], line=p.lineno)
+        p[0] = IfStatement(p[2], p[3], **self.position(p, 1))
 
     def p_if_statement_1(self, p):
         """if_statement : IF expression code_block ELSE code_block"""
 
-        p[0] = IfStatement(p[2], p[3], p[5], line=p.lineno)
+        p[0] = IfStatement(p[2], p[3], p[5], **self.position(p, 1))
 
     def p_coma_separated_expressions_1(self, p):
         """coma_separated_expressions : expression"""
@@ -222,84 +373,133 @@ class Parser:
 
     def p_coma_separated_expressions_2(self, p):
         """coma_separated_expressions : coma_separated_expressions COMA expression"""
-        p[0] = p[1] + [p[3]]
+        p[1].append(p[3])
+        p[0] = p[1]
 
     def p_print_statement(self, p):
         """print_statement : PRINT coma_separated_expressions"""
 
-        p[0] = PrintStatement(p[2], line=p.lineno)
+        p[0] = PrintStatement(p[2], **self.position(p, 1))
 
     def p_while_statement(self, p):
         """while_statement : WHILE expression code_block"""
 
-        p[0] = WhileStatement(p[2], p[3], line=p.lineno)
+        p[0] = WhileStatement(p[2], p[3], **self.position(p, 1))
 
     def p_range_statement(self, p):
         """range_statement : math_expression COLON math_expression"""
 
-        p[0] = RangeExpression(p[1], p[3], line=p.lineno)
+        p[0] = RangeExpression(p[1], p[3], **self.position(p, 1))
 
     def p_for_statement(self, p):
         """for_statement : FOR ID ASSIGN range_statement code_block"""
 
         p[0] = ForStatement(
-            BinaryExpression(p[3], Variable(p[2], line=p.lineno), p[4], line=p.lineno),
-            p[5], line=p.lineno
+            BinaryExpression(p[3], Variable(p[2], **self.position(p, 2)), p[4], **self.position(p, 2)),
+            p[5], **self.position(p, 1)
         )
 
     def p_return_statement_1(self, p):
         """return_statement : RETURN"""
-        p[0] = ReturnStatement(None, line=p.lineno)
+        p[0] = ReturnStatement(None, **self.position(p, 1))
 
     def p_return_statement_2(self, p):
         """return_statement : RETURN expression"""
 
-        p[0] = ReturnStatement(p[2], line=p.lineno)
+        p[0] = ReturnStatement(p[2], **self.position(p, 1))
 
     def p_break_statement(self, p):
         """break_statement : BREAK"""
 
-        p[0] = BreakStatement(line=p.lineno)
+        p[0] = BreakStatement(**self.position(p, 1))
 
     def p_continue_statement(self, p):
         """continue_statement : CONTINUE"""
 
-        p[0] = ContinueStatement(line=p.lineno)
+        p[0] = ContinueStatement(**self.position(p, 1))
 
     def p_transpose_matrix(self, p):
         """transpose_matrix : variable_access_expression APOSTROPHE"""
 
-        p[0] = TransposeStatement(p[1], line=p.lineno)
+        p[0] = TransposeStatement(p[1], **self.position(p, 1))
 
     def p_single_matrix_operation_function_1(self, p):
         """single_matrix_operation_function : EYE LPAREN INT_NUM RPAREN"""
 
-        p[0] = EyeStatement(int(p[3]), line=p.lineno)
+        p[0] = EyeStatement(int(p[3]), **self.position(p, 1))
 
     def p_single_matrix_operation_function_2(self, p):
         """single_matrix_operation_function : ZEROS LPAREN INT_NUM RPAREN"""
 
-        p[0] = ZerosStatement(int(p[3]), line=p.lineno)
+        p[0] = ZerosStatement(int(p[3]), **self.position(p, 1))
 
     def p_single_matrix_operation_function_3(self, p):
         """single_matrix_operation_function : ONES LPAREN INT_NUM RPAREN"""
 
-        p[0] = OnesStatement(int(p[3]), line=p.lineno)
+        p[0] = OnesStatement(int(p[3]), **self.position(p, 1))
 
     def p_value_1(self, p):
         """value : INT_NUM"""
 
-        p[0] = IntegerNumber(int(p[1]), line=p.lineno)
+        p[0] = IntegerNumber(int(p[1]), **self.position(p, 1))
 
     def p_value_2(self, p):
         """value : FLOATING_POINT_NUM"""
 
-        p[0] = FloatNumber(float(p[1]), line=p.lineno)
+        p[0] = FloatNumber(float(p[1]), **self.position(p, 1))
 
     def p_value_3(self, p):
         """value : STRING"""
 
-        p[0] = StringValue(p[1], line=p.lineno)
-
+        p[0] = StringValue(p[1], **self.position(p, 1))
+
+    # Parses the program one top-level statement at a time, yielding each statement's code_block as soon as it
+    # is complete, so the statements can be used while the rest of the input is still being read and only one of
+    # them is held here at a time. lexer is anything with a token() method, such as a Scanner given the text or
+    # a TokenFeed over Scanner.stream().
+    # Printing all the blocks prints the same tree as parse() does. Once a statement has a syntax error no more
+    # are yielded, but the rest are still parsed for their errors, which are all raised together at the end.
+    def parse_statements(self, lexer):
+        errors = []
+        for tokens, closed in split_statements(lexer):
+            try:
+                block = self.parse(None, lexer=TokenFeed(tokens))
+            except ParseErrors as e:
+                errors.extend(e.errors)
+                continue
+            if not errors:
+                yield block
+        if errors:
+            raise ParseErrors(errors)
+
+    # lexer.token, remembering the last token it returns
+    def tracked(self, lexer):
+        token = lexer.token
+
+        def next_token():
+            value = token()
+            if value is not None:
+                self.last_token = value
+            return value
+        return next_token
+
+    # Parses a whole program. Syntax errors do not stop the parse: all of them are raised together once it is done.
     def parse(self, text, lexer, **kwargs):
-        return self.parser.parse(text, lexer=lexer, **kwargs)
+        self.errors = []
+        self.last_token = None
+
+        # Building the tree allocates a node per reduction and never creates reference cycles,
+        # so the cyclic collector only rescans an ever-growing heap. Pause it for the parse.
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            program = self.parser.parse(text, lexer=lexer, tokenfunc=self.tracked(lexer), **kwargs)
+            if self.interner is not None:
+                program = self.interner.intern(program)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+        if self.errors:
+            raise ParseErrors(self.errors, program)
+        return program
@@ -1 +1 @@
-__all__ = ['Mparser']
+__all__ = ['Mparser', 'Incremental', 'Batch', 'Cache']
@@ -1,13 +1,17 @@
 class Node:
-    pass
+    # Nodes are allocated in the hundreds of thousands for large programs, so none of them carries
+    # a __dict__: the position lives here and every node class lists its own fields in __slots__.
+    __slots__ = ('line', 'column')
 
 
 class CodeBlock(Node):
-    def __init__(self, node=None, line=0):
+    __slots__ = ('children',)
+
+    def __init__(self, node=None, line=0, column=0):
 
         if node is None:
             self.children = []
-        if isinstance(node, Node):
+        elif isinstance(node, Node):
             self.children = [node]
         elif type(node) == list:
             self.children = node
@@ -17,6 +21,7 @@ class CodeBlock(Node):
             raise ValueError("Passed argument is invalid")
 
         self.line = line
+        self.column = column
 
     def __add__(self, node):
         if type(node) == Node:
@@ -28,48 +33,81 @@ class CodeBlock(Node):
 
         raise ValueError("Passed argument is invalid")
 
+    def __iadd__(self, node):
+        # Extends the block in place, so growing a block statement by statement stays linear.
+        if type(node) == CodeBlock:
+            self.children.extend(node.children)
+        elif type(node) == list:
+            self.children.extend(node)
+        elif isinstance(node, Node):
+            self.children.append(node)
+        else:
+            raise ValueError("Passed argument is invalid")
+
+        return self
+
 
 class IntegerNumber(Node):
-    def __init__(self, value, line=0):
+    __slots__ = ('value',)
+
+    def __init__(self, value, line=0, column=0):
         self.value = value
         self.line = line
+        self.column = column
 
 
 class FloatNumber(Node):
-    def __init__(self, value, line=0):
+    __slots__ = ('value',)
+
+    def __init__(self, value, line=0, column=0):
         self.value = value
         self.line = line
+        self.column = column
 
 
 class StringValue(Node):
-    def __init__(self, value, line=0):
+    __slots__ = ('value',)
+
+    def __init__(self, value, line=0, column=0):
         self.value = value
         self.line = line
+        self.column = column
 
 
 class Variable(Node):
-    def __init__(self, name, line=0):
+    __slots__ = ('name',)
+
+    def __init__(self, name, line=0, column=0):
         self.name = name
         self.line = line
+        self.column = column
 
 
 class BinaryExpression(Node):
-    def __init__(self, op, left, right, line=0):
+    __slots__ = ('op', 'left', 'right')
+
+    def __init__(self, op, left, right, line=0, column=0):
         self.op = op
         self.left = left
         self.right = right
         self.line = line
+        self.column = column
 
 
 class UnaryExpression(Node):
-    def __init__(self, op, right, line=0):
+    __slots__ = ('op', 'right')
+
+    def __init__(self, op, right, line=0, column=0):
         self.op = op
         self.right = right
         self.line = line
+        self.column = column
 
 
 class Matrix(Node):
-    def __init__(self, value=None, line=0):
+    __slots__ = ('children',)
+
+    def __init__(self, value=None, line=0, column=0):
 
         if type(value) == Matrix:
             self.children = value.children
@@ -86,6 +124,7 @@ class Matrix(Node):
             raise ValueError("Passed value is not a row or list of rows.")
 
         self.line = line
+        self.column = column
 
     def __add__(self, other):
         if type(other) == Matrix:
@@ -93,32 +132,54 @@ class Matrix(Node):
         else:
             return Matrix(self.children + [other])
 
+    def __iadd__(self, other):
+        if type(other) == Matrix:
+            self.children.extend(other.children)
+        else:
+            self.children.append(other)
+
+        return self
+
 
 class ReturnStatement(Node):
-    def __init__(self, value, line=0):
+    __slots__ = ('value',)
+
+    def __init__(self, value, line=0, column=0):
         self.value = value
         self.line = line
+        self.column = column
 
 
 class BreakStatement(Node):
-    def __init__(self, line=0):
+    __slots__ = ()
+
+    def __init__(self, line=0, column=0):
         self.line = line
+        self.column = column
 
 
 class ContinueStatement(Node):
-    def __init__(self, line=0):
+    __slots__ = ()
+
+    def __init__(self, line=0, column=0):
         self.line = line
+        self.column = column
 
 
 class ElementAccessExpression(Node):
-    def __init__(self, variable, index, line=0):
+    __slots__ = ('variable', 'index')
+
+    def __init__(self, variable, index, line=0, column=0):
         self.variable = variable
         self.index = index
         self.line = line
+        self.column = column
 
 
 class IfStatement(Node):
-    def __init__(self, condition, code_block, else_statement=None, line=0):
+    __slots__ = ('condition', 'code_block', 'else_statement')
+
+    def __init__(self, condition, code_block, else_statement=None, line=0, column=0):
         self.condition = condition
 
         if type(code_block) != CodeBlock:
@@ -130,10 +191,13 @@ class IfStatement(Node):
             self.else_statement = else_statement
 
         self.line = line
+        self.column = column
 
 
 class WhileStatement(Node):
-    def __init__(self, condition, code_block, line=0):
+    __slots__ = ('condition', 'code_block')
+
+    def __init__(self, condition, code_block, line=0, column=0):
         self.condition = condition
 
         if type(code_block) != CodeBlock:
@@ -141,17 +205,23 @@ class WhileStatement(Node):
 
         self.code_block = code_block
         self.line = line
+        self.column = column
 
 
 class RangeExpression(Node):
-    def __init__(self, left, right, line=0):
+    __slots__ = ('left', 'right')
+
+    def __init__(self, left, right, line=0, column=0):
         self.left = left
         self.right = right
         self.line = line
+        self.column = column
 
 
 class ForStatement(Node):
-    def __init__(self, iteration_variable_range, code_block, line=0):
+    __slots__ = ('iteration_variable_range', 'code_block')
+
+    def __init__(self, iteration_variable_range, code_block, line=0, column=0):
         self.iteration_variable_range = iteration_variable_range
 
         if type(code_block) != CodeBlock:
@@ -159,43 +229,72 @@ class ForStatement(Node):
 
         self.code_block = code_block
         self.line = line
+        self.column = column
+
+
+# A for loop whose iterations interpreter.Vectorizer found to be independent, which it runs over the whole range
+# at once. It stands in for the loop, which it keeps to print, compile and fall back to.
+class VectorizedLoop(Node):
+    __slots__ = ('loop',)
+
+    def __init__(self, loop, line=0, column=0):
+        self.loop = loop
+        self.line = line
+        self.column = column
 
 
 class TransposeStatement(Node):
-    def __init__(self, value, line=0):
+    __slots__ = ('value',)
+
+    def __init__(self, value, line=0, column=0):
         self.value = value
         self.line = line
+        self.column = column
 
 
 class PrintStatement(Node):
-    def __init__(self, values, line=0):
+    __slots__ = ('values',)
+
+    def __init__(self, values, line=0, column=0):
         if type(values) != list:
             raise ValueError("PrintStatement accepts only a list of values to print.")
 
         self.values = values
         self.line = line
+        self.column = column
 
 
 class ZerosStatement(Node):
-    def __init__(self, value, line=0):
+    __slots__ = ('value',)
+
+    def __init__(self, value, line=0, column=0):
         self.value = value
         self.line = line
+        self.column = column
 
 
 class OnesStatement(Node):
-    def __init__(self, value, line=0):
+    __slots__ = ('value',)
+
+    def __init__(self, value, line=0, column=0):
         self.value = value
         self.line = line
+        self.column = column
 
 
 class EyeStatement(Node):
-    def __init__(self, value, line=0):
+    __slots__ = ('value',)
+
+    def __init__(self, value, line=0, column=0):
         self.value = value
         self.line = line
+        self.column = column
 
 
 class ListOfIntegers(Node):
-    def __init__(self, value, line=0):
+    __slots__ = ('children',)
+
+    def __init__(self, value, line=0, column=0):
         if type(value) == list:
             self.children = value
         elif type(value) == int:
@@ -206,6 +305,7 @@ class ListOfIntegers(Node):
             ValueError("Passed value is not valid.")
 
         self.line = line
+        self.column = column
 
     def __add__(self, other):
         if type(other) == int:
@@ -217,9 +317,24 @@ class ListOfIntegers(Node):
         else:
             ValueError("Passed value is not valid.")
 
+    def __iadd__(self, other):
+        if type(other) == int:
+            self.children.append(other)
+        elif type(other) == list:
+            self.children.extend(other)
+        elif isinstance(other, ListOfIntegers):
+            self.children.extend(other.children)
+        else:
+            raise ValueError("Passed value is not valid.")
+
+        return self
+
 
 class Error(Node):
-    def __init__(self, line=0):
+    __slots__ = ()
+
+    def __init__(self, line=0, column=0):
         self.line = line
+        self.column = column
 
 from parser.ast.TreePrinter import TreePrinter
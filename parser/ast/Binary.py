@@ -0,0 +1,306 @@
+import mmap
+import struct
+from collections import deque
+from itertools import repeat
+
+import numpy as np
+
+from parser.ast import AST
+
+# Binary format for trees, laid out so a reader can map a file and use its tables without decoding it.
+#     Nodes are numbered in pre-order, so a subtree is a contiguous range of node numbers starting at its root.
+#     Each node has a class, a position, the number after its last descendant and the index of its first field
+#     in the value table, where its __slots__ fields follow in order. A value is a tag and a 32-bit payload:
+#     a node number, a list, an index into the integer or float literals, or an index into the string table,
+#     where variable names, operators and strings are each stored once, as are integers that do not fit in 64 bits
+#     in decimal. The class names come first in the
+#     string table, so a file stays readable when node classes are added.
+#     All tables are little-endian arrays, each aligned to 8 bytes.
+MAGIC = b'MAST'
+VERSION = 2
+SUFFIX = '.mast'
+
+HEADER = struct.Struct('<4sIIIIIIIII')
+
+NONE, NODE, LIST, INTEGER, FLOAT, STRING, BIG_INTEGER = range(7)
+
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+
+def align(offset):
+    return (offset + 7) & ~7
+
+
+# Tables of a tree in the order they are stored, as (name, dtype, length) for the counts in the header
+def layout(classes, nodes, values, lists, integers, floats, strings, string_bytes):
+    return [
+        ('kinds', np.uint8, nodes),
+        ('lines', np.int32, nodes),
+        ('columns', np.int32, nodes),
+        ('ends', np.uint32, nodes),
+        ('fields', np.uint32, nodes),
+        ('tags', np.uint8, values),
+        ('payloads', np.uint32, values),
+        ('list_starts', np.uint32, lists),
+        ('list_counts', np.uint32, lists),
+        ('integers', np.int64, integers),
+        ('floats', np.float64, floats),
+        ('string_offsets', np.uint32, strings + 1),
+        ('string_bytes', np.uint8, string_bytes),
+    ]
+
+
+class Writer:
+    def __init__(self):
+        self.classes = {}
+        self.strings = {}
+        self.kinds = []
+        self.lines = []
+        self.columns = []
+        self.ends = []
+        self.fields = []
+        self.tags = []
+        self.payloads = []
+        self.list_starts = []
+        self.list_counts = []
+        self.integers = []
+        self.floats = []
+
+    def string(self, value):
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    def write(self, root):
+        nodes, self.ends = self.nodes(root)
+
+        # class names take the first strings, which is where the reader looks for them
+        for name in sorted({type(node).__name__ for node in nodes}):
+            self.classes[name] = len(self.classes)
+            self.string(name)
+
+        self.kinds = [self.classes[type(node).__name__] for node in nodes]
+        self.lines = [node.line for node in nodes]
+        self.columns = [node.column for node in nodes]
+
+        # a node's fields, then the items of its lists. The children of a node follow it in the order of its fields,
+        # each after the subtree of the one before, so a node reached twice refers to its own copy of each child.
+        for number, node in enumerate(nodes):
+            child = number + 1
+            first = len(self.tags)
+            self.fields.append(first)
+            values = [getattr(node, field, None) for field in type(node).__slots__]
+            self.tags.extend([NONE] * len(values))
+            self.payloads.extend([0] * len(values))
+            for offset, value in enumerate(values, first):
+                if type(value) != list:
+                    child = self.value(offset, value, child)
+                    continue
+
+                self.tags[offset], self.payloads[offset] = LIST, len(self.list_starts)
+                start = len(self.tags)
+                self.list_starts.append(start)
+                self.list_counts.append(len(value))
+                self.tags.extend([NONE] * len(value))
+                self.payloads.extend([0] * len(value))
+                for item_offset, item in enumerate(value, start):
+                    if type(item) == list:
+                        raise ValueError("Nested lists cannot be stored")
+                    child = self.value(item_offset, item, child)
+
+        return self.encode()
+
+    # Stores value, where child is the number of the node it is if it is one, and returns the number of the node
+    # after it
+    def value(self, offset, value, child):
+        if isinstance(value, AST.Node):
+            self.tags[offset], self.payloads[offset] = NODE, child
+            return self.ends[child]
+        if value is None:
+            pass
+        elif type(value) == int and not INT64_MIN <= value <= INT64_MAX:
+            self.tags[offset], self.payloads[offset] = BIG_INTEGER, self.string(str(value))
+        elif type(value) == int:
+            self.tags[offset], self.payloads[offset] = INTEGER, len(self.integers)
+            self.integers.append(value)
+        elif type(value) == float:
+            self.tags[offset], self.payloads[offset] = FLOAT, len(self.floats)
+            self.floats.append(value)
+        elif type(value) == str:
+            self.tags[offset], self.payloads[offset] = STRING, self.string(value)
+        else:
+            raise ValueError("Cannot store a value of type {0}".format(type(value).__name__))
+        return child
+
+    # Nodes in pre-order and, for each, the number after its last descendant.
+    # A node reached twice, as after interning equal subtrees, is stored twice.
+    @staticmethod
+    def nodes(root):
+        nodes = []
+        ends = []
+        stack = [(root, True)]
+        while stack:
+            node, entering = stack.pop()
+            if not entering:
+                ends[node] = len(nodes)
+                continue
+
+            stack.append((len(nodes), False))
+            nodes.append(node)
+            ends.append(0)
+            children = []
+            for field in type(node).__slots__:
+                value = getattr(node, field, None)
+                if isinstance(value, AST.Node):
+                    children.append(value)
+                elif type(value) == list:
+                    children.extend(item for item in value if isinstance(item, AST.Node))
+            stack.extend([(child, True) for child in reversed(children)])
+        return nodes, ends
+
+    def encode(self):
+        encoded = [string.encode() for string in self.strings]
+        offsets = [0]
+        for string in encoded:
+            offsets.append(offsets[-1] + len(string))
+
+        counts = (len(self.classes), len(self.kinds), len(self.tags), len(self.list_starts), len(self.integers),
+                  len(self.floats), len(encoded), offsets[-1])
+        tables = {
+            'kinds': self.kinds, 'lines': self.lines, 'columns': self.columns, 'ends': self.ends,
+            'fields': self.fields, 'tags': self.tags, 'payloads': self.payloads, 'list_starts': self.list_starts,
+            'list_counts': self.list_counts, 'integers': self.integers, 'floats': self.floats,
+            'string_offsets': offsets, 'string_bytes': np.frombuffer(b''.join(encoded), dtype=np.uint8),
+        }
+
+        chunks = [HEADER.pack(MAGIC, VERSION, *counts)]
+        size = HEADER.size
+        for name, dtype, _ in layout(*counts):
+            padding = align(size) - size
+            data = np.asarray(tables[name], dtype=np.dtype(dtype).newbyteorder('<')).tobytes()
+            chunks.append(b'\0' * padding + data)
+            size += padding + len(data)
+        return b''.join(chunks)
+
+
+# A stored tree. Opening one only reads the header and makes array views of the tables, so the whole file is
+# never copied or decoded; nodes are built when asked for, one subtree at a time.
+# The tables are public, so tools can scan positions or kinds of every node without building any.
+class Reader:
+    def __init__(self, buffer):
+        self.buffer = buffer
+        magic, version, *counts = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a binary AST")
+        if version != VERSION:
+            raise ValueError("Unsupported binary AST version {0}".format(version))
+
+        self.counts = counts
+        offset = HEADER.size
+        for name, dtype, count in layout(*counts):
+            offset = align(offset)
+            dtype = np.dtype(dtype).newbyteorder('<')
+            setattr(self, name, np.frombuffer(buffer, dtype=dtype, count=count, offset=offset))
+            offset += count * dtype.itemsize
+
+        self.string_cache = [None] * counts[6]
+        self.classes = [getattr(AST, self.string(index)) for index in range(counts[0])]
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def string(self, index):
+        value = self.string_cache[index]
+        if value is None:
+            start, end = self.string_offsets[index:index + 2]
+            value = self.string_cache[index] = bytes(self.string_bytes[start:end]).decode()
+        return value
+
+    def kind(self, number):
+        return self.classes[self.kinds[number]]
+
+    # The subtree rooted at node number, which is the range of nodes up to its end.
+    # Every node is made empty first, so that a node's children exist to be referred to before any is filled in;
+    # the values are then resolved a table at a time and each field set for all nodes of a class at once.
+    def node(self, number=0):
+        end = int(self.ends[number])
+        kinds = self.kinds[number:end]
+        fields = self.fields[number:end].astype(np.int64)
+        # the fields of these nodes and the items of their lists run up to the first field of the next node
+        first = int(fields[0])
+        last = int(self.fields[end]) if end < len(self) else len(self.tags)
+        fields -= first
+        tags = self.tags[first:last]
+        payloads = self.payloads[first:last]
+
+        nodes = np.empty(end - number, dtype=object)
+        classes = []
+        for kind, cls in enumerate(self.classes):
+            which = np.flatnonzero(kinds == kind)
+            if len(which):
+                nodes[which] = list(map(object.__new__, repeat(cls, len(which))))
+                classes.append((cls, which))
+        deque(map(setattr, nodes, repeat('line'), self.lines[number:end].tolist()), 0)
+        deque(map(setattr, nodes, repeat('column'), self.columns[number:end].tolist()), 0)
+
+        values = np.empty(last - first, dtype=object)
+        where = np.flatnonzero(tags == NODE)
+        values[where] = nodes[payloads[where].astype(np.int64) - number]
+        for tag, table in ((INTEGER, self.integers), (FLOAT, self.floats)):
+            where = np.flatnonzero(tags == tag)
+            values[where] = table[payloads[where]].tolist()
+        where = np.flatnonzero(tags == STRING)
+        values[where] = [self.string(string) for string in payloads[where].tolist()]
+        where = np.flatnonzero(tags == BIG_INTEGER)
+        values[where] = [int(self.string(string)) for string in payloads[where].tolist()]
+
+        # list items are stored together, so each list is a slice of the values
+        values = values.tolist()
+        where = np.flatnonzero(tags == LIST)
+        lists = payloads[where]
+        starts = (self.list_starts[lists].astype(np.int64) - first).tolist()
+        for offset, start, count in zip(where.tolist(), starts, self.list_counts[lists].tolist()):
+            values[offset] = values[start:start + count]
+
+        for cls, which in classes:
+            for slot, field in enumerate(cls.__slots__):
+                deque(map(setattr, nodes[which], repeat(field), map(values.__getitem__, fields[which] + slot)), 0)
+        return nodes[0]
+
+    @property
+    def program(self):
+        return self.node(0)
+
+    # Top-level statements of the program, each built as it is reached
+    def statements(self):
+        number = 1
+        while number < len(self):
+            yield self.node(number)
+            number = int(self.ends[number])
+
+    # Unmaps the file. Nodes already built stay valid, the tables do not.
+    def close(self):
+        for name, _, _ in layout(*self.counts):
+            setattr(self, name, None)
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+
+def dumps(root):
+    return Writer().write(root)
+
+
+def dump(root, file):
+    file.write(dumps(root))
+
+
+def loads(data):
+    return Reader(data)
+
+
+# Maps the file at path; the file is read as its tables are used
+def load(path):
+    with open(path, 'rb') as file:
+        return Reader(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
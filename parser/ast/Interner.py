@@ -0,0 +1,215 @@
+import hashlib
+
+from parser.Cache import paused_gc
+from parser.ast import AST
+from parser.ast.Walker import Walker, is_deep
+
+# Binary operators that are statements rather than expressions
+ASSIGNMENTS = ('=', '+=', '-=', '*=', '/=')
+
+# Expressions whose only field is a number or string that is its own key
+LITERALS = (AST.IntegerNumber, AST.StringValue, AST.ZerosStatement, AST.OnesStatement, AST.EyeStatement)
+
+# Nodes that only describe a value. No pass changes them in place, so equal ones can be a single shared object.
+EXPRESSIONS = (AST.IntegerNumber, AST.FloatNumber, AST.StringValue, AST.Variable, AST.BinaryExpression,
+               AST.UnaryExpression, AST.Matrix, AST.ElementAccessExpression, AST.TransposeStatement,
+               AST.ZerosStatement, AST.OnesStatement, AST.EyeStatement, AST.ListOfIntegers)
+
+
+def is_expression(node):
+    return type(node) in EXPRESSIONS and not (type(node) == AST.BinaryExpression and node.op in ASSIGNMENTS)
+
+
+# Whether a pass goes through node on an explicit stack: statements, which nest as deep as blocks do, and long
+# operator chains. The usual short expressions are handled recursively, which is faster.
+def is_walked(node):
+    return not is_expression(node) or (type(node) == AST.BinaryExpression and is_deep(node))
+
+
+def field_key(value):
+    if isinstance(value, AST.Node):
+        # already interned, so equal subtrees are the same object and compare by identity
+        return value
+    if type(value) == list:
+        return tuple(map(field_key, value))
+    if type(value) == float:
+        # 0.0 == -0.0, but they are different literals
+        return value.hex()
+    return value
+
+
+# Hash-consing of expressions: interning a tree replaces every expression with the first structurally equal one
+# the interner has seen, in this tree or any interned before, so repeated subexpressions like A.*B, eye(10) or
+# a literal matrix are stored once however often they occur. Equal interned expressions are the same object,
+# which makes `is` a complete equality test for them and their id() a key for caching what they evaluate to.
+# Statements, assignments among them, are never shared: passes rewrite them in place.
+# A shared expression keeps the position of its first occurrence. The table keeps every expression it interned
+# alive, so a long-lived interner should be cleared when the trees it built are dropped.
+class Interner(Walker):
+    def __init__(self):
+        self.table = {}
+        # structural hashes of interned expressions, by id
+        self.hashes = {}
+        self.shared = 0
+
+    def __len__(self):
+        return len(self.table)
+
+    def clear(self):
+        self.table.clear()
+        self.hashes.clear()
+        self.shared = 0
+
+    # The tree with its expressions interned. Nodes are changed in place to refer to the shared expressions,
+    # so root itself is returned unless it is an expression that was seen before.
+    def intern(self, root):
+        if root is None:
+            return None
+        with paused_gc():
+            return self.node(root)
+
+    # Recurses for the usual short expressions; statements and long operator chains go to walk(), which calls
+    # leave(). The keys are those key() makes, written out for the common nodes.
+    def node(self, node):
+        kind = type(node)
+        if kind == AST.BinaryExpression:
+            if is_deep(node):
+                return self.walk(node)
+            node.left = self.node(node.left)
+            node.right = self.node(node.right)
+            if node.op in ASSIGNMENTS:
+                return node
+            key = (kind, node.op, node.left, node.right)
+        elif kind == AST.Variable:
+            key = (kind, node.name)
+        elif kind in LITERALS:
+            key = (kind, node.value)
+        elif kind == AST.FloatNumber:
+            key = (kind, field_key(node.value))
+        elif kind == AST.Matrix:
+            node.children[:] = [self.node(item) for item in node.children]
+            key = (kind, tuple(node.children))
+        elif kind == AST.UnaryExpression:
+            node.right = self.node(node.right)
+            key = (kind, node.op, node.right)
+        elif kind == AST.TransposeStatement:
+            node.value = self.node(node.value)
+            key = (kind, node.value)
+        elif kind == AST.ElementAccessExpression:
+            node.variable = self.node(node.variable)
+            node.index = self.node(node.index)
+            key = (kind, node.variable, node.index)
+        elif kind == AST.ListOfIntegers:
+            key = (kind, tuple(node.children))
+        else:
+            return self.walk(node)
+
+        interned = self.table.setdefault(key, node)
+        if interned is not node:
+            self.shared += 1
+        return interned
+
+    def children(self, node):
+        return super().children(node) if is_walked(node) else ()
+
+    def leave(self, node, values):
+        if not is_walked(node):
+            return self.node(node)
+        if values:
+            values = iter(values)
+            for field in type(node).__slots__:
+                value = getattr(node, field, None)
+                if isinstance(value, AST.Node):
+                    setattr(node, field, next(values))
+                elif type(value) == list:
+                    value[:] = [next(values) if isinstance(item, AST.Node) else item for item in value]
+
+        if not is_expression(node):
+            return node
+        key = self.key(node)
+        interned = self.table.setdefault(key, node)
+        if interned is not node:
+            self.shared += 1
+        return interned
+
+    @staticmethod
+    def key(node):
+        return (type(node),) + tuple(field_key(getattr(node, field, None)) for field in type(node).__slots__)
+
+    def is_interned(self, node):
+        return is_expression(node) and self.table.get(self.key(node)) is node
+
+    # structural_hash() of a node, remembered for the interned expressions in it
+    def hash(self, node):
+        with paused_gc():
+            return int.from_bytes(Hasher(self).digest(node), 'little')
+
+
+# Bytes hashed for a field; child(node) gives the digest of a child node
+def encode(value, child):
+    if isinstance(value, AST.Node):
+        return b'N' + child(value)
+    if value is None:
+        return b'0'
+    if type(value) == list:
+        return b'L' + len(value).to_bytes(8, 'little') + b''.join(encode(item, child) for item in value)
+    if type(value) == int:
+        return b'I' + str(value).encode() + b';'
+    if type(value) == float:
+        return b'F' + value.hex().encode() + b';'
+    if type(value) == str:
+        text = value.encode()
+        return b'S' + len(text).to_bytes(8, 'little') + text
+    raise ValueError("Cannot hash a value of type {0}".format(type(value).__name__))
+
+
+# 64-bit digests of subtrees, each computed from the node's class, its fields and the digests of its children.
+# A subtree reached more than once is hashed once, as are interned expressions across calls.
+# Recurses like Interner.node() and hands statements and long operator chains to walk().
+class Hasher(Walker):
+    def __init__(self, interner=None):
+        self.interner = interner
+        self.digests = {}
+        self.known = interner.hashes if interner is not None else {}
+
+    def cached(self, node):
+        return self.digests.get(id(node)) or self.known.get(id(node))
+
+    def digest(self, node):
+        digest = self.cached(node)
+        if digest is not None:
+            return digest
+        if is_walked(node):
+            return self.walk(node)
+        return self.store(node, self.digest)
+
+    def store(self, node, child):
+        data = [type(node).__name__.encode()]
+        data.extend([encode(getattr(node, field, None), child) for field in type(node).__slots__])
+        digest = hashlib.blake2b(b''.join(data), digest_size=8).digest()
+
+        self.digests[id(node)] = digest
+        if self.interner is not None and self.interner.is_interned(node):
+            self.known[id(node)] = digest
+        return digest
+
+    def children(self, node):
+        if self.cached(node) is not None or not is_walked(node):
+            return ()
+        return super().children(node)
+
+    def leave(self, node, values):
+        digest = self.cached(node)
+        if digest is not None:
+            return digest
+        if not is_walked(node):
+            return self.store(node, self.digest)
+        values = iter(values)
+        return self.store(node, lambda child: next(values))
+
+
+# Hash of the structure of a tree: equal for equal trees in every run and process, unlike hash(), which salts
+# strings, and independent of where the nodes are in the source. A key for caches, not a proof of equality.
+def structural_hash(root):
+    with paused_gc():
+        return int.from_bytes(Hasher().digest(root), 'little')
@@ -1,3 +1,4 @@
+import sys
 from functools import wraps
 
 from parser.ast import AST
@@ -14,130 +15,252 @@ def addToClass(cls):
     return decorator
 
 
+# Indent prefixes are cached, so a line costs a list lookup instead of a new string. The cache stops at
+# MAX_CACHED_INDENT: its size grows with the square of the depth and deeper lines are rare.
+PREFIXES = ['']
+MAX_CACHED_INDENT = 1024
+
+# Number of lines joined into a single write on the output sink
+LINES_PER_WRITE = 4096
+
+
+def prefix(indent):
+    if indent < len(PREFIXES):
+        return PREFIXES[indent]
+    if indent > MAX_CACHED_INDENT:
+        return '|' * indent
+    while len(PREFIXES) <= indent:
+        PREFIXES.append(PREFIXES[-1] + '|')
+    return PREFIXES[indent]
+
+
+def write_lines(lines, file=None):
+    # Every line goes through one buffer that is flushed to the sink in large chunks,
+    # which makes dumping a big tree cost a handful of write calls instead of one per node
+    if file is None:
+        file = sys.stdout
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) == LINES_PER_WRITE:
+            buffer.append('')
+            file.write('\n'.join(buffer))
+            buffer.clear()
+    if buffer:
+        buffer.append('')
+        file.write('\n'.join(buffer))
+
+
+# Lines between a node's children, like THEN and ELSE, are printed at the level of the node itself
+class Label(str):
+    pass
+
+
+THEN = Label("THEN")
+ELSE = Label("ELSE")
+
+
+def tree_lines(root, indent=0):
+    # Pre-order walk on an explicit stack, so chains like a+b+c+... are printed without recursing per operator.
+    # Every entry carries the indent of its line, which is all the printer needs to know about the path to it.
+    stack = [(root, indent)]
+    pop, push = stack.pop, stack.append
+    while stack:
+        item, indent = pop()
+        if isinstance(item, AST.Node):
+            label = item.treeLabel()
+            if label is not None:
+                yield prefix(indent) + label
+                indent += 1
+            for child in reversed(item.treeChildren()):
+                push((child, indent))
+        elif type(item) == Label:
+            yield prefix(indent - 1) + item
+        else:
+            yield prefix(indent) + str(item)
+
+
+# treeLabel() is the line printed for a node, or None for nodes that only group their children;
+# treeChildren() what is printed below it, one level deeper.
 class TreePrinter:
     @addToClass(AST.Node)
-    def printTree(self, indent=0):
-        raise Exception("printTree not defined in class " + self.__class__.__name__)
+    def printTree(self, indent=0, file=None):
+        write_lines(self.treeLines(indent), file)
+
+    @addToClass(AST.Node)
+    def treeLines(self, indent=0):
+        return tree_lines(self, indent)
+
+    @addToClass(AST.Node)
+    def treeLabel(self):
+        raise Exception("treeLabel not defined in class " + self.__class__.__name__)
+
+    @addToClass(AST.Node)
+    def treeChildren(self):
+        return ()
 
     @addToClass(AST.CodeBlock)
-    def printTree(self, indent=0):
-        for statement in self.children:
-            statement.printTree(indent)
+    def treeLabel(self):
+        return None
+
+    @addToClass(AST.CodeBlock)
+    def treeChildren(self):
+        return self.children
 
     @addToClass(AST.IntegerNumber)
-    def printTree(self, indent=0):
-        print('|' * indent + str(self.value))
+    def treeLabel(self):
+        return str(self.value)
 
     @addToClass(AST.FloatNumber)
-    def printTree(self, indent=0):
-        print('|' * indent + str(self.value))
+    def treeLabel(self):
+        return str(self.value)
 
     @addToClass(AST.StringValue)
-    def printTree(self, indent=0):
-        print('|' * indent + r'"' + str(self.value) + r'"')
+    def treeLabel(self):
+        return r'"' + str(self.value) + r'"'
 
     @addToClass(AST.Variable)
-    def printTree(self, indent=0):
-        print('|' * indent + str(self.name))
+    def treeLabel(self):
+        return str(self.name)
+
+    @addToClass(AST.BinaryExpression)
+    def treeLabel(self):
+        return self.op
 
     @addToClass(AST.BinaryExpression)
-    def printTree(self, indent=0):
-        print('|' * indent + self.op)
-        self.left.printTree(indent + 1)
-        self.right.printTree(indent + 1)
+    def treeChildren(self):
+        return [self.left, self.right]
 
     @addToClass(AST.UnaryExpression)
-    def printTree(self, indent=0):
-        print('|' * indent + self.op)
-        self.right.printTree(indent + 1)
+    def treeLabel(self):
+        return self.op
+
+    @addToClass(AST.UnaryExpression)
+    def treeChildren(self):
+        return [self.right]
 
     @addToClass(AST.Matrix)
-    def printTree(self, indent=0):
-        print('|' * indent + "MATRIX")
+    def treeLabel(self):
+        return "MATRIX"
 
-        for row in self.children:
-            row.printTree(indent + 1)
+    @addToClass(AST.Matrix)
+    def treeChildren(self):
+        return self.children
 
     @addToClass(AST.ReturnStatement)
-    def printTree(self, indent=0):
-        print('|' * indent + "RETURN")
-        if self.value is not None:
-            self.value.printTree(indent + 1)
+    def treeLabel(self):
+        return "RETURN"
+
+    @addToClass(AST.ReturnStatement)
+    def treeChildren(self):
+        return [self.value] if self.value is not None else ()
 
     @addToClass(AST.BreakStatement)
-    def printTree(self, indent=0):
-        print('|' * indent + "BREAK")
+    def treeLabel(self):
+        return "BREAK"
 
     @addToClass(AST.ContinueStatement)
-    def printTree(self, indent=0):
-        print('|' * indent + "CONTINUE")
+    def treeLabel(self):
+        return "CONTINUE"
+
+    @addToClass(AST.ElementAccessExpression)
+    def treeLabel(self):
+        return "REF"
 
     @addToClass(AST.ElementAccessExpression)
-    def printTree(self, indent=0):
-        print('|' * indent + "REF")
-        self.variable.printTree(indent + 1)
-        self.index.printTree(indent + 1)
+    def treeChildren(self):
+        return [self.variable, self.index]
 
     @addToClass(AST.IfStatement)
-    def printTree(self, indent=0):
-        print('|' * indent + "IF")
-        self.condition.printTree(indent + 1)
-        print('|' * indent + "THEN")
-        self.code_block.printTree(indent + 1)
+    def treeLabel(self):
+        return "IF"
 
-        if self.else_statement is not None:
-            print('|' * indent + "ELSE")
-            self.else_statement.printTree(indent + 1)
+    @addToClass(AST.IfStatement)
+    def treeChildren(self):
+        if self.else_statement is None:
+            return [self.condition, THEN, self.code_block]
+        return [self.condition, THEN, self.code_block, ELSE, self.else_statement]
+
+    @addToClass(AST.WhileStatement)
+    def treeLabel(self):
+        return "WHILE"
 
     @addToClass(AST.WhileStatement)
-    def printTree(self, indent=0):
-        print('|' * indent + "WHILE")
-        self.condition.printTree(indent + 1)
-        self.code_block.printTree(indent + 1)
+    def treeChildren(self):
+        return [self.condition, self.code_block]
 
     @addToClass(AST.RangeExpression)
-    def printTree(self, indent=0):
-        print('|' * indent + "RANGE")
-        self.left.printTree(indent + 1)
-        self.right.printTree(indent + 1)
+    def treeLabel(self):
+        return "RANGE"
+
+    @addToClass(AST.RangeExpression)
+    def treeChildren(self):
+        return [self.left, self.right]
+
+    @addToClass(AST.ForStatement)
+    def treeLabel(self):
+        return "FOR"
 
     @addToClass(AST.ForStatement)
-    def printTree(self, indent=0):
-        print('|' * indent + "FOR")
-        self.iteration_variable_range.printTree(indent + 1)
-        self.code_block.printTree(indent + 1)
+    def treeChildren(self):
+        return [self.iteration_variable_range, self.code_block]
+
+    @addToClass(AST.VectorizedLoop)
+    def treeLabel(self):
+        return None
+
+    @addToClass(AST.VectorizedLoop)
+    def treeChildren(self):
+        return [self.loop]
 
     @addToClass(AST.TransposeStatement)
-    def printTree(self, indent=0):
-        print('|' * indent + "TRANSPOSE")
-        self.value.printTree(indent + 1)
+    def treeLabel(self):
+        return "TRANSPOSE"
+
+    @addToClass(AST.TransposeStatement)
+    def treeChildren(self):
+        return [self.value]
+
+    @addToClass(AST.PrintStatement)
+    def treeLabel(self):
+        return "PRINT"
 
     @addToClass(AST.PrintStatement)
-    def printTree(self, indent=0):
-        print('|' * indent + "PRINT")
-        for value in self.values:
-            value.printTree(indent + 1)
+    def treeChildren(self):
+        return self.values
+
+    @addToClass(AST.ZerosStatement)
+    def treeLabel(self):
+        return "ZEROS"
 
     @addToClass(AST.ZerosStatement)
-    def printTree(self, indent=0):
-        print('|' * indent + "ZEROS")
-        print('|' * (indent + 1) + str(self.value))
+    def treeChildren(self):
+        return [self.value]
 
     @addToClass(AST.OnesStatement)
-    def printTree(self, indent=0):
-        print('|' * indent + "ONES")
-        print('|' * (indent + 1) + str(self.value))
+    def treeLabel(self):
+        return "ONES"
+
+    @addToClass(AST.OnesStatement)
+    def treeChildren(self):
+        return [self.value]
+
+    @addToClass(AST.EyeStatement)
+    def treeLabel(self):
+        return "EYE"
 
     @addToClass(AST.EyeStatement)
-    def printTree(self, indent=0):
-        print('|' * indent + "EYE")
-        print('|' * (indent + 1) + str(self.value))
+    def treeChildren(self):
+        return [self.value]
+
+    @addToClass(AST.ListOfIntegers)
+    def treeLabel(self):
+        return None
 
     @addToClass(AST.ListOfIntegers)
-    def printTree(self, indent=0):
-        for v in self.children:
-            print('|' * indent + str(v))
+    def treeChildren(self):
+        return self.children
 
     @addToClass(AST.Error)
-    def printTree(self, indent=0):
-        pass
+    def treeLabel(self):
+        return None
@@ -0,0 +1,160 @@
+from types import GeneratorType
+
+from parser.ast import AST
+
+
+def children(node):
+    # Fields are listed in __slots__ in source order, so this is also the order the children appear in the program
+    nodes = []
+    for field in type(node).__slots__:
+        value = getattr(node, field, None)
+        if isinstance(value, AST.Node):
+            nodes.append(value)
+        elif type(value) == list:
+            nodes.extend(item for item in value if isinstance(item, AST.Node))
+    return nodes
+
+
+def walk(root, expand=children):
+    # Depth-first traversal yielding (node, True) before a node's children and (node, False) after them.
+    # expand(node) returns what to descend into; items it returns that are not nodes are yielded like leaves.
+    stack = [(root, True)]
+    while stack:
+        node, entering = stack.pop()
+        yield node, entering
+        if entering:
+            stack.append((node, False))
+            if isinstance(node, AST.Node):
+                stack.extend([(child, True) for child in reversed(expand(node))])
+
+
+# Depth-first traversal on an explicit stack, so a 100k-term a+b+c+... chain or deeply nested blocks are bounded
+# by memory rather than by the recursion limit.
+# enter() is called before a node's children and leave() after them with the list of values leave() returned for
+# each child; the value leave() returns for a node is handed to its parent and walk() returns the root's.
+# Subclasses override children() to choose where to descend and treat everything else as a leaf.
+class Walker:
+    def children(self, node):
+        return children(node)
+
+    def enter(self, node):
+        pass
+
+    def leave(self, node, values):
+        return node
+
+    def walk(self, root):
+        stack = [(root, -1)]
+        values = []
+        while stack:
+            node, count = stack.pop()
+            if count < 0:
+                self.enter(node)
+                nodes = self.children(node)
+                stack.append((node, len(nodes)))
+                stack.extend([(child, -1) for child in reversed(nodes)])
+            elif count:
+                results = values[-count:]
+                del values[-count:]
+                values.append(self.leave(node, results))
+            else:
+                values.append(self.leave(node, []))
+        return values.pop()
+
+
+# Copies a tree with new nodes and lists and the same field values otherwise, which are numbers and strings.
+# A node reached more than once, as after interning, is copied once, so the copy shares what the tree shares.
+class Copier(Walker):
+    def __init__(self):
+        self.copies = {}
+
+    def children(self, node):
+        return () if id(node) in self.copies else children(node)
+
+    def leave(self, node, values):
+        copy = self.copies.get(id(node))
+        if copy is not None:
+            return copy
+
+        copy = object.__new__(type(node))
+        copy.line = node.line
+        copy.column = node.column
+        values = iter(values)
+        for field in type(node).__slots__:
+            if not hasattr(node, field):
+                continue
+            value = getattr(node, field)
+            if isinstance(value, AST.Node):
+                value = next(values)
+            elif type(value) == list:
+                value = [next(values) if isinstance(item, AST.Node) else item for item in value]
+            setattr(copy, field, value)
+        self.copies[id(node)] = copy
+        return copy
+
+
+def copy_tree(root):
+    return Copier().walk(root)
+
+
+# Runs a pass over statements nested in statements, like if within if within while, on an explicit stack of
+# generators rather than recursing once per level. steps(node) either handles node and returns its result, or
+# returns a generator that yields the nodes it needs handled in turn, gets the result of each sent back and
+# returns the result of node. An exception raised for a node is thrown into the generator that yielded it, so
+# a loop can catch a break raised in its body however deep, and goes on up when that generator does not catch it.
+def run_steps(root, steps):
+    value = steps(root)
+    if value.__class__ is not GeneratorType:
+        return value
+
+    stack = [value]
+    value = None
+    error = None
+    while stack:
+        top = stack[-1]
+        try:
+            if error is None:
+                node = top.send(value)
+            else:
+                node = top.throw(error)
+                error = None
+        except StopIteration as stop:
+            stack.pop()
+            value = stop.value
+            error = None
+            continue
+        except Exception as e:
+            stack.pop()
+            error = e
+            continue
+
+        try:
+            value = steps(node)
+        except Exception as e:
+            error = e
+            continue
+        if value.__class__ is GeneratorType:
+            stack.append(value)
+            value = None
+
+    if error is not None:
+        raise error
+    return value
+
+
+# Passes recurse into short expressions, which is faster, and hand anything nested deeper than this to a Walker
+MAX_RECURSION_DEPTH = 64
+
+
+def is_deep(node):
+    # Whether the chain of binary operators down the left or the right operands of node is longer than
+    # MAX_RECURSION_DEPTH; long chains like a+b+c+... and a+(b+(c+...)) nest along one side.
+    for field in ('left', 'right'):
+        depth = 0
+        child = node
+        while type(child) == AST.BinaryExpression:
+            depth += 1
+            if depth > MAX_RECURSION_DEPTH:
+                return True
+            child = getattr(child, field)
+    return False
@@ -1 +1 @@
-__all__ = ["AST", "TreePrinter"]
+__all__ = ["AST", "TreePrinter", "Walker", "Binary"]
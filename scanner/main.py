@@ -11,16 +11,10 @@ if __name__ == '__main__':
         print("Cannot open {0} file".format(filename))
         sys.exit(0)
 
-    text = file.read()
     lexer = scanner.Scanner()
     lexer.build()
 
-    lexer.input(text)  # Give the lexer some input
-
-    # Tokenize
-    while True:
-        tok = lexer.token()
-        if not tok:
-            break  # No more input
-        column = lexer.find_column(text, tok)
-        print("(%d,%d): %s(%s)" % (tok.lineno, column, tok.type, tok.value))
+    # Tokenize, reading the file a chunk at a time. Tokens are printed one at a time as they are lexed, so an illegal
+    # character is reported between the tokens around it.
+    for tok in lexer.stream(file):
+        print("(%d,%d): %s(%s)" % (tok.lineno, tok.column, tok.type, tok.value))
@@ -1,5 +1,337 @@
+import array
+import bisect
+import functools
+import hashlib
+import importlib.util
+import os
+import re
+import shutil
+import tempfile
+
 import ply.lex as lex
 
+# Strings and comments as the scanner sees them; a lone quote is a string that runs past the text.
+STRINGS_AND_COMMENTS = re.compile(r'"[^"]*"|#.*|"')
+
+# Characters read from a stream at a time
+CHUNK_SIZE = 1 << 16
+
+# Scanner backends: PLY's lexer, or FastLexer
+BACKENDS = ('ply', 'fast')
+
+
+def has_open_string(text):
+    return '"' in text and any(match.group() == '"' for match in STRINGS_AND_COMMENTS.finditer(text))
+
+
+# Where text can be cut so that both parts lex as they would together: after its last line break outside
+# strings, since no other token spans lines. 0 when there is no such place.
+def line_boundary(text):
+    end = len(text)
+    strings = []
+    if '"' in text:
+        for match in STRINGS_AND_COMMENTS.finditer(text):
+            if match.group() == '"':
+                end = match.start()
+                break
+            if match.group()[0] == '"' and '\n' in match.group():
+                strings.append(match.span())
+
+    cut = text.rfind('\n', 0, end)
+    while strings and cut >= 0:
+        start, stop = strings.pop()
+        if cut >= stop:
+            break
+        if cut > start:
+            cut = text.rfind('\n', 0, start)
+    return cut + 1
+
+
+# Text of a stream in runs of whole lines, cut where line_boundary() allows, each with its offset in the stream.
+# A run is about chunk_size characters, or longer when a string is open at its end.
+def line_chunks(file, chunk_size=CHUNK_SIZE):
+    pending = ''
+    offset = 0
+    while True:
+        chunk = file.read(chunk_size)
+        pending += chunk
+        cut = line_boundary(pending) if chunk else len(pending)
+        if not cut:
+            if chunk:
+                continue
+            return
+
+        text, pending = pending[:cut], pending[cut:]
+        yield text, offset
+        offset += cut
+
+
+# Feeds already scanned tokens, or tokens from a generator such as Scanner.stream(), to the parser.
+class TokenFeed:
+    def __init__(self, tokens):
+        self.token = functools.partial(next, iter(tokens), None)
+
+
+# Tokens of a text as parallel arrays, one entry per token, so tools can scan, filter and count tokens without
+# an object for each:
+#     types        the token's type, as its index in names, which are Scanner.tokens
+#     starts       its offset, from the start of the stream for arrays of a stream
+#     lengths      the length of its text
+#     lines        the line it starts on
+# The values of numbers are on the side: integers and floats in the order of their tokens, and integer_tokens
+# and float_tokens the number of the token each belongs to. Any other token's value is its text.
+class TokenArrays:
+    def __init__(self, names, text, offset, line_starts, first_line, types, starts, lengths, lines,
+                 integer_tokens, integers, float_tokens, floats):
+        self.names = names
+        self.text = text
+        self.offset = offset
+        self.line_starts = line_starts
+        self.first_line = first_line
+        self.types = types
+        self.starts = starts
+        self.lengths = lengths
+        self.lines = lines
+        self.integer_tokens = integer_tokens
+        self.integers = integers
+        self.float_tokens = float_tokens
+        self.floats = floats
+
+    def __len__(self):
+        return len(self.types)
+
+    def type_id(self, name):
+        return self.names.index(name)
+
+    def count(self, name):
+        return int((self.types == self.type_id(name)).sum())
+
+    @property
+    def columns(self):
+        return self.starts - self.offset - self.line_starts[self.lines - self.first_line] + 1
+
+    def token_text(self, number):
+        start = int(self.starts[number]) - self.offset
+        return self.text[start:start + int(self.lengths[number])]
+
+    # The value the token would have from Scanner.token()
+    def value(self, number):
+        for tokens, values in ((self.integer_tokens, self.integers), (self.float_tokens, self.floats)):
+            index = int(tokens.searchsorted(number))
+            if index < len(tokens) and tokens[index] == number:
+                return values[index:index + 1].tolist()[0]
+        return self.token_text(number)
+
+    # Values of all the tokens, in order
+    def values(self):
+        text = self.text
+        values = [text[start:start + length] for start, length in
+                  zip((self.starts - self.offset).tolist(), self.lengths.tolist())]
+        for tokens, numbers in ((self.integer_tokens, self.integers), (self.float_tokens, self.floats)):
+            for number, value in zip(tokens.tolist(), numbers.tolist()):
+                values[number] = value
+        return values
+
+
+# Rules of a lexer module as (name, regex), in the order PLY's lex tries them: function rules in the order they
+# are defined, then string rules from the longest regex, with ties in alphabetical order.
+def lex_rules(module):
+    rules = [(name, getattr(module, name)) for name in dir(module)
+             if name.startswith('t_') and name not in ('t_ignore', 't_error', 't_eof')]
+    functions = sorted((rule.__code__.co_firstlineno, name[2:], rule.__doc__) for name, rule in rules if callable(rule))
+    strings = sorted(((name[2:], rule) for name, rule in rules if isinstance(rule, str)),
+                     key=lambda rule: len(rule[1]), reverse=True)
+    return [(name, regex) for _, name, regex in functions] + strings
+
+
+# A lexer for the Scanner's rules without PLY's per-token overhead. All rules are alternatives of one regex, tried
+# in the order PLY's lex tries them, so the tokens are the same. Each alternative is followed by an empty group
+# that names it through lastindex; groups around the alternatives would hide their first characters from the
+# regex engine, which then could no longer skip the ones that cannot match. What the function rules do is done
+# inline and each token gets its column as it is made. A generator keeps the state in local variables between
+# tokens. It has the parts of PLY's lexer the Scanner uses.
+class FastLexer:
+    # Function rules whose work is done here
+    RULES = ('STRING', 'FLOATING_POINT_NUM', 'INT_NUM', 'ID', 'newline')
+
+    def __init__(self, scanner):
+        rules = lex_rules(scanner)
+        unknown = [name for name, _ in rules if name not in self.RULES and callable(getattr(scanner, 't_' + name))]
+        if unknown:
+            raise ValueError("The fast lexer does not handle rules {0}".format(', '.join(unknown)))
+
+        self.scanner = scanner
+        self.ignore = scanner.t_ignore
+        self.master = re.compile('|'.join('(?:{0})()'.format(regex) for _, regex in rules), re.VERBOSE)
+
+        # token name by the number of the group closing its alternative
+        self.kinds = [None]
+        for name, regex in rules:
+            self.kinds.extend([None] * re.compile(regex, re.VERBOSE).groups + [name])
+        self.handled = frozenset(self.RULES) | {name for name, _ in rules if name.startswith('ignore_')}
+
+        self.lexdata = ''
+        self.lexpos = 0
+        self.lineno = 1
+        self.token = None
+
+    def input(self, text):
+        self.lexdata = text
+        self.lexpos = 0
+        self.token = functools.partial(next, self.scan(), None)
+
+    def skip(self, n):
+        self.lexpos += n
+
+    # Started by the first call to token(), after the Scanner has set lineno and line_starts for this input.
+    # Matches are searched for, so characters between two tokens are skipped by the regex engine; they only need
+    # a look when they are not all ignored, and then lexing starts over after the error they give.
+    def scan(self):
+        text = self.lexdata
+        ignore = self.ignore
+        finditer = self.master.finditer
+        kinds = self.kinds
+        handled = self.handled
+        reserved = self.scanner.reserved
+        line_starts = self.scanner.line_starts
+        line_start = line_starts[-1]
+        lineno = self.lineno
+        position = 0
+
+        while True:
+            for found in finditer(text, position):
+                start, end = found.span()
+                if start != position and text[position:start].strip(ignore):
+                    break
+                position = end
+                kind = kinds[found.lastindex]
+                value = found.group()
+
+                if kind in handled:
+                    if kind == 'ID':
+                        kind = reserved.get(value, 'ID')
+                    elif kind == 'INT_NUM':
+                        value = int(value)
+                    elif kind == 'newline':
+                        lineno += len(value)
+                        self.lineno = lineno
+                        line_starts.extend(range(start + 1, end + 1))
+                        line_start = end
+                        continue
+                    elif kind == 'FLOATING_POINT_NUM':
+                        value = float(value)
+                    elif kind != 'STRING':
+                        continue
+
+                token = lex.LexToken()
+                token.type, token.value, token.lineno, token.lexpos, token.column = \
+                    kind, value, lineno, start, start - line_start + 1
+
+                if kind == 'STRING':
+                    newline = value.find('\n')
+                    while newline != -1:
+                        lineno += 1
+                        line_start = start + newline + 1
+                        line_starts.append(line_start)
+                        newline = value.find('\n', newline + 1)
+                    self.lineno = lineno
+
+                yield token
+            else:
+                if not text[position:].strip(ignore):
+                    return
+
+            position, token = self.error(text, position, lineno)
+            if token is not None:
+                yield token
+
+    # The tokens of the whole input as the columns TokenArrays is made of, without making a token object for any.
+    # Types and positions go straight into typed arrays, which hold them without an int object for each.
+    # The same as scan() but for what it keeps of each token.
+    def tokenize(self, ids):
+        text = self.lexdata
+        ignore = self.ignore
+        finditer = self.master.finditer
+        kinds = [ids.get(kind, kind) for kind in self.kinds]
+        names = self.kinds
+        handled = self.handled
+        keywords = {word: ids[kind] for word, kind in self.scanner.reserved.items()}
+        line_starts = self.scanner.line_starts
+        lineno = self.lineno
+        position = 0
+
+        types, starts, lengths, lines = array.array('B'), array.array('q'), array.array('i'), array.array('i')
+        integer_tokens, integers, float_tokens, floats = [], [], [], []
+        while True:
+            for found in finditer(text, position):
+                start, end = found.span()
+                if start != position and text[position:start].strip(ignore):
+                    break
+                position = end
+                index = found.lastindex
+                kind = kinds[index]
+
+                if names[index] in handled:
+                    name = names[index]
+                    if name == 'ID':
+                        kind = keywords.get(found.group(), kind)
+                    elif name == 'INT_NUM':
+                        integer_tokens.append(len(types))
+                        integers.append(int(found.group()))
+                    elif name == 'newline':
+                        lineno += end - start
+                        line_starts.extend(range(start + 1, end + 1))
+                        continue
+                    elif name == 'FLOATING_POINT_NUM':
+                        float_tokens.append(len(types))
+                        floats.append(float(found.group()))
+                    elif name == 'STRING':
+                        types.append(kind)
+                        starts.append(start)
+                        lengths.append(end - start)
+                        lines.append(lineno)
+                        newline = text.find('\n', start, end)
+                        while newline != -1:
+                            lineno += 1
+                            line_starts.append(newline + 1)
+                            newline = text.find('\n', newline + 1, end)
+                        continue
+                    else:
+                        continue
+
+                types.append(kind)
+                starts.append(start)
+                lengths.append(end - start)
+                lines.append(lineno)
+            else:
+                if not text[position:].strip(ignore):
+                    break
+
+            self.lineno = lineno
+            position, token = self.error(text, position, lineno)
+            if token is not None and token.type in ids:
+                types.append(ids[token.type])
+                starts.append(token.lexpos)
+                lengths.append(position - token.lexpos)
+                lines.append(token.lineno)
+
+        self.lineno = lineno
+        return types, starts, lengths, lines, integer_tokens, integers, float_tokens, floats
+
+    # Hands the illegal character at position to t_error as PLY does, with the rest of the text as its value.
+    # Returns where lexing goes on, which t_error decides by skipping, and the token it returns if any.
+    def error(self, text, position, lineno):
+        while text[position] in self.ignore:
+            position += 1
+        token = lex.LexToken()
+        token.type, token.value, token.lineno, token.lexpos = 'error', text[position:], lineno, position
+        token.lexer = self
+        self.lexpos = position
+        token = self.scanner.t_error(token)
+        if self.lexpos == position:
+            raise lex.LexError("Scanning error. Illegal character '{0}'".format(text[position]), text[position:])
+        return self.lexpos, token
+
 
 class Scanner:
     reserved = {
@@ -96,6 +428,12 @@ class Scanner:
 
     t_SEMICOLON = r';'
 
+    # backend is one of BACKENDS: 'ply' lexes with PLY's lex, 'fast' with FastLexer, which gives the same tokens
+    def __init__(self, backend='ply'):
+        if backend not in BACKENDS:
+            raise ValueError("Unknown scanner backend '{0}'".format(backend))
+        self.backend = backend
+
     # literals = ['+', '-', '*', '/', '(', ')',
     #             '[', ']', '{', '}', ':', '\'', ',', ';']
 
@@ -105,6 +443,11 @@ class Scanner:
 
     def t_STRING(self, t):
         r'\"[^\"]*\"'
+        newline = t.value.find('\n')
+        while newline != -1:
+            t.lexer.lineno += 1
+            self.line_starts.append(t.lexpos + newline + 1)
+            newline = t.value.find('\n', newline + 1)
         return t
 
     def t_FLOATING_POINT_NUM(self, t):
@@ -123,30 +466,173 @@ class Scanner:
         return t
 
     # counting columns and lines
+    #     line_starts indexes the offset of every line lexed so far, which makes columns O(1)
+    #     for the token being emitted and a bisect for any earlier one.
     def t_newline(self, t):
         r'\n+'
         t.lexer.lineno += len(t.value)
+        self.line_starts.extend(range(t.lexpos + 1, t.lexpos + len(t.value) + 1))
 
     # Compute column.
     #     input is the input text string
     #     token is a token instance
     def find_column(self, input_text, token):
+        if input_text is self.get_data():
+            return self.find_position(token.lexpos)[1]
+
         line_start = input_text.rfind('\n', 0, token.lexpos) + 1
         return (token.lexpos - line_start) + 1
 
+    # (line, column) of an offset into the input lexed so far, both counted from 1.
+    def find_position(self, lexpos):
+        line = bisect.bisect_right(self.line_starts, lexpos)
+        return line + self.first_line - 1, lexpos - self.line_starts[line - 1] + 1
+
     def t_error(self, t):
         print("%d: illegal character '%s'" % (t.lineno, t.value[0]))
         t.lexer.skip(1)
 
+    # Fingerprint of everything lex bakes into a lextab: the token list and every rule,
+    # with function rules in definition order since that is the order lex tries them in.
+    def signature(self):
+        digest = hashlib.sha256(lex.__version__.encode())
+        digest.update(repr(self.tokens).encode())
+
+        rules = [(name, getattr(self, name)) for name in dir(self) if name.startswith('t_')]
+        strings = sorted((name, rule) for name, rule in rules if isinstance(rule, str))
+        functions = sorted((rule.__code__.co_firstlineno, name, rule.__doc__) for name, rule in rules if callable(rule))
+        digest.update(repr(strings).encode())
+        digest.update(repr([(name, doc) for _, name, doc in functions]).encode())
+
+        return digest.hexdigest()[:16]
+
     # Build the lexer
-    def build(self, **kwargs):
+    #     cache_dir, when given, holds pregenerated lextab modules named after the rules' signature.
+    #     A matching lextab is loaded as-is, otherwise the lexer is built and its table saved there.
+    #     The fast backend has no tables and ignores cache_dir.
+    def build(self, cache_dir=None, **kwargs):
+        if self.backend == 'fast':
+            self.lexer = FastLexer(self)
+            return
+
+        if cache_dir is None:
+            self.lexer = lex.lex(module=self, **kwargs)
+            return
+
+        name = 'lextab_' + self.signature()
+        path = os.path.join(cache_dir, name + '.py')
+
+        if os.path.exists(path):
+            spec = importlib.util.spec_from_file_location(name, path)
+            lextab = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(lextab)
+            self.lexer = lex.lex(module=self, optimize=1, lextab=lextab, **kwargs)
+            return
+
         self.lexer = lex.lex(module=self, **kwargs)
 
-    def input(self, input_text):
+        # Write next to the target and rename, so concurrent builds never see a partial table.
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            staging = tempfile.mkdtemp(dir=cache_dir)
+            try:
+                self.lexer.writetab(name, staging)
+                os.replace(os.path.join(staging, name + '.py'), path)
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+        except OSError:
+            pass
+
+    # Lines and columns are counted as if input_text started at lineno and column of a larger text,
+    # so a part of a file can be lexed again on its own after an edit.
+    def input(self, input_text, lineno=1, column=1):
         self.lexer.input(input_text)
-
+        self.lexer.lineno = lineno
+        self.first_line = lineno
+        self.line_starts = [1 - column]
+        if self.backend == 'fast':
+            # its tokens come with their columns, so they are handed out as they are
+            self.token = self.lexer.token
+
+    # Every token gets its column, so diagnostics never have to go back to the text.
     def token(self):
-        return self.lexer.token()
+        token = self.lexer.token()
+
+        if token is not None:
+            if token.lexpos >= self.line_starts[-1]:
+                token.column = token.lexpos - self.line_starts[-1] + 1
+            else:
+                # A string spanning lines has already indexed the lines after its start.
+                token.column = self.find_position(token.lexpos)[1]
+
+        return token
 
     def get_data(self):
         return self.lexer.lexdata
+
+    # Tokens of a file or any other stream with a read() method, holding only about chunk_size characters of it
+    # at a time: text is lexed a run of whole lines at a time, with lexpos still counted from the start of the
+    # stream. Lines are only held back while a string is open, so a string left unterminated keeps the rest of
+    # the stream in memory, as the whole of it has to be read to see that it never closes.
+    def stream(self, file, chunk_size=CHUNK_SIZE):
+        lineno = 1
+        for text, offset in line_chunks(file, chunk_size):
+            self.input(text, lineno)
+            for token in iter(self.token, None):
+                token.lexpos += offset
+                yield token
+            lineno = self.lexer.lineno
+
+    # All the tokens of input_text at once as TokenArrays, for tools that only need their types and positions.
+    # Lines and columns are counted as for input().
+    def tokenize(self, input_text, lineno=1, column=1):
+        import numpy as np
+
+        self.input(input_text, lineno, column)
+        ids = {name: index for index, name in enumerate(self.tokens)}
+        if self.backend == 'fast':
+            lists = self.lexer.tokenize(ids)
+        else:
+            lists = self.token_lists(ids)
+        types, starts, lengths, lines, integer_tokens, integers, float_tokens, floats = lists
+
+        try:
+            integers = np.array(integers, dtype=np.int64)
+        except OverflowError:
+            integers = np.array(integers, dtype=object)
+        return TokenArrays(self.tokens, input_text, 0, np.array(self.line_starts, dtype=np.int64), lineno,
+                           np.frombuffer(types, dtype=np.uint8), np.frombuffer(starts, dtype=np.int64),
+                           np.frombuffer(lengths, dtype=np.intc), np.frombuffer(lines, dtype=np.intc),
+                           np.array(integer_tokens, dtype=np.int64), integers,
+                           np.array(float_tokens, dtype=np.int64), np.array(floats, dtype=np.float64))
+
+    # What tokenize() keeps of the tokens PLY's lexer makes
+    def token_lists(self, ids):
+        types, starts, lengths, lines = array.array('B'), array.array('q'), array.array('i'), array.array('i')
+        integer_tokens, integers, float_tokens, floats = [], [], [], []
+        for token in iter(self.token, None):
+            if token.type not in ids:
+                continue
+            if token.type == 'INT_NUM':
+                integer_tokens.append(len(types))
+                integers.append(token.value)
+            elif token.type == 'FLOATING_POINT_NUM':
+                float_tokens.append(len(types))
+                floats.append(token.value)
+            types.append(ids[token.type])
+            starts.append(token.lexpos)
+            # lex leaves lexpos after the token it returned
+            lengths.append(self.lexer.lexpos - token.lexpos)
+            lines.append(token.lineno)
+        return types, starts, lengths, lines, integer_tokens, integers, float_tokens, floats
+
+    # TokenArrays of a stream, one for each run of lines stream() lexes at a time, with starts counted from the
+    # start of the stream
+    def stream_arrays(self, file, chunk_size=CHUNK_SIZE):
+        lineno = 1
+        for text, offset in line_chunks(file, chunk_size):
+            tokens = self.tokenize(text, lineno)
+            tokens.starts += offset
+            tokens.offset = offset
+            yield tokens
+            lineno = self.lexer.lineno
@@ -0,0 +1,71 @@
+import io
+
+import pytest
+
+from parser import Mparser
+from parser.ast import AST
+from parser.ast.Walker import walk
+from scanner import scanner
+
+
+@pytest.fixture(scope='session')
+def lexer():
+    lexer = scanner.Scanner()
+    lexer.build()
+    return lexer
+
+
+@pytest.fixture(scope='session')
+def parser(lexer):
+    return Mparser.Parser(lexer, debug=False, write_tables=False)
+
+
+# Parses a program, with its expressions interned in interner when one is given
+@pytest.fixture(scope='session')
+def parse(lexer, parser):
+    def parse(text, interner=None):
+        parser.interner = interner
+        return parser.parse(text, lexer=lexer)
+    return parse
+
+
+# Everything about a tree but the identity of its nodes: the class, position and other fields of each node
+def node_structure(root):
+    nodes = []
+    for node, entering in walk(root):
+        if entering and isinstance(node, AST.Node):
+            nodes.append((type(node).__name__, node.line, node.column) +
+                         tuple(None if isinstance(value, (AST.Node, list)) else value
+                               for value in (getattr(node, field, None) for field in type(node).__slots__)))
+    return nodes
+
+
+@pytest.fixture(scope='session')
+def structure():
+    return node_structure
+
+
+# Runs a parsed program on the tree-walking interpreter ('ast') or the virtual machine ('vm') and returns what it
+# printed
+@pytest.fixture(scope='session')
+def execute():
+    from interpreter import Compiler, Interpreter, VirtualMachine
+    from interpreter.Memory import Memory
+
+    def execute(program, backend='ast'):
+        output = io.StringIO()
+        memory = Memory(output)
+        if backend == 'ast':
+            Interpreter.run(program, memory)
+        else:
+            VirtualMachine.run(Compiler.compile_program(program), memory)
+        return output.getvalue()
+    return execute
+
+
+# Runs the text of a program as execute() does
+@pytest.fixture(scope='session')
+def run(parse, execute):
+    def run(text, backend='ast'):
+        return execute(parse(text), backend)
+    return run
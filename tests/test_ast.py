@@ -0,0 +1,76 @@
+import io
+import os
+
+from interpreter import Optimizer, TypeChecker, Vectorizer
+from interpreter.Profiler import node_classes
+from parser import Cache
+from parser.ast import Binary
+from parser.ast.Interner import Interner, structural_hash
+from parser.ast.Walker import copy_tree, walk
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_node_classes_have_slots():
+    for cls in node_classes():
+        assert '__slots__' in cls.__dict__, cls.__name__
+
+
+def test_nodes_have_no_dict(parse):
+    with open(os.path.join(ROOT, 'examples', 'control_flow.txt')) as example:
+        program = parse(example.read())
+    kinds = set()
+    for node, entering in walk(program):
+        if entering:
+            kinds.add(type(node))
+            assert not hasattr(node, '__dict__')
+            assert isinstance(node.line, int) and isinstance(node.column, int)
+    assert len(kinds) > 10
+
+
+# Blocks nested far deeper than the recursion limit, around an operator chain as long
+DEPTH = 3000
+DEEP = "x = 1;\n" + "if (x > 0) {\nwhile (x < 2) {\n" * (DEPTH // 2) + "x = {0};\nprint x;\nbreak;\n".format(
+    " + ".join(["x"] * DEPTH)) + "}\n}\n" * (DEPTH // 2)
+
+
+def test_walk_order(parse):
+    program = parse("x = 1 + y;\n")
+    order = [(type(node).__name__, entering) for node, entering in walk(program)]
+    assert order == [('CodeBlock', True), ('BinaryExpression', True), ('Variable', True), ('Variable', False),
+                     ('BinaryExpression', True), ('IntegerNumber', True), ('IntegerNumber', False),
+                     ('Variable', True), ('Variable', False), ('BinaryExpression', False),
+                     ('BinaryExpression', False), ('CodeBlock', False)]
+
+
+def test_copy_has_new_nodes_sharing_what_the_tree_shares(parse, structure):
+    program = parse(DEEP, Interner())
+    copy = copy_tree(program)
+    assert structure(copy) == structure(program)
+    originals = {id(node) for node, entering in walk(program) if entering}
+    assert not any(id(node) in originals for node, entering in walk(copy) if entering)
+    chain = copy
+    for _ in range(DEPTH):
+        chain = chain.children[-1]
+        chain = chain.code_block
+    assert chain.children[0].right.right is chain.children[1].values[0]
+
+
+def test_every_pass_handles_deep_programs(parse, structure, execute):
+    program = parse(DEEP)
+    sink = io.StringIO()
+    program.printTree(file=sink)
+    lines = sink.getvalue().splitlines()
+    assert lines.count("|" * (DEPTH - 2) + "THEN") == 1
+    assert lines[-1] == "|" * DEPTH + "BREAK"
+
+    assert TypeChecker.check(program) == []
+    assert structure(Binary.loads(Binary.dumps(program)).program) == structure(program)
+    assert structure(Cache.unflatten(*Cache.flatten(program))) == structure(program)
+    assert structural_hash(program) == structural_hash(parse(DEEP, Interner()))
+
+    expected = "{0}\n".format(DEPTH)
+    assert execute(program) == execute(program, 'vm') == expected
+    optimized, _ = Optimizer.optimize(copy_tree(program))
+    vectorized, report = Vectorizer.vectorize(copy_tree(program))
+    assert execute(optimized) == execute(vectorized) == expected
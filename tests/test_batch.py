@@ -0,0 +1,22 @@
+import pytest
+
+from parser import Batch
+
+PROGRAMS = {
+    'deep.txt': "x = {0};\nprint x;\n".format(" + ".join(["a"] * 2000)),
+    'nested.txt': "a = 1;\n" + "if (a) {\n" * 500 + "print a;\n" + "}\n" * 500,
+    'simple.txt': "A = eye(3);\nA[1, 2] = 5;\nprint A';\n",
+}
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_trees_sent_back_match_parse(tmp_path, parse, structure, jobs):
+    filenames = []
+    for name, text in PROGRAMS.items():
+        filenames.append(str(tmp_path / name))
+        (tmp_path / name).write_text(text)
+
+    results = Batch.compile_files(filenames, jobs=jobs, cache_dir=str(tmp_path / 'tables'), keep_trees=True)
+    for result, text in zip(results, PROGRAMS.values()):
+        assert result.ok, result.diagnostics
+        assert structure(result.ast) == structure(parse(text))
@@ -0,0 +1,32 @@
+from parser.ast import Binary
+from parser.ast.Interner import Interner
+
+PROGRAM = """
+A = eye(3) .* [1, 2, 3; 4, 5, 6; 7, 8, 9];
+B = eye(3) .* [1, 2, 3; 4, 5, 6; 7, 8, 9];
+if (A[1, 1] == B[1, 1]) {
+    print A + B, "equal";
+}
+"""
+
+
+def test_round_trip(parse, structure):
+    ast = parse(PROGRAM)
+    assert structure(Binary.loads(Binary.dumps(ast)).program) == structure(ast)
+
+
+def test_round_trip_of_interned_tree(parse, structure):
+    interner = Interner()
+    ast = parse(PROGRAM, interner)
+    assert interner.shared
+    reader = Binary.loads(Binary.dumps(ast))
+    assert structure(reader.program) == structure(ast)
+    assert [structure(statement) for statement in reader.statements()] == \
+        [structure(statement) for statement in ast.children]
+
+
+def test_integers_beyond_64_bits(parse, structure):
+    ast = parse("x = 99999999999999999999;\ny = 2;\n")
+    program = Binary.loads(Binary.dumps(ast)).program
+    assert structure(program) == structure(ast)
+    assert program.children[0].right.value == 99999999999999999999
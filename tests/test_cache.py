@@ -0,0 +1,53 @@
+import marshal
+import os
+import pickle
+import zlib
+
+from parser import Cache
+
+# Deep enough that a tree of nested nodes would not pickle or unpickle within the recursion limit
+DEEP = "x = 1;\n" + "if (x > 0) {\n" * 1000 + "print x;\n" + "}\n" * 1000
+TEXT = "A = [1, 2; 3, 4];\nB = A' .* 12345678901234567890;\nprint \"done\", B[0, 1];\n"
+
+
+def entry(cache, text):
+    return cache.path(cache.key(text))
+
+
+def test_stored_tree_loads_back_the_same(tmp_path, parse, structure):
+    cache = Cache.ASTCache(str(tmp_path))
+    for text in (TEXT, DEEP):
+        ast = parse(text)
+        assert cache.store(text, ast)
+        assert structure(cache.load(text)) == structure(ast)
+    assert cache.hits == 2
+
+
+def test_entries_are_marshalled(tmp_path, parse):
+    cache = Cache.ASTCache(str(tmp_path))
+    cache.store(TEXT, parse(TEXT))
+    with open(entry(cache, TEXT), 'rb') as file:
+        classes, records = marshal.loads(zlib.decompress(file.read()))
+    assert 'CodeBlock' in classes and records
+
+
+def test_damaged_entry_is_a_miss(tmp_path, parse):
+    cache = Cache.ASTCache(str(tmp_path))
+    cache.store(TEXT, parse(TEXT))
+    path = entry(cache, TEXT)
+    with open(path, 'wb') as file:
+        file.write(b'not an entry')
+    assert cache.load(TEXT) is None
+    assert cache.misses == 1 and not os.path.exists(path)
+
+
+def test_entry_naming_other_objects_is_a_miss(tmp_path, parse):
+    cache = Cache.ASTCache(str(tmp_path))
+    cache.store(TEXT, parse(TEXT))
+    path = entry(cache, TEXT)
+    # neither a pickle nor a table naming anything but node classes is loaded
+    for data in (pickle.dumps(Cache.flatten(parse(TEXT))), marshal.dumps((['os'], [(0, 1, 1)]))):
+        with open(path, 'wb') as file:
+            file.write(zlib.compress(data))
+        assert cache.load(TEXT) is None
+    assert cache.misses == 2
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from interpreter import Fusion
+
+# Rows that do not fill the last block
+SHAPE = (Fusion.BLOCK_SIZE // 100 * 3 + 7, 100)
+
+
+@pytest.fixture
+def matrices():
+    rng = np.random.default_rng(0)
+    return [rng.standard_normal(SHAPE) for _ in range(3)]
+
+
+def combine(op, left, right):
+    expression = Fusion.combine(op, left, right)
+    assert expression is not None
+    return expression
+
+
+def test_chain_matches_eager_operators(matrices):
+    a, b, c = matrices
+    expression = combine('.+', combine('.*', a, b), combine('./', Fusion.negate(c), 3.0))
+    expression = combine('-', combine('*', 2, expression), combine('/', a, 0.5))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = 2 * (a * b + (-c) / 3.0) - a / 0.5
+        np.testing.assert_array_equal(Fusion.force(expression), expected)
+
+
+def test_transposed_operands():
+    a = np.random.default_rng(1).standard_normal((SHAPE[0], SHAPE[0]))
+    expression = combine('.-', a, a.T)
+    np.testing.assert_array_equal(Fusion.force(expression), a - a.T)
+
+
+def test_result_goes_into_an_operand_it_reads(matrices):
+    a, b, _ = matrices
+    expected = a + b * b
+    result = Fusion.force(combine('+', a, combine('.*', b, b)), out=a)
+    assert result is a
+    np.testing.assert_array_equal(a, expected)
+
+
+def test_result_does_not_go_into_a_matrix_it_overlaps():
+    a = np.random.default_rng(2).standard_normal((200, 200))
+    before = a.copy()
+    result = Fusion.force(combine('+', a, a.T), out=a)
+    assert result is not a
+    np.testing.assert_array_equal(a, before)
+    np.testing.assert_array_equal(result, before + before.T)
+
+
+@pytest.mark.parametrize('left, right', [
+    (np.ones((10, 10)), np.ones((10, 10))),
+    (np.ones(SHAPE), np.ones((SHAPE[1], SHAPE[0]))),
+    (np.ones(SHAPE, dtype=np.int64), np.ones(SHAPE, dtype=np.int64)),
+    (2, 3.0),
+])
+def test_what_is_not_deferred(left, right):
+    assert Fusion.combine('+', left, right) is None
+    assert Fusion.combine('*', np.ones(SHAPE), np.ones(SHAPE)) is None
+
+
+def test_long_chain_needs_few_buffers(matrices):
+    a, b, _ = matrices
+    expression = a
+    for _ in range(100000):
+        expression = combine('+', expression, b)
+    operations, registers = Fusion.schedule(expression)
+    assert len(operations) == 100000 and registers == 1
+
+
+def test_programs_print_the_same_as_on_the_vm(run):
+    text = ("A = ones(200);\nB = A .* 2 + A ./ 3 - A';\nA += B .* B;\nA -= 1;\nC = -A * 2 + A / 4;\n"
+            "print A[1, 1], B[2, 3], C[200, 200];\n")
+    assert run(text) == run(text, 'vm')
@@ -0,0 +1,106 @@
+import random
+
+import pytest
+
+from parser.Incremental import IncrementalParser, find_edit
+from parser.Mparser import ParseErrors
+
+TEXT = """x = 1;
+if (x > 0) {
+    y = [1, 2; 3, 4];
+}
+print "a", x;
+while (x < 10)
+    x += 1;
+z = y';
+"""
+
+# Edits of TEXT as (old, new) replacements of its first occurrence of old
+EDITS = [
+    ("x = 1;", "x = 12345;"),
+    ("x = 1;\n", "x = 1;\nw = 2;\n\n\n"),
+    ("print \"a\", x;\n", ""),
+    ("}\n", "} else {\n    y = eye(2);\n}\n"),
+    ("\"a\"", "\"a\nb\""),
+    ("x += 1;\nz", "x += 1; z"),
+    ("1, 2; 3, 4", "1, 2;\n 3, 4"),
+    (TEXT, "q = 1;\n"),
+]
+
+
+@pytest.fixture
+def incremental(lexer, parser):
+    parser.interner = None
+    return IncrementalParser(parser, lexer)
+
+
+def edit(incremental, text, new):
+    start, end, replacement = find_edit(text, new)
+    assert text[:start] + replacement + text[end:] == new
+    incremental.edit(start, end, replacement)
+    assert incremental.text == new
+
+
+def test_parse_matches_a_full_parse(incremental, parse, structure):
+    assert structure(incremental.parse(TEXT)) == structure(parse(TEXT))
+
+
+@pytest.mark.parametrize('old, new', EDITS)
+def test_edit_matches_a_full_parse(incremental, parse, structure, old, new):
+    incremental.parse(TEXT)
+    text = TEXT.replace(old, new, 1)
+    edit(incremental, TEXT, text)
+    assert structure(incremental.program) == structure(parse(text))
+
+
+def test_edits_reuse_the_statements_they_do_not_touch(incremental):
+    before = list(incremental.parse(TEXT).children)
+    edit(incremental, TEXT, TEXT.replace("x = 1;", "x = 2;\n"))
+    after = incremental.program.children
+    assert after[0] is not before[0]
+    assert all(old is new for old, new in zip(before[1:], after[1:]))
+    assert incremental.reparsed == 1
+
+
+def test_statement_with_an_error_is_parsed_again_until_fixed(incremental, parse, structure):
+    incremental.parse(TEXT)
+    broken = TEXT.replace("z = y';", "z = ;")
+    with pytest.raises(ParseErrors):
+        edit(incremental, TEXT, broken)
+    assert len(incremental.program.children) == len(parse(TEXT).children) - 1
+    fixed = broken.replace("z = ;", "z = 3;")
+    edit(incremental, broken, fixed)
+    assert structure(incremental.program) == structure(parse(fixed))
+
+
+def test_string_left_open_and_closed_again(incremental, parse, structure):
+    incremental.parse(TEXT)
+    # a quote that is never closed is skipped as an illegal character
+    opened = TEXT.replace("print \"a\"", "print \"a")
+    edit(incremental, TEXT, opened)
+    assert structure(incremental.program) == structure(parse(opened))
+    # the string now runs to the end of the program
+    closed = opened.replace("z = y';", "z = y'; \";")
+    edit(incremental, opened, closed)
+    assert structure(incremental.program) == structure(parse(closed))
+    edit(incremental, closed, TEXT)
+    assert structure(incremental.program) == structure(parse(TEXT))
+
+
+def test_many_edits_match_full_parses(incremental, parse, structure):
+    statements = ["a = {0};\n", "if (a > {0}) {{ b = a; }}\n", "print a, {0};\n", "while (a < {0})\n    a += 1;\n",
+                  "c = [{0}, 1;\n 2, 3];\n", "if (a > {0}) b = 1;\nelse b = 2;\n"]
+    rng = random.Random(0)
+    lines = ["a = 0;\n"]
+    text = ''.join(lines)
+    incremental.parse(text)
+    for _ in range(200):
+        index = rng.randrange(len(lines) + 1)
+        if rng.random() < 0.3 and len(lines) > 1:
+            del lines[min(index, len(lines) - 1)]
+        else:
+            lines.insert(index, rng.choice(statements).format(rng.randrange(100)))
+        new = ''.join(lines)
+        edit(incremental, text, new)
+        text = new
+    assert structure(incremental.program) == structure(parse(text))
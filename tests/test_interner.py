@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+
+from parser.ast.Interner import Interner, structural_hash
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TEXT = """A = [1, 2; 3, 4];
+B = [1, 2; 3, 4] .* A + eye(2);
+C = A .* [1, 2; 3, 4] + eye(2);
+x = 0.0;
+y = -0.0;
+z = 1 + 1.0;
+A[1, 2] = A[1, 2] + 1;
+print "s", "s", B, C;
+"""
+
+
+def without_positions(nodes):
+    return [(kind, *fields) for kind, line, column, *fields in nodes]
+
+
+def test_interned_tree_is_the_same_program(parse, structure, execute):
+    interner = Interner()
+    program = parse(TEXT, interner)
+    assert without_positions(structure(program)) == without_positions(structure(parse(TEXT)))
+    assert interner.shared > 0
+    for backend in ('ast', 'vm'):
+        assert execute(program, backend) == execute(parse(TEXT), backend)
+
+
+def test_equal_expressions_are_one_object(parse):
+    first, second, third = parse(TEXT, Interner()).children[:3]
+    literal = first.right
+    assert second.right.left.left is literal and third.right.left.right is literal
+    assert second.right.right is third.right.right
+    # the variables assigned are statements' targets, which are interned as expressions too
+    assert second.right.left.right is first.left
+
+
+def test_statements_and_different_literals_are_not_shared(parse):
+    program = parse(TEXT, Interner())
+    x, y, z, store = program.children[3:7]
+    assert x.right.value == 0.0 and x.right is not y.right
+    assert z.right.left is not z.right.right
+    assert store.right.left is store.left
+    assert store is not program.children[0]
+
+
+def test_interning_another_tree_shares_with_the_first(parse):
+    interner = Interner()
+    first = parse("A = [1, 2; 3, 4];\n", interner)
+    count = len(interner)
+    second = parse("B = [1, 2; 3, 4];\n", interner)
+    assert second.children[0].right is first.children[0].right
+    assert len(interner) == count + 1
+    interner.clear()
+    assert len(interner) == 0 and interner.shared == 0
+
+
+def test_long_operator_chains_are_interned(parse):
+    text = "x = {0};\ny = {0};\n".format(" + ".join(["a * 2"] * 5000))
+    program = parse(text, Interner())
+    x, y = program.children
+    assert x.right is y.right
+
+
+def test_structural_hash_ignores_positions_and_sharing(parse):
+    interner = Interner()
+    interned = parse(TEXT, interner)
+    moved = parse("\n\n  " + TEXT.replace("\n", "\n  "))
+    assert structural_hash(interned) == structural_hash(parse(TEXT)) == structural_hash(moved)
+    assert interner.hash(interned) == structural_hash(interned)
+    assert structural_hash(parse(TEXT.replace("0.0", "0.5"))) != structural_hash(parse(TEXT))
+
+
+def test_structural_hash_is_the_same_in_every_process(parse):
+    script = ("import sys\nfrom parser import Mparser\nfrom parser.ast.Interner import structural_hash\n"
+              "from scanner import scanner\nlexer = scanner.Scanner()\nlexer.build()\n"
+              "parser = Mparser.Parser(lexer, debug=False, write_tables=False)\n"
+              "print(structural_hash(parser.parse(sys.stdin.read(), lexer=lexer)))\n")
+    hashes = set()
+    for seed in ('1', '2'):
+        environment = dict(os.environ, PYTHONHASHSEED=seed, PYTHONPATH=ROOT)
+        hashes.add(subprocess.run([sys.executable, '-c', script], input=TEXT, capture_output=True, text=True,
+                                  env=environment, cwd=ROOT, check=True).stdout)
+    assert hashes == {"{0}\n".format(structural_hash(parse(TEXT)))}
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from parser.Mparser import ParseErrors
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Programs and what they print, the same on both backends
+PROGRAMS = [
+    ("print 7 / 2, 7.0 / 2, 2 * 3 - 4;", "3.5 3.5 2\n"),
+    ("x = 2; x += 3; x *= 4; x -= 1; x /= 2; print x;", "9.5\n"),
+    ("s = 0; for i = 1:5 s += i; print s, i;", "15 5\n"),
+    ("k = 0; while (k < 10) { k += 1; if (k == 3) continue; if (k == 6) break; print k; } print \"end\", k;",
+     "1\n2\n4\n5\nend 6\n"),
+    ("for i = 1:3 { for j = 1:3 { if (j == 2) break; print i, j; } }", "1 1\n2 1\n3 1\n"),
+    ("A = [1, 2; 3, 4]; print A[1, 2], A[2, 1]; A[1, 2] = 9; print A; B = A'; print B[2, 1];",
+     "2.0 3.0\n[[1. 9.]\n [3. 4.]]\n9.0\n"),
+    ("A = [1, 2; 3, 4]; B = A * A; C = A .* A; D = A + 1; print B, C, D;",
+     "[[ 7. 10.]\n [15. 22.]] [[ 1.  4.]\n [ 9. 16.]] [[2. 3.]\n [4. 5.]]\n"),
+    ("A = eye(2); B = zeros(2); C = ones(2); print A + B + C;", "[[2. 1.]\n [1. 2.]]\n"),
+    ("print \"a\" + \"b\", \"x\";", "ab x\n"),
+    ("x = 1; if (x == 1) print \"one\"; else print \"other\"; if (x != 1) print \"no\"; else if (x >= 1) print \"ge\";",
+     "one\nge\n"),
+    ("print 1 < 2, 2 <= 1, 3 > 2, 3 >= 4, 1 == 1.0;", "True False True False True\n"),
+    ("x = 10; while (x > 0) x -= 3; print x;", "-2\n"),
+    ("print 1; return; print 2;", "1\n"),
+]
+
+
+@pytest.mark.parametrize('backend', ['ast', 'vm'])
+@pytest.mark.parametrize('text, output', PROGRAMS)
+def test_program_output(run, backend, text, output):
+    assert run(text, backend) == output
+
+
+
+def outcome(run, text, backend):
+    try:
+        return run(text, backend), None
+    except (ParseErrors, RuntimeError) as e:
+        return None, str(e)
+
+
+@pytest.mark.parametrize('name', sorted(os.listdir(os.path.join(ROOT, 'examples'))))
+def test_examples_run_the_same_on_both_backends(run, name):
+    with open(os.path.join(ROOT, 'examples', name)) as example:
+        text = example.read()
+    assert outcome(run, text, 'ast') == outcome(run, text, 'vm')
+
+
+@pytest.mark.parametrize('text', [
+    "x = 1;\nprint {0};\n".format(" + ".join(["x * 2"] * 5000)),
+    "x = 0;\n" + "while (x < 1) {\n" * 500 + "x += 1;\nprint x;\n" + "}\n" * 500,
+    "s = 0;\nfor i = 1:3 {\n" + "if (i > 0) {\n" * 500 + "s += i;\ncontinue;\n" + "}\n" * 500 + "}\nprint s;\n",
+])
+def test_long_and_deep_programs_run_the_same_on_both_backends(run, text):
+    assert outcome(run, text, 'vm') == outcome(run, text, 'ast')
+    assert outcome(run, text, 'ast')[1] is None
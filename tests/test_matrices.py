@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from interpreter import Matrices
+
+pytestmark = pytest.mark.skipif(Matrices.sparse is None, reason="SciPy is not installed")
+
+# The smallest square matrices kept sparse
+N = 512
+
+
+def sparse_eye():
+    matrix = Matrices.eye(N)
+    assert Matrices.is_sparse(matrix)
+    return matrix
+
+
+def with_value(value):
+    matrix = np.ones((N, N))
+    matrix[0, 1] = value
+    return matrix
+
+
+def assert_same(result, expected):
+    # NaN is where it is expected, and only there
+    np.testing.assert_array_equal(Matrices.dense(result), expected)
+
+
+@pytest.mark.parametrize('value', [np.inf, np.nan])
+def test_product_with_non_finite_matrix_matches_dense(value):
+    right = with_value(value)
+    with np.errstate(invalid='ignore'):
+        expected = np.eye(N) @ right
+        assert_same(Matrices.multiply(sparse_eye(), right), expected)
+        assert_same(Matrices.multiply(right.T, sparse_eye()), expected.T)
+    assert np.isnan(expected[1, 1])
+
+
+@pytest.mark.parametrize('value', [np.inf, np.nan])
+def test_element_product_with_non_finite_matrix_matches_dense(value):
+    right = with_value(value)
+    with np.errstate(invalid='ignore'):
+        expected = np.eye(N) * right
+        assert_same(Matrices.element_multiply(sparse_eye(), right), expected)
+        assert_same(Matrices.element_multiply(right, sparse_eye()), expected)
+    assert np.isnan(expected[0, 1])
+
+
+@pytest.mark.parametrize('value', [np.inf, np.nan])
+def test_product_with_non_finite_scalar_matches_dense(value):
+    with np.errstate(invalid='ignore'):
+        expected = np.eye(N) * value
+        assert_same(Matrices.multiply(sparse_eye(), value), expected)
+        assert_same(Matrices.element_multiply(value, sparse_eye()), expected)
+    assert np.isnan(expected[0, 1])
+
+
+def test_product_of_sparse_matrices_with_non_finite_elements_matches_dense():
+    left = Matrices.store(sparse_eye(), (0, 0), np.inf)
+    with np.errstate(invalid='ignore'):
+        expected = Matrices.dense(left) @ np.eye(N)
+        assert_same(Matrices.multiply(left, sparse_eye()), expected)
+    assert np.isnan(expected[0, 1])
+
+
+def test_division_by_nan_matches_dense():
+    with np.errstate(invalid='ignore'):
+        expected = np.eye(N) / np.nan
+        assert_same(Matrices.divide(sparse_eye(), np.nan), expected)
+        assert_same(Matrices.element_divide(sparse_eye(), np.nan), expected)
+
+
+def test_product_with_finite_operand_stays_sparse():
+    assert Matrices.is_sparse(Matrices.multiply(sparse_eye(), 2.0))
+    assert Matrices.is_sparse(Matrices.multiply(sparse_eye(), sparse_eye()))
+    assert Matrices.is_sparse(Matrices.element_multiply(sparse_eye(), np.ones((N, N))))
+
+
+@pytest.mark.parametrize('backend', ['ast', 'vm'])
+def test_sparse_matrices_print_as_dense(run, backend):
+    assert Matrices.is_sparse(Matrices.eye(600))
+    assert run("A = eye(600);\nprint A;\n", backend) == "{0}\n".format(np.eye(600))
+    assert run("print zeros(600), 1;\n", backend) == "{0} 1\n".format(np.zeros((600, 600)))
+
+
+def test_storing_a_matrix_in_a_sparse_matrix_element_is_not_a_comparison_error():
+    with pytest.raises(ValueError) as error:
+        Matrices.store(sparse_eye(), (0, 1), np.ones(2))
+    assert "ambiguous" not in str(error.value)
@@ -0,0 +1,53 @@
+import pytest
+
+from interpreter import Optimizer
+
+# Programs the optimizer shortens, each printing what the folded or dropped parts computed
+SHORTENED = [
+    "x = 2 * 3 + 1;\nprint x, 7 / 2, 7.0 / 2, 2 - 5;\n",
+    "x = 5;\ny = x * 1 + 0;\nz = 0 + x / 1;\nprint y, z;\n",
+    "A = [1, 2; 3, 4];\nB = A * eye(2) + zeros(2);\nC = A .* ones(2);\nprint B, C;\n",
+    "k = 0;\nwhile (k < 3) { k = k + 1 * 1; }\nprint k;\n",
+]
+
+# Programs where what looks like an identity may not be one, which the optimizer leaves as they are
+KEPT = [
+    "A = eye(2);\nfor i = 1:2 { A = A * 2; }\nB = A * eye(2);\nprint B;\n",
+    "A = eye(2);\nif (1 > 0) { A = [1, 2, 3]; }\nB = A * eye(3);\nprint B;\n",
+    "s = \"a\" * 1;\nprint s;\n",
+]
+
+
+@pytest.mark.parametrize('backend', ['ast', 'vm'])
+@pytest.mark.parametrize('text', SHORTENED + KEPT)
+def test_optimized_program_prints_the_same(parse, execute, text, backend):
+    expected = execute(parse(text), backend)
+    program, removed = Optimizer.optimize(parse(text))
+    assert (removed > 0) == (text in SHORTENED)
+    assert execute(program, backend) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("print 2 * 3 + 1;\n", ('IntegerNumber', 7)),
+    ("print 1.5 * 2;\n", ('FloatNumber', 3.0)),
+    ("x = 4;\nprint x * 1 + 0;\n", ('Variable', 'x')),
+    ("A = eye(3);\nprint A * eye(3);\n", ('Variable', 'A')),
+])
+def test_folded_expressions(parse, structure, text, expected):
+    program, _ = Optimizer.optimize(parse(text))
+    printed = structure(program.children[-1].values[0])
+    assert len(printed) == 1
+    assert (printed[0][0], printed[0][3]) == expected
+
+
+def test_what_a_loop_assigns_is_forgotten(parse):
+    # A is not known to be 2x2 after the loop, so the product with eye(2) stays
+    program, _ = Optimizer.optimize(parse("A = eye(2);\nwhile (1 > 2) { A = [1, 2, 3]; }\nB = A * eye(2);\n"))
+    assert program.children[-1].right.op == '*'
+
+
+def test_deep_nesting_is_optimized(parse, execute):
+    text = "x = 1;\n" + "if (x > 0) {\n" * 1000 + "print x + 0;\n" + "}\n" * 1000
+    program, removed = Optimizer.optimize(parse(text))
+    assert removed == 2
+    assert execute(program) == "1\n"
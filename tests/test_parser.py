@@ -0,0 +1,94 @@
+import gc
+
+import pytest
+
+from parser.Mparser import ParseErrors
+
+
+@pytest.mark.parametrize('program, message', [
+    ("x = 1;\nif (x) {\n",
+     "Unexpected end of input at line 2, column 8, after LexToken(LCURLY_BRACKET, '{')"),
+    ("x = (1 + 2", "Unexpected end of input at line 1, column 10, after LexToken(INT_NUM, '2')"),
+    ("", "Unexpected end of input at line 1, column 1"),
+])
+def test_unexpected_end_of_input_has_a_position(parse, program, message):
+    with pytest.raises(ParseErrors) as error:
+        parse(program)
+    assert error.value.errors[-1] == message
+
+
+def test_long_lists_are_built_in_order(parse, structure):
+    statements = 20000
+    text = "A = [{0}];\nprint {1};\nB = A[1, 2];\n".format(
+        "; ".join(", ".join(str(row * 100 + column) for column in range(100)) for row in range(100)),
+        ", ".join("x{0}".format(number) for number in range(1000)))
+    program = parse(text + "x = 1;\n" * statements)
+    assert len(program.children) == 3 + statements
+    matrix = program.children[0].right
+    assert [[value.value for value in row.children] for row in matrix.children] == \
+        [[row * 100 + column for column in range(100)] for row in range(100)]
+    assert [value.name for value in program.children[1].values] == ["x{0}".format(number) for number in range(1000)]
+    assert program.children[2].right.index.children == [1, 2]
+
+
+def test_collector_is_paused_only_while_parsing(parse):
+    assert gc.isenabled()
+    parse("x = 1;\n")
+    with pytest.raises(ParseErrors):
+        parse("x = ;\n")
+    assert gc.isenabled()
+    gc.disable()
+    try:
+        parse("x = 1;\n")
+        assert not gc.isenabled()
+    finally:
+        gc.enable()
+
+
+def test_nodes_are_positioned_at_their_first_token(parse, structure):
+    text = 'x = 1;\ns = "a\nb"; A = [1, 2;\n  3, 4];\nif (x > 0) { A[1, 2] = -x; }\n'
+    positions = [(kind, line, column) for kind, line, column, *_ in structure(parse(text))]
+    assert positions == [
+        ('CodeBlock', 1, 1), ('BinaryExpression', 1, 1), ('Variable', 1, 1), ('IntegerNumber', 1, 5),
+        ('BinaryExpression', 2, 1), ('Variable', 2, 1), ('StringValue', 2, 5),
+        # after a string spanning lines
+        ('BinaryExpression', 3, 5), ('Variable', 3, 5), ('Matrix', 3, 9), ('Matrix', 3, 10),
+        ('IntegerNumber', 3, 10), ('IntegerNumber', 3, 13), ('Matrix', 4, 3), ('IntegerNumber', 4, 3),
+        ('IntegerNumber', 4, 6),
+        ('IfStatement', 5, 1), ('BinaryExpression', 5, 5), ('Variable', 5, 5), ('IntegerNumber', 5, 9),
+        ('CodeBlock', 5, 14), ('BinaryExpression', 5, 14), ('ElementAccessExpression', 5, 14), ('Variable', 5, 14),
+        ('ListOfIntegers', 5, 16), ('UnaryExpression', 5, 24), ('Variable', 5, 25),
+    ]
+
+
+def test_token_positions_after_many_lines(lexer):
+    lexer.input("\n" * 50000 + "  x", 1, 1)
+    token = lexer.token()
+    assert (token.lineno, token.column) == (50001, 3)
+    assert lexer.find_position(token.lexpos) == (50001, 3)
+
+
+@pytest.mark.parametrize('program, errors', [
+    ("x = ;\ny = 2;\nz = (3;\nprint ;\n", ["Syntax error at line 1, column 5: LexToken(SEMICOLON, ';')",
+                                            "Syntax error at line 3, column 7: LexToken(SEMICOLON, ';')",
+                                            "Syntax error at line 4, column 7: LexToken(SEMICOLON, ';')"]),
+    ("x = 1 +;\nwhile (x) { y = ; }\n", ["Syntax error at line 1, column 8: LexToken(SEMICOLON, ';')",
+                                          "Syntax error at line 2, column 17: LexToken(SEMICOLON, ';')"]),
+    ("if (x > 0) { y = 1; z = ) ; }\nw = 2;\n", ["Syntax error at line 1, column 25: LexToken(RPAREN, ')')"]),
+])
+def test_every_syntax_error_is_reported(parse, program, errors):
+    with pytest.raises(ParseErrors) as error:
+        parse(program)
+    assert error.value.errors == errors
+    assert str(error.value) == "\n".join(errors)
+
+
+def test_statements_around_errors_are_kept(parse):
+    with pytest.raises(ParseErrors) as error:
+        parse("x = ;\ny = 2;\nif (y) { z = ; w = 3; }\n")
+    program = error.value.program
+    kinds = [type(child).__name__ for child in program.children]
+    assert kinds == ['Error', 'BinaryExpression', 'IfStatement']
+    assert [type(child).__name__ for child in program.children[2].code_block.children] == \
+        ['Error', 'BinaryExpression']
+    assert (program.children[0].line, program.children[0].column) == (1, 5)
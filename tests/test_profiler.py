@@ -0,0 +1,71 @@
+import io
+import re
+
+import pytest
+
+from interpreter import Interpreter
+from interpreter.Memory import Memory
+from interpreter.Profiler import Profiler, node_classes
+
+TEXT = """s = 0;
+for i = 1:10 {
+    s += i * 2;
+}
+A = ones(300);
+print s, A[1, 1];
+"""
+
+
+def profile(program, memory=True):
+    output = io.StringIO()
+    profiler = Profiler(memory)
+    with profiler:
+        Interpreter.run(program, Memory(output))
+    return profiler, output.getvalue()
+
+
+def test_profiled_program_prints_the_same_and_methods_are_restored(parse, run):
+    methods = [(cls, name, cls.__dict__[name]) for cls in node_classes()
+               for name in ('evaluate', 'defer', 'evaluate_steps') if name in cls.__dict__]
+    _, output = profile(parse(TEXT))
+    assert output == run(TEXT)
+    assert all(cls.__dict__[name] is method for cls, name, method in methods)
+
+
+def test_counts_by_node_and_line(parse):
+    program = parse(TEXT)
+    profiler, _ = profile(program)
+    loop = program.children[1]
+    assert profiler.nodes[loop].count == 1
+    assert profiler.nodes[loop.code_block.children[0]].count == 10
+    assert {line: statistics.count for line, statistics in profiler.lines.items()} == {1: 1, 2: 1, 3: 10, 5: 1, 6: 1}
+
+
+def test_times_add_up(parse):
+    program = parse(TEXT)
+    profiler, _ = profile(program)
+    for statistics in list(profiler.nodes.values()) + list(profiler.lines.values()):
+        assert 0 <= statistics.own <= statistics.total + 1e-9
+    assert sum(statistics.own for statistics in profiler.nodes.values()) == pytest.approx(
+        profiler.nodes[program].total)
+
+
+@pytest.mark.parametrize('memory', [True, False])
+def test_allocations_are_traced_when_asked(parse, memory):
+    program = parse(TEXT)
+    profiler, _ = profile(program, memory)
+    allocated = profiler.nodes[program.children[2]].allocated
+    assert allocated >= 300 * 300 * 8 if memory else allocated == 0
+
+
+def test_report_and_collapsed_stacks(parse):
+    profiler, _ = profile(parse(TEXT))
+    report = profiler.report(limit=3).splitlines()
+    assert report[0].split() == ["line", "count", "cumulative", "[s]", "self", "[s]", "allocated", "[KB]"]
+    assert sorted(int(line.split()[0]) for line in report[1:6]) == [1, 2, 3, 5, 6]
+    assert report[6] == "" and len(report) == 8 + 3
+
+    stacks = profiler.collapsed_stacks().splitlines()
+    assert stacks
+    for stack in stacks:
+        assert re.fullmatch(r"BLOCK \(line 1\)(;[^;]+ \(line \d+\))* \d+", stack)
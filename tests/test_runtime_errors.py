@@ -0,0 +1,48 @@
+import pytest
+
+# Programs failing at run time, and the error both backends report
+PROGRAMS = [
+    ('x = "a" - 1;',
+     "Runtime error at line 1, column 5: cannot evaluate '-': unsupported operand type(s) for -: 'str' and 'int'"),
+    ('A = [1, 2; 3, 4];\nA[5] = 3;', "Runtime error at line 2, column 1: index [5] out of range for 'A'"),
+    ('A = [1, 2; 3, 4];\nA[1, 2] = [1, 2];', "Runtime error at line 2, column 1: index [1, 2] out of range for 'A'"),
+    ('A = [1, 2; 3, 4];\nprint A[5];', "Runtime error at line 2, column 7: index [5] out of range for 'A'"),
+    ('A = [1, 2; 3, 4];\nfor i = 1:A { print i; }',
+     "Runtime error at line 2, column 9: only 0-dimensional arrays can be converted to Python scalars"),
+    ('A = eye(600);\nA[1, 2] = [1, 2];', "Runtime error at line 2, column 1: index [1, 2] out of range for 'A'"),
+]
+
+
+@pytest.mark.parametrize('backend', ['ast', 'vm'])
+@pytest.mark.parametrize('program, message', PROGRAMS)
+def test_runtime_error(run, backend, program, message):
+    with pytest.raises(RuntimeError) as error:
+        run(program, backend)
+    assert str(error.value) == message
+
+
+# Errors the virtual machine finds from its instructions, reported where the interpreter finds them
+POSITIONED = [
+    ('C = -A;', "Runtime error at line 1, column 6: undefined variable 'A'"),
+    ('x = 1 + A;', "Runtime error at line 1, column 9: undefined variable 'A'"),
+    ('x = A;', "Runtime error at line 1, column 5: undefined variable 'A'"),
+    ('x = 1 + (2 + A);', "Runtime error at line 1, column 14: undefined variable 'A'"),
+    ('for i = 1:A { print i; }', "Runtime error at line 1, column 11: undefined variable 'A'"),
+    ('A = "a";\nx = -A;', "Runtime error at line 2, column 5: bad operand type for unary -: 'str'"),
+]
+
+
+@pytest.mark.parametrize('backend', ['ast', 'vm'])
+@pytest.mark.parametrize('program, message', POSITIONED)
+def test_runtime_error_position(run, backend, program, message):
+    with pytest.raises(RuntimeError) as error:
+        run(program, backend)
+    assert str(error.value) == message
+
+
+@pytest.mark.parametrize('backend', ['ast', 'vm'])
+@pytest.mark.parametrize('statement', ['break', 'continue'])
+def test_jump_outside_of_a_loop(run, backend, statement):
+    with pytest.raises(RuntimeError) as error:
+        run("print 1;\nif (1 == 1) {{ {0}; }}\n".format(statement), backend)
+    assert str(error.value) == "Runtime error at line 2, column 15: '{0}' outside of a loop".format(statement)
@@ -0,0 +1,94 @@
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+from scanner import scanner
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_token_dump_reports_illegal_characters_in_place(tmp_path):
+    program = tmp_path / "program.txt"
+    program.write_text("a = 1 $ 2;\n")
+    output = subprocess.run([sys.executable, os.path.join(ROOT, 'scanner', 'main.py'), str(program)],
+                            capture_output=True, text=True, check=True).stdout
+    assert output.splitlines() == ["(1,1): ID(a)", "(1,3): ASSIGN(=)", "(1,5): INT_NUM(1)",
+                                   "1: illegal character '$'", "(1,9): INT_NUM(2)", "(1,10): SEMICOLON(;)"]
+
+
+# Every kind of token, with strings and runs of blank lines moving the tokens after them, and illegal characters
+TEXT = """# comment
+A = [1, 2.5; -3., .5e-3];   # matrix
+if (A[1, 2] >= 1e3) { print "one
+two", x_1; } else B = A' .* eye(3);
+while (k != 0) k -= 1;\t$ @
+
+
+for i = 1:10 { break; continue; return i; }
+s = "";
+"""
+with open(os.path.join(ROOT, 'examples', 'full.txt')) as example:
+    TEXTS = [TEXT, "", "x", "\n\n\"\n\"\n", "a = \"open;\nb = 1;\n", example.read()]
+
+
+@pytest.fixture(scope='module')
+def scanners():
+    built = {}
+    for backend in scanner.BACKENDS:
+        built[backend] = scanner.Scanner(backend)
+        built[backend].build()
+    return built
+
+
+def tokens(lexer, text, lineno=1, column=1):
+    lexer.input(text, lineno, column)
+    return [(token.type, token.value, token.lineno, token.column, token.lexpos) for token in iter(lexer.token, None)]
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_fast_lexer_gives_the_tokens_and_errors_of_ply(scanners, capsys, text):
+    expected = tokens(scanners['ply'], text, 3, 7)
+    errors = capsys.readouterr().out
+    assert tokens(scanners['fast'], text, 3, 7) == expected
+    assert capsys.readouterr().out == errors
+
+
+@pytest.mark.parametrize('backend', scanner.BACKENDS)
+@pytest.mark.parametrize('text', TEXTS)
+def test_token_arrays_hold_the_tokens(scanners, capsys, backend, text):
+    lexer = scanners[backend]
+    expected = tokens(lexer, text, 3, 7)
+    arrays = lexer.tokenize(text, 3, 7)
+    assert [arrays.names[kind] for kind in arrays.types.tolist()] == [token[0] for token in expected]
+    assert arrays.values() == [token[1] for token in expected]
+    assert [arrays.value(number) for number in range(len(arrays))] == arrays.values()
+    assert arrays.lines.tolist() == [token[2] for token in expected]
+    assert arrays.columns.tolist() == [token[3] for token in expected]
+    assert arrays.starts.tolist() == [token[4] for token in expected]
+    assert arrays.count('ID') == sum(token[0] == 'ID' for token in expected)
+
+
+def test_token_arrays_keep_integers_of_any_size(scanners):
+    arrays = scanners['fast'].tokenize("x = 123456789012345678901234567890 + 1;")
+    assert arrays.values()[2] == 123456789012345678901234567890
+    assert arrays.value(4) == 1
+
+
+@pytest.mark.parametrize('backend', scanner.BACKENDS)
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 64])
+@pytest.mark.parametrize('text', TEXTS)
+def test_streamed_tokens_match_the_whole_text(scanners, capsys, backend, chunk_size, text):
+    lexer = scanners[backend]
+    expected = tokens(lexer, text)
+    errors = capsys.readouterr().out
+    streamed = lexer.stream(io.StringIO(text), chunk_size)
+    assert [(token.type, token.value, token.lineno, token.column, token.lexpos) for token in streamed] == expected
+    assert capsys.readouterr().out == errors
+
+    arrays = list(lexer.stream_arrays(io.StringIO(text), chunk_size))
+    assert [start for part in arrays for start in part.starts.tolist()] == [token[4] for token in expected]
+    assert [column for part in arrays for column in part.columns.tolist()] == [token[3] for token in expected]
+    assert [value for part in arrays for value in part.values()] == [token[1] for token in expected]
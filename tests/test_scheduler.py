@@ -0,0 +1,55 @@
+import io
+
+import numpy as np
+import pytest
+
+from interpreter import Interpreter, Scheduler
+from interpreter.Memory import Memory
+
+PROGRAMS = [
+    "A = ones(400); B = eye(400); C = A * B; D = A .* 2; print C[1, 1], D[2, 2]; E = D - C; print E[3, 3];\n"
+    "F = ones(300) * 3; G = F'; print G[1, 2]; x = 5; print x;",
+    "A = ones(400); B = ones(400); print \"a\"; A = A + 1; B = B + A; print A[1, 1], B[1, 1]; A[1, 1] = 7;\n"
+    "print A[1, 1], B[1, 1];",
+    "A = ones(400); B = ones(400); print \"start\"; C = A * z; D = B .* 2; print D[1, 1]; print \"after\";",
+    "A = ones(400); B = ones(400); print \"x\"; C = A + B; return; D = A * B; print \"no\";",
+    "A = ones(400); s = 0; for i = 1:100 s += i; B = A * 2; print s, B[1, 1]; for i = 1:3 print i;",
+    "A = ones(400); B = eye(400); C = A / B; D = B * A; print C[1, 1] + D[2, 2];",
+    "A = ones(400) ./ 0; B = zeros(400) ./ 0; print A[1, 1], B[1, 1];",
+]
+
+
+def run(program, parallel):
+    memory = Memory(io.StringIO())
+    try:
+        if parallel:
+            Scheduler.run(program, memory, workers=4)
+        else:
+            Interpreter.run(program, memory)
+        error = None
+    except RuntimeError as e:
+        error = str(e)
+    variables = {name: (type(value).__name__, np.asarray(value).tobytes()) for name, value in memory.variables.items()}
+    return memory.output.getvalue(), error, memory.returned, variables
+
+
+@pytest.mark.parametrize('text', PROGRAMS)
+def test_parallel_run_matches_running_in_order(parse, text):
+    output, error, returned, variables = run(parse(text), False)
+    for _ in range(5):
+        parallel = run(parse(text), True)
+        assert parallel[:3] == (output, error, returned)
+        if error is None:
+            assert parallel[3] == variables
+
+
+def test_statements_wait_for_what_they_depend_on(parse):
+    tasks = Scheduler.plan(parse("A = ones(400); B = ones(400); C = A + B; A = 1; print C; return; x = 1;").children)
+    assert [task.heavy for task in tasks] == [True, True, True, False, True, False, False]
+    assert [task.waiting for task in tasks] == [0, 0, 2, 2, 1, 5, 1]
+    assert [task.dependents for task in tasks] == [[2, 3, 5], [2, 5], [3, 4, 5], [5], [5], [6], []]
+
+
+def test_element_stores_read_and_write_the_matrix(parse):
+    reads, whole, writes, jumps = Scheduler.accesses(parse("A[1, 2] += B[3, 4] + x;").children[0])
+    assert (reads, whole, writes, jumps) == ({'A', 'B', 'x'}, {'x'}, {'A'}, False)
@@ -0,0 +1,33 @@
+import io
+
+import pytest
+
+from parser.Mparser import ParseErrors
+from scanner.scanner import TokenFeed
+
+# Programs with syntax errors, which --stream must report as a parse of the whole program does
+PROGRAMS = [
+    "a = 1;\nwhile a { x = 1; y = ) ; }\nb = 2;\n",
+    "a = [1, 2;\nb = 2;\n",
+    "x = 1; }\ny = 2;\nz = (3;\n",
+    "if (a) { b = 1; ] } else { c = 2; }\nd = 4;\n",
+]
+
+
+def errors(function):
+    with pytest.raises(ParseErrors) as error:
+        function()
+    return error.value.errors
+
+
+@pytest.mark.parametrize('program', PROGRAMS)
+def test_streamed_errors_match_whole_parse(lexer, parser, parse, program):
+    whole = errors(lambda: parse(program))
+    streamed = errors(lambda: list(parser.parse_statements(TokenFeed(lexer.stream(io.StringIO(program))))))
+    assert streamed == whole
+
+
+def test_streamed_statements_match_whole_parse(lexer, parser, parse, structure):
+    program = "a = (1 + 2) * [1, 2; 3, 4];\nwhile (a[1] < 10) { a[1] += 1; }\nprint a;\n"
+    blocks = list(parser.parse_statements(TokenFeed(lexer.stream(io.StringIO(program)))))
+    assert [node for block in blocks for node in structure(block)[1:]] == structure(parse(program))[1:]
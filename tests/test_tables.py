@@ -0,0 +1,51 @@
+import os
+
+from parser import Mparser
+from scanner import scanner
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+with open(os.path.join(ROOT, 'examples', 'full.txt')) as example:
+    TEXT = example.read()
+
+
+def build(cache_dir):
+    lexer = scanner.Scanner()
+    lexer.build(cache_dir=cache_dir)
+    return lexer, Mparser.Parser(lexer, cache_dir=cache_dir)
+
+
+def test_cached_tables_parse_the_same(tmp_path, parse, structure):
+    directory = str(tmp_path)
+    lexer, parser = build(directory)
+    tables = sorted(os.listdir(directory))
+    assert tables == ['lextab_{0}.py'.format(lexer.signature()), 'parsetab_{0}.pickle'.format(parser.signature())]
+    times = [os.stat(os.path.join(directory, name)).st_mtime_ns for name in tables]
+
+    lexer, parser = build(directory)
+    assert sorted(os.listdir(directory)) == tables
+    assert [os.stat(os.path.join(directory, name)).st_mtime_ns for name in tables] == times
+    assert structure(parser.parse(TEXT, lexer=lexer)) == structure(parse(TEXT))
+
+
+def test_unwritable_cache_still_builds(tmp_path, parse, structure):
+    blocked = tmp_path / 'file'
+    blocked.write_text('')
+    lexer, parser = build(str(blocked / 'tables'))
+    assert structure(parser.parse(TEXT, lexer=lexer)) == structure(parse(TEXT))
+
+
+def test_signatures_follow_the_grammar(lexer, parser):
+    class Extended(Mparser.Parser):
+        def p_statement_extra(self, p):
+            """statement : PRINT SEMICOLON"""
+
+    class Lexer(scanner.Scanner):
+        t_ignore = ' '
+
+    # the signature is all that is wanted, not the tables
+    extended = Extended.__new__(Extended)
+    extended.tokens = parser.tokens
+    assert extended.signature() != parser.signature()
+    assert Lexer().signature() != lexer.signature()
+    assert scanner.Scanner().signature() == lexer.signature()
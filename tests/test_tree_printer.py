@@ -0,0 +1,86 @@
+import io
+
+import pytest
+
+from parser.ast import TreePrinter
+
+TEXT = "x = 1;\nif (x > 0) { A = [1, 2; 3, 4]; print A[1, 2]; } else x = -x;\nfor i = 1:3 while (x < 2) x += 1.5;\n"
+
+# What the printer printed a line at a time before it was buffered
+TREE = """=
+|x
+|1
+IF
+|>
+||x
+||0
+THEN
+|=
+||A
+||MATRIX
+|||MATRIX
+||||1
+||||2
+|||MATRIX
+||||3
+||||4
+|PRINT
+||REF
+|||A
+|||1
+|||2
+ELSE
+|=
+||x
+||-
+|||x
+FOR
+|=
+||i
+||RANGE
+|||1
+|||3
+|WHILE
+||<
+|||x
+|||2
+||+=
+|||x
+|||1.5
+"""
+
+
+class Sink(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+@pytest.mark.parametrize('lines_per_write', [TreePrinter.LINES_PER_WRITE, 1, 3])
+def test_tree_is_printed_as_before(parse, monkeypatch, lines_per_write):
+    monkeypatch.setattr(TreePrinter, 'LINES_PER_WRITE', lines_per_write)
+    sink = Sink()
+    parse(TEXT).printTree(file=sink)
+    assert sink.getvalue() == TREE
+    assert sink.writes == -(-TREE.count("\n") // lines_per_write)
+
+
+def test_lines_are_generated_lazily(parse):
+    lines = parse(TEXT).treeLines()
+    assert next(lines) == "="
+    assert list(lines) == TREE.splitlines()[1:]
+
+
+def test_long_chains_and_deep_nesting_are_printed(parse):
+    sink = io.StringIO()
+    parse("x = {0};\n".format(" + ".join(["1"] * 5000))).printTree(file=sink)
+    lines = sink.getvalue().splitlines()
+    assert len(lines) == 2 + 4999 + 5000
+    # the first operand is the deepest, far past the cached prefixes
+    assert lines[4999 + 2] == "|" * 5000 + "1"
+    assert lines[-1] == "||1"
+    assert len(TreePrinter.PREFIXES) <= TreePrinter.MAX_CACHED_INDENT + 1
@@ -0,0 +1,49 @@
+import pytest
+
+from interpreter import TypeChecker
+from interpreter.Optimizer import UNKNOWN, Info
+
+
+def errors(parse, text):
+    return [error.split(': ', 1)[1] for error in TypeChecker.check(parse(text))]
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("print x;\n", ["variable 'x' is used before it is assigned"]),
+    ("print x; print x;\n", ["variable 'x' is used before it is assigned"]),
+    ("x = 1;\nif (x > 0) { y = 1; }\nprint y;\n", []),
+    ("x = 1;\nwhile (x < 3) { y = x; x += 1; }\nprint y;\n", []),
+    ("if (1 > 0) { y = z; } else { z = 1; }\n", ["variable 'z' is used before it is assigned"]),
+    ("for i = 1:3 { print i; }\n", []),
+    ("break;\n", ["'break' outside of a loop"]),
+    ("A = ones(2) * eye(3);\n", ["shapes 2x2 and 3x3 do not match in '*'"]),
+    ("A = [1, 2, 3; 4, 5, 6];\nprint A[3, 1];\n", ["index [3, 1] out of range for 'A' of shape 2x3"]),
+    ("A = [1, 2; 3];\n", None),
+])
+def test_errors(parse, text, expected):
+    found = errors(parse, text)
+    if expected is None:
+        assert found
+    else:
+        assert found == expected
+
+
+def test_branches_keep_what_both_agree_on(parse):
+    checker = TypeChecker.TypeChecker()
+    checker.check(parse("x = 1;\nif (x > 0) { A = eye(2); B = eye(2); } else { A = eye(2); B = eye(3); }\n"))
+    assert checker.variables['A'] == Info('matrix', (2, 2))
+    assert checker.variables['B'] == Info('matrix')
+
+
+def test_nothing_is_known_of_what_a_loop_assigns(parse):
+    checker = TypeChecker.TypeChecker()
+    checker.check(parse("A = eye(2);\nwhile (1 > 0) { A = eye(3); }\n"))
+    assert checker.variables['A'] == UNKNOWN
+    assert errors(parse, "A = eye(2);\nwhile (1 > 0) { A = A * eye(3); A = eye(3); }\n") == []
+
+
+def test_statements_can_be_checked_one_at_a_time(parse):
+    checker = TypeChecker.TypeChecker()
+    assert checker.check(parse("A = eye(2);\n")) == []
+    assert len(checker.check(parse("B = A + eye(3);\n"))) == 1
+    assert checker.check(parse("print A;\n")) == []
@@ -0,0 +1,73 @@
+import io
+
+import pytest
+
+from interpreter import Interpreter, Vectorizer
+from interpreter.Memory import Memory
+
+# Loops and what they are expected to be reported as; every one must leave the same output, variables and error
+# vectorized or not
+LOOPS = [
+    ("s = 0; for i = 1:1000 s += i;", True),
+    ("s = 0.5; for i = 1:1000 s += i * 0.1;", True),
+    ("s = 1.0; for i = 1:100 s *= 1.01;", True),
+    ("s = 1; for i = 1:100 s *= i;", True),
+    ("s = 100; for i = 1:1000 s -= i ./ 3;", True),
+    ("s = 7.5; for i = 1:100 s /= i;", True),
+    ("s = 7; for i = 0:100 s /= i;", True),
+    ("s = 7; for i = 0:100 s = 3 / i;", True),
+    ("x = 0; for i = 1:100 { x = i * i - 2; y = i / 7; }", True),
+    ("A = ones(3); for i = 1:100 A[2, 3] += i / 3;", True),
+    ("A = ones(3); for i = 1:100 { A[1, 1] = i; A[2, 2] *= 1.5; }", True),
+    ("A = ones(3); t = 0; for i = 1:100 t += A[2, 2] .* i;", True),
+    ("s = 0; for i = 1:10 s += i;", True),
+    ("s = 0; for i = 1:20000 s += i * i * i * i;", True),
+    ("s = 0; for i = 1.5:100 s += i;", True),
+    ("s = 0; N = 50; for i = 1:N { s += -i; t = i .* 2; u = 2 * i + N; }", True),
+    ("for i = 1:100 { q += i; }", True),
+    ("s = 0; for i = 1:100 s += z;", True),
+    ("A = ones(3); for i = 1:100 A[5, 5] = i;", True),
+    ("s = 1; for i = 1:100 s *= 1000;", True),
+    ("s = 2; for i = 1:100 s += i ./ 0;", True),
+    ("s = 0; for i = 1:100 s += 10000000000000000000000;", True),
+    ("s = 0; for i = 1:3000 { s -= i; t = -i; }", True),
+    # a matrix only shows at run time, where the loop runs an iteration at a time
+    ("A = ones(300); s = 0; for i = 1:100 s += A;", True),
+    ("A = ones(3); for i = 1:100 A[1, 1] = A[1, 1] + i;", False),
+    ("s = 0; for i = 1:100 { s += i; print s; }", False),
+    ("s = 0; for i = 1:100 s = s + i;", False),
+    ("s = 0; for i = 1:100 { s += i; s += 1; }", False),
+    ("s = 0; for i = 1:100 for j = i:100 s += j;", False),
+    ("k = 3; for i = 1:100 { i = 2; }", False),
+    ("s = 0.0; for i = 1:100 s += i < 3;", False),
+    ("A = ones(3); for i = 1:100 { A[1, 1] += i; A = i; }", False),
+]
+
+
+def run(program):
+    memory = Memory(io.StringIO())
+    try:
+        Interpreter.run(program, memory)
+        error = None
+    except RuntimeError as e:
+        error = str(e)
+    variables = {name: (type(value).__name__, repr(value)) for name, value in memory.variables.items()}
+    return memory.output.getvalue(), variables, error
+
+
+@pytest.mark.parametrize('chunk_size', [Vectorizer.CHUNK_SIZE, 7])
+@pytest.mark.parametrize('text, vectorized', LOOPS)
+def test_vectorized_loop_does_what_the_loop_does(parse, monkeypatch, chunk_size, text, vectorized):
+    monkeypatch.setattr(Vectorizer, 'CHUNK_SIZE', chunk_size)
+    program, report = Vectorizer.vectorize(parse(text))
+    assert report[0].endswith(" is vectorized") == vectorized
+    assert run(program) == run(parse(text))
+
+
+def test_report_says_why_loops_are_not_vectorized(parse):
+    text = "s = 0;\nfor i = 1:10 {\n    for j = 1:10 s += j;\n    print i;\n}\nfor k = 1:10 s = s + k;\n"
+    _, report = Vectorizer.vectorize(parse(text))
+    assert report == ["Loop over 'i' at line 2, column 1 is not vectorized: it contains a loop",
+                      "Loop over 'j' at line 3, column 5 is vectorized",
+                      "Loop over 'k' at line 6, column 1 is not vectorized: an iteration reads 's', which the "
+                      "iterations before it assign"]